@@ -4,16 +4,163 @@
 # Prepares reports on completion of Assessments and Modules
 
 
-import copy
+import concurrent.futures
+import contextlib
 import custtools.admintools as ad
-import custtools.databasetools as db
 import custtools.datetools as da
 import custtools.filetools as ft
+import hashlib
+import io
+import json
 import numpy as np
 import os
 import pandas as pd
 import re
 import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    # Not available on Windows - peak process memory is not recorded
+    resource = None
+
+# Row fingerprints are kept for this many of the latest exports applied to
+# each master
+APPLIED_SOURCES = 3
+# Codes used in place of a month for blank and transferred assessments
+MONTH_BLANK = -1
+MONTH_TRANSFERRED = -2
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+               'Oct', 'Nov', 'Dec']
+
+
+def add_age_length_cols(assess_data_df, as_of=None):
+    """Add the Age and EnrolLength columns and populate.
+    
+    DateOfBirth, StartDate, ExpiryDate and GraduationDate (DD/MM/YYYY) are each
+    converted to dates once. Age is the age in years at the start date, and is
+    blank if either date is missing. EnrolLength is the number of days
+    enrolled, based on the student's status:
+        - Active and Suspended: from start date to as_of
+        - Graduated: from start date to graduation date
+        - Expired: from start date to expiry date
+        - Withdrawn, Cancelled or any other status: NaN
+    
+    Args:
+        assess_data_df (dataframe): Master data with enrolment, student and
+        graduation details.
+        as_of (datetime): Date enrolment lengths are calculated to for Active
+        and Suspended students. Today's date if not passed.
+    
+    Returns:
+        assess_data_df (dataframe): Updated with Age and EnrolLength columns.
+    """
+    if as_of is None:
+        as_of = da.get_todays_date()
+    dates = {}
+    for col in ('DateOfBirth', 'StartDate', 'ExpiryDate', 'GraduationDate'):
+        dates[col] = pd.to_datetime(assess_data_df[col], format='%d/%m/%Y',
+                                    errors='coerce')
+    birth = dates['DateOfBirth']
+    start = dates['StartDate']
+    # Age in years, less one if birthday not reached by the start date
+    before_birthday = ((start.dt.month < birth.dt.month) |
+                       ((start.dt.month == birth.dt.month) &
+                        (start.dt.day < birth.dt.day)))
+    age = start.dt.year - birth.dt.year - before_birthday.astype(int)
+    assess_data_df['Age'] = age.astype('Int64').astype(object).where(
+            age.notna(), '')
+    # Enrolment length to the end date for the student's status
+    status = assess_data_df['Status']
+    end = pd.Series(pd.NaT, index=assess_data_df.index,
+                    dtype='datetime64[ns]')
+    end[status.isin(['Active', 'Suspended'])] = pd.Timestamp(as_of)
+    end[status == 'Graduated'] = dates['GraduationDate']
+    end[status == 'Expired'] = dates['ExpiryDate']
+    assess_data_df['EnrolLength'] = pd.to_numeric((end - start).dt.days,
+                                                  downcast='integer')
+    return assess_data_df
+
+
+def add_completion_cols(assess_data_df, assessments, modules, total):
+    """Add columns for the assessments and modules completed and populate.
+    
+    Adds Completed_Assessments, Completed_Modules and Completion_Percent
+    columns to the dataframe. An assessment or module is completed when its
+    column is not blank. The completed assessments and modules are counted
+    from one matrix of completed columns, and Completion_Percent is the number
+    of completed assessments divided by the total number of assessments,
+    rounded to two decimal places.
+    
+    Args:
+        assess_data_df (dataframe): Assessment data for students.
+        assessments (list): Assessment column headings (assessment names).
+        modules (list): Module column headings (module names).
+        total (int): Total number of assessments in course.
+        
+    Returns:
+        assess_data_df (dataframe) Updated with Completed_Assessments,
+        Completed_Modules and Completion_Percent columns.
+    """
+    completed = (assess_data_df[list(assessments) + list(modules)] !=
+                 '').to_numpy()
+    num_assessments = completed[:, :len(assessments)].sum(axis=1)
+    assess_data_df['Completed_Assessments'] = num_assessments
+    assess_data_df['Completed_Modules'] = completed[:, len(assessments):].sum(
+            axis=1)
+    # Round each possible count once rather than once per student
+    percents = np.array([round(num / total, 2) for num in
+                         range(max(total, num_assessments.max(initial=0)) + 1)])
+    assess_data_df['Completion_Percent'] = percents[num_assessments]
+    return assess_data_df
+
+
+def add_enrolment_ids(assessments_df, name_index, assessment_headings):
+    """Add student and enrolment IDs and Course to assessment data.
+    
+    Each entry is matched to the name index on Name in a single merge.
+    Entries for names that are not in the index have their IDs and Course set
+    to 'Unknown'. The index of the assessment data is kept.
+    
+    Args:
+        assessments_df (dataframe): Assessment data without IDs.
+        name_index (dataframe): Name index for the course (see
+        load_name_index).
+        assessment_headings (list): Column headings of the assessment data
+        with IDs.
+        
+    Returns:
+        assessments_df (dataframe): Assessment data with IDs.
+        unknown_names (set): Names that are not in the name index.
+    """
+    id_cols = ['EnrolmentID', 'StudentID', 'Course']
+    index = assessments_df.index
+    assessments_df = assessments_df.merge(name_index[['Name'] + id_cols],
+                                          how='left', on='Name')
+    assessments_df.index = index
+    unknown = assessments_df['EnrolmentID'].isna()
+    unknown_names = set(assessments_df.loc[unknown, 'Name'])
+    assessments_df[id_cols] = assessments_df[id_cols].fillna('Unknown')
+    return assessments_df[assessment_headings], unknown_names
+
+
+def add_enrolment_details(assess_data_df, enrolment_dim):
+    """Add enrolment, student and graduation details to a master.
+    
+    The details, including the Pacific, Age and EnrolLength columns, are
+    joined from the enrolment dimension on EnrolmentID.
+    
+    Args:
+        assess_data_df (dataframe): Master Completion or Results data.
+        enrolment_dim (dataframe): Enrolment details indexed by EnrolmentID
+        (see create_enrolment_dimension).
+        
+    Returns:
+        assess_data_df (dataframe): Master data with the details added.
+    """
+    return assess_data_df.join(enrolment_dim.drop(columns='StudentID'),
+                               on='EnrolmentID')
 
 
 def add_filter_check(filters):
@@ -45,17 +192,20 @@ def add_filter_check(filters):
             continue
 
 
-def add_module_cols(assess_data_df, modules_dict, month_order, keep=True):
+def add_module_cols(assess_data_df, modules_dict, month_index, keep=True):
     """Add a column for each module to the dataframe and populate.
     
     Takes the list of keys from the modules_dict and adds each as a column to
-    the assessment dataframe. In the process each column is updated by checking
-    if the student has completed each of the required assessments.
+    the assessment dataframe. The completion months of the assessments are
+    encoded as ints once (see get_month_codes). A module is completed when
+    each of its required assessments has a month, and its column is set to the
+    latest of those months.
     
     Args:
         assess_data_df (dataframe): Assessment dataframe.
         moddules_dict (dict): Modules and required assessments.
-        month_order (list): List with months placed in order.
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
         keep (bool): True or False for keeping transferred assessments within
         analysis
              - True and transferred assessments still count
@@ -67,96 +217,42 @@ def add_module_cols(assess_data_df, modules_dict, month_order, keep=True):
     """
     # Add module keys to headings list
     modules = list(modules_dict.keys())
+    # Encode the months of every assessment used by a module
+    assessments = list(dict.fromkeys(assessment for module in modules
+                                     for assessment in modules_dict[module]))
+    month_codes, months = get_month_codes(assess_data_df[assessments],
+                                          month_index)
+    positions = {assessment: pos for pos, assessment in enumerate(assessments)}
     # Add each module as a column and populate
     for module in modules:
-        # Add module column
-        assess_data_df[module] = assess_data_df.apply(lambda row: '', axis=1)
-        # Populate module column
-        assess_data_df[module] = assess_data_df.apply(
-                update_module_completion, args=(module, modules_dict,
-                                                month_order,keep,), axis=1)
-    return assess_data_df
-
-
-def add_num_ass_comp(assess_data_df, assessments):
-    """Add a column for number of assessments completed and populate.
-    
-    Adds a column to the dataframe for the Number of assessments completed.
-    Column is populated by counting the number of columns in the row that have
-    a completed assessment (column = TRUE). Column is returned with the number
-    of completed assessments.
-    
-    Args:
-        assess_data_df (dataframe): Assessment data for students.
-        assessments (list): Assessment column headings (assessment names).
-        
-    Returns:
-        assess_data_df (dataframe) Updated with Completed_Assessments column.
-    """
-    # Add column for num
-    assess_data_df['Completed_Assessments'] = assess_data_df.apply(
-            lambda row: 0, axis=1)
-    # Populate the column
-    assess_data_df['Completed_Assessments'] =  assess_data_df.apply(
-            update_num_ass_col, args=(assessments,), axis=1)
-    return assess_data_df
-
-
-def add_num_mod_comp(assess_data_df, modules):
-    """Add a column for number of modules completed and populate.
-    
-    Adds a column to the dataframe for the Number of modules completed.
-    Column is populated by counting the number of columns in the row that have
-    a completed module (column = TRUE). Column is returned with the number
-    of completed modules.
-    
-    Args:
-        assess_data_df (dataframe): Assessment data for students.
-        modules (list): Module column headings (module names).
-        
-    Returns:
-        assess_data_df (dataframe) Updated with Completed_Modules column.
-    """
-    # Add column for num
-    assess_data_df['Completed_Modules'] = assess_data_df.apply(
-            lambda row: 0, axis=1)
-    # Populate the column
-    assess_data_df['Completed_Modules'] =  assess_data_df.apply(
-            update_num_ass_col, args=(modules,), axis=1)
-    return assess_data_df
-
-
-def add_percent_comp(assess_data_df, total):
-    """Add a column for percentage completed and populate.
-    
-    Adds a column to the dataframe for the Percentage of assessments completed.
-    Column is populated by dividing the number of completed assessments by the
-    total number of assessments. Column is returned with the percentage of
-    completed assessments.
-    
-    Args:
-        assess_data_df (dataframe): Assessment data for students.
-        total (int): Total number of assessments in course.
-        
-    Returns:
-        assess_data_df (dataframe) Updated with Completion_Percent column.
-    """
-    # Add column for num
-    assess_data_df['Completion_Percent'] = assess_data_df.apply(
-            lambda row: 0, axis=1)
-    # Populate the column
-    assess_data_df['Completion_Percent'] =  assess_data_df[
-            'Completed_Assessments'].apply(update_perc_comp_col, args=(total,))
+        module_codes = month_codes[:, [positions[assessment] for assessment
+                                       in modules_dict[module]]]
+        # Completed when no assessment is blank
+        completed = (module_codes != MONTH_BLANK).all(axis=1)
+        # Latest month - Transferred only if all assessments transferred
+        latest = module_codes.max(axis=1, initial=MONTH_TRANSFERRED)
+        if not keep:
+            transferred = (module_codes == MONTH_TRANSFERRED).any(axis=1)
+            latest[transferred] = MONTH_TRANSFERRED
+        latest[~completed] = MONTH_BLANK
+        # Store as categories ordered by month
+        latest_codes, category_codes = np.unique(latest, return_inverse=True)
+        assess_data_df[module] = pd.Categorical.from_codes(
+                category_codes, [months[code] for code in latest_codes])
     return assess_data_df
 
 
-def analyse_module():
+def analyse_module(job=None):
     """Analyse completion of a specific module.
     
     Determines the number of students per month that have completed the
     specified module and returns the email address of each student. Students
     that have had one or more assessments transferred are excluded from the
-    analysis.    
+    analysis.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course and module from the job.
     """
     warnings = ['\nProcessing Module Analysis Data Warnings:\n']
     warnings_to_process = False
@@ -166,14 +262,12 @@ def analyse_module():
                       'Months (Short) File',
                       'Student Info File', 'Master Completions File',
                       'Master Completions Headings File']
-    ad.confirm_files('Process Module Analysis Data', required_files)
+    if job is None:
+        ad.confirm_files('Process Module Analysis Data', required_files)
     # Get course code
-    course_code = get_course_code()
-    # Load master file for course
-    print('\nLoading {}...'.format('Master_Completion_{}.csv'.format(
-            course_code)))
-    master_data = ft.load_csv('Master_Completion_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Master_Completion_{}.csv'.format(course_code)))
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Module Analysis')
+    run_log['Course'] = course_code
     # Load Master headings file
     print('\nLoading {}...'.format('Master_Completion_Headings_{}'.format
           (course_code)))
@@ -185,9 +279,9 @@ def analyse_module():
     # Gets EnrolmentID, StudentID, Name, Course
     start_headings = master_headings[:4]
     # Load student data
-    print('\nLoading {}...'.format('Student Info File'))
-    student_info = ft.load_csv('student_info', 'e')
-    print('Loaded {}.'.format('Student Info File'))
+    student_info = time_stage(run_log, 'Load student info', get_job_data, job,
+                              'student_info', 'Student Info File',
+                              ft.load_csv, 'student_info', 'e')
     # Create DataFrame for Student Info
     s_id_col = 'StudentID'
     name_col = 'Name'
@@ -198,9 +292,8 @@ def analyse_module():
     updated_student_headings = [s_id_col, email_col]
     student_info_df = student_info_df[updated_student_headings]
     # Load months order file
-    print('\nLoading {}...'.format('Months (Short) File'))
-    month_order = ft.load_headings('months_short', 'e')
-    print('Loaded {}.'.format('Months (Short) File'))
+    month_index = get_job_data(job, 'month_index', 'Months (Short) File',
+                               load_month_index)
     # Load module names file
     print('\nLoading {}...'.format('Module_Names_{}'.format(course_code)))
     module_names = ft.load_headings('Module_Names_{}'.format(course_code), 'e')
@@ -212,7 +305,7 @@ def analyse_module():
     # Drop entries that are ''
     modules = clean_modules(modules)
     # Get module to process
-    module = get_module_name(module_names)
+    module = job['module'] if job else get_module_name(module_names)
     # print('Selected module is: {}'.format(module))
     # Get module headings
     module_headings = get_module_headings(start_headings,modules, module)
@@ -220,15 +313,23 @@ def analyse_module():
     # Create a dictionary to hold module assessment names
     module_dict = create_module_dict(modules, module)
     # print(module_dict)
-    # Create dataframe for master assessment data
-    assess_data_df = pd.DataFrame(data=master_data, columns=master_headings)
-    # print(assess_data_df)
-    # Drop assessment columns not required
-    assess_data_df = assess_data_df[module_headings]
+    # Load master data for the module assessment columns only
+    if job is None:
+        assess_data_df = time_stage(run_log, 'Load Master Completion',
+                                    load_master, 'Completion', course_code,
+                                    master_headings, module_headings)
+    else:
+        assess_data_df = time_stage(run_log, 'Load Master Completion',
+                                    get_job_data, job,
+                                    'Master_Completion_{}'.format(course_code),
+                                    None, load_master, 'Completion',
+                                    course_code, master_headings)
+        assess_data_df = assess_data_df[module_headings].copy()
     # print(assess_data_df)
     # Add column for date module completed
-    assess_data_df = add_module_cols(assess_data_df, module_dict, month_order,
-                                     False)
+    assess_data_df = time_stage(run_log, 'Add module column', add_module_cols,
+                                assess_data_df, module_dict, month_index,
+                                False)
     # Drop students not completed module or with transferred
     # Convert 'Transferred' to ''
     remove = ['Transferred']
@@ -246,8 +347,9 @@ def analyse_module():
     # Create a dict from months_grouped
     month_completions_dict = months_count.to_dict()
     # Order the dictionary
-    ordered_completion_months = ad.create_ordered_list(month_completions_dict,
-                                                       month_order)
+    ordered_completion_months = [[month, month_completions_dict[month]] for
+                                 month in get_month_order(
+                                 month_completions_dict, month_index)]
     # Save output file for month counts
     month_col = 'Month'
     total_col = 'Total'
@@ -259,8 +361,10 @@ def analyse_module():
                       module_name))
     # Add emails to students
     # Merge dataframes on Student ID columns
-    student_info_months_df = pd.merge(assess_data_df, student_info_df,
-                                   on='StudentID', how='left')
+    student_info_months_df = time_stage(run_log, 'Add student emails',
+                                        pd.merge, assess_data_df,
+                                        student_info_df, on='StudentID',
+                                        how='left')
     # Drop assessment columns
     student_cols = [s_id_col, name_col, email_col, module]
     student_info_months_df = student_info_months_df[student_cols]
@@ -271,14 +375,21 @@ def analyse_module():
     '''
     file_name = '{}_{}_Students_{}.csv'.format(course_code, module_name,
                  ft.generate_time_string())
-    student_info_months_df.to_csv(file_name, index=False)
+    time_stage(run_log, 'Save students', student_info_months_df.to_csv,
+               file_name, index=False)
     print('\nCompleted student information has been saved to {}'.format
           (file_name))
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
     
     
-def analysis():
-    """Analyse data."""
+def analysis(job=None):
+    """Analyse data.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course and filters from the job.
+    """
     warnings = ['\nProcessing Analysis Data Warnings:\n']
     warnings_to_process = False
     print('\nProcessing Analysis Data.')
@@ -292,15 +403,12 @@ def analysis():
                       'Graduation Dates Headings File', 'Enrolment Data File',
                       'Months (Short) File', 'Student Data Headings File',
                       'Module Names File']
-    ad.confirm_files('Process Analysis Data', required_files)
+    if job is None:
+        ad.confirm_files('Process Analysis Data', required_files)
     # Get course code
-    course_code = get_course_code()
-    # Load Master Completion file for course
-    print('\nLoading {}...'.format('Master_Completion_{}.csv'.format(
-            course_code)))
-    master_comp_data = ft.load_csv('Master_Completion_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Master_Completion_{}.csv'.format(course_code)))
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Analysis')
+    run_log['Course'] = course_code
     # Load Master Completion Headings file
     print('\nLoading {}...'.format('Master_Completion_Headings_{}'.format(
             course_code)))
@@ -308,11 +416,11 @@ def analysis():
                                             .format(course_code), 'e')
     print('Loaded {}.'.format('Master_Completion_Headings_{}'.format(
             course_code)))
-    # Load Master Results file for course
-    print('\nLoading {}...'.format('Master_Results_{}.csv'.format(
-            course_code)))
-    master_res_data = ft.load_csv('Master_Results_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Master_Results_{}.csv'.format(course_code)))
+    # Load Master Completion file for course
+    comp_data_df = time_stage(run_log, 'Load Master Completion', get_job_data,
+                              job, 'Master_Completion_{}'.format(course_code),
+                              None, load_master, 'Completion', course_code,
+                              master_comp_headings)
     # Load Master Results Headings file
     print('\nLoading {}...'.format('Master_Results_Headings_{}'.format(
             course_code)))
@@ -320,10 +428,19 @@ def analysis():
             course_code), 'e')
     print('Loaded {}.'.format('Master_Results_Headings_{}'.format(
             course_code)))
+    # Load Master Results file for course
+    res_data_df = time_stage(run_log, 'Load Master Results', get_job_data,
+                             job, 'Master_Results_{}'.format(course_code),
+                             None, load_master, 'Results', course_code,
+                             master_res_headings)
+    # Store Course and the completion months as categories
+    comp_data_df = time_stage(run_log, 'Convert Completion to categories',
+                              convert_to_categories, comp_data_df,
+                              master_comp_headings[3:])
+    res_data_df = convert_to_categories(res_data_df, ['Course'])
     # Load months order file
-    print('\nLoading {}...'.format('Months (Short) File'))
-    month_order = ft.load_headings('months_short', 'e')
-    print('Loaded {}.'.format('Months (Short) File'))
+    month_index = get_job_data(job, 'month_index', 'Months (Short) File',
+                               load_month_index)
     # Load assessment names file
     print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
     assessment_names = ft.load_headings('Assessment_Names_{}'.format(
@@ -335,25 +452,26 @@ def analysis():
     module_names = ft.load_headings('Module_Names_{}'.format(course_code), 'e')
     print('Loaded {}.'.format('Module_Names_{}'.format(course_code)))
     # Load enrolment_data file
-    print('\nLoading {}...'.format('Enrolment Data File'))
-    enrolment_data = ft.load_csv('enrolment_data', 'e')
-    print('Loaded {}.'.format('Enrolment Data File'))
+    enrolment_data = time_stage(run_log, 'Load enrolment data', get_job_data,
+                                job, 'enrolment_data', 'Enrolment Data File',
+                                ft.load_csv, 'enrolment_data', 'e')
     # Load Enrolment Data Headings file
     print('\nLoading {}...'.format('Enrolment Data Headings File'))
     enrol_data_headings = ft.load_headings('Enrolment_Data_Headings', 'e')
     print('Loaded {}.'.format('Enrolment Data Headings File'))
     # Load Student Data
-    print('\nLoading {}...'.format('Student Data File'))
-    student_data = ft.load_csv('student_data', 'e')
-    print('Loaded {}.'.format('Student Data File'))
+    student_data = time_stage(run_log, 'Load student data', get_job_data, job,
+                              'student_data', 'Student Data File',
+                              ft.load_csv, 'student_data', 'e')
     # Load Student Data Headings file
     print('\nLoading {}...'.format('Student Data Headings File'))
     student_data_headings = ft.load_headings('Student_Data_Headings', 'e')
     print('Loaded {}.'.format('Student Data Headings File'))
     # Load Graduation Dates Data
-    print('\nLoading {}...'.format('Graduation Dates Data'))
-    grad_dates_data = ft.load_csv('graduation_dates', 'e')
-    print('Loaded {}.'.format('Graduation Dates Data'))
+    grad_dates_data = time_stage(run_log, 'Load graduation dates',
+                                 get_job_data, job, 'graduation_dates',
+                                 'Graduation Dates Data', ft.load_csv,
+                                 'graduation_dates', 'e')
     # Load Graduation Dates Data Headings file
     print('\nLoading {}...'.format('Graduation Dates Headings File'))
     grad_dates_headings = ft.load_headings('Graduation_Dates_Headings',
@@ -363,9 +481,6 @@ def analysis():
     print('\nLoading {}...'.format('Pacific Island Nations File'))
     island_nations = ft.load_headings('pacific_island_nations.txt')
     print('Loaded {}.'.format('Pacific Island Nations File'))
-    # Create dataframe for Master Completion data
-    comp_data_df = pd.DataFrame(data=master_comp_data,
-                                  columns=master_comp_headings)
     # Create dataframe for enrolment data
     enrol_data_df = pd.DataFrame(data=enrolment_data,
                                  columns=enrol_data_headings)
@@ -375,52 +490,24 @@ def analysis():
     # Create dataframe for graduation data
     grad_data_df = pd.DataFrame(data=grad_dates_data,
                                 columns=grad_dates_headings)
-    # Merge comp_data_df with Enrolments Table data
-    comp_data_df = pd.merge(comp_data_df, enrol_data_df, on='EnrolmentID',
-                         how='left')
-    # Merge comp_data_df with Student Table data
-    comp_data_df = pd.merge(comp_data_df, student_data_df, on='StudentID',
-                         how='left')
-    # Merge comp_data_df with Graduate Dates data
-    comp_data_df = pd.merge(comp_data_df, grad_data_df, on='EnrolmentID',
-                         how='left')
-    # Add column for Pacific Island status to Master Completion
-    comp_data_df['Pacific'] = comp_data_df['Ethnicity'].apply(get_pacific,
-                args=(island_nations,))
-    # Add column for Age at enrolment to Master Completion and populate
-    comp_data_df['Age'] = comp_data_df.apply(lambda x:
-        get_age(x['DateOfBirth'], x['StartDate']), axis=1)
-    # Add column for enrolment length to Master Completion
-    comp_data_df['EnrolLength'] = comp_data_df.apply(lambda x: get_e_length(
-            x['Status'], x['StartDate'], x['ExpiryDate'], x['GraduationDate']
-            ),axis=1)
+    # Create enrolment details once for both masters
+    enrolment_dim = time_stage(run_log, 'Create enrolment details',
+                               create_enrolment_dimension,
+                               (comp_data_df, res_data_df), enrol_data_df,
+                               student_data_df, grad_data_df, island_nations)
+    # Add enrolment details to Master Completion
+    comp_data_df = time_stage(run_log, 'Add details to Completion',
+                              add_enrolment_details, comp_data_df,
+                              enrolment_dim)
     # Temp save
     '''
     file_name = 'Check_merge_comp{}.csv'.format(ft.generate_time_string())
     comp_data_df.to_csv(file_name, index=False)
     '''
-    # Create dataframe for Master Results data
-    res_data_df = pd.DataFrame(data=master_res_data,
-                                  columns=master_res_headings)
-    # Merge res_data_df with Enrolments Table data
-    res_data_df = pd.merge(res_data_df, enrol_data_df, on='EnrolmentID',
-                         how='left')
-    # Merge res_data_df with Student Table data
-    res_data_df = pd.merge(res_data_df, student_data_df, on='StudentID',
-                         how='left')
-    # Merge res_data_df with Graduate Dates data
-    res_data_df = pd.merge(res_data_df, grad_data_df, on='EnrolmentID',
-                         how='left')
-    # Add column for Pacific Island status to Master Results
-    res_data_df['Pacific'] = res_data_df['Ethnicity'].apply(get_pacific,
-                args=(island_nations,))
-    # Add column for Age at enrolment to Master Results and populate
-    res_data_df['Age'] = res_data_df.apply(lambda x: get_age(x['DateOfBirth'],
-               x['StartDate']), axis=1)
-    # Add column for enrolment length to Master Results
-    res_data_df['EnrolLength'] = res_data_df.apply(lambda x: get_e_length(
-            x['Status'], x['StartDate'], x['ExpiryDate'], x['GraduationDate']
-            ),axis=1)
+    # Add enrolment details to Master Results
+    res_data_df = time_stage(run_log, 'Add details to Results',
+                             add_enrolment_details, res_data_df,
+                             enrolment_dim)
     # Temp save
     '''
     file_name = 'Check_merge_res{}.csv'.format(ft.generate_time_string())
@@ -436,15 +523,23 @@ def analysis():
     modules_dict = create_modules_dict(modules)
     # ad.debug_dict(modules_dict)
     # Filter data if required
-    comp_data_df, res_data_df = filtering(comp_data_df, res_data_df)
+    if job is None:
+        comp_data_df, res_data_df = time_stage(run_log, 'Filter data',
+                                               filtering, comp_data_df,
+                                               res_data_df)
+    else:
+        comp_data_df, res_data_df = time_stage(run_log, 'Filter data',
+                                               apply_job_filters,
+                                               comp_data_df, res_data_df,
+                                               job.get('filters', []))
     # Add columns to assessment data for each module
-    comp_data_df = add_module_cols(comp_data_df, modules_dict, month_order)
-    # Add Number of assessments completed column
-    comp_data_df = add_num_ass_comp(comp_data_df, assessment_names)
-    # Add module completion columns
-    comp_data_df = add_num_mod_comp(comp_data_df, module_names)
-    # Add % of course completed column
-    comp_data_df = add_percent_comp(comp_data_df, num_assessments)
+    comp_data_df = time_stage(run_log, 'Add module columns', add_module_cols,
+                              comp_data_df, modules_dict, month_index)
+    # Add number of assessments and modules completed and % of course
+    # completed columns
+    comp_data_df = time_stage(run_log, 'Add completion columns',
+                              add_completion_cols, comp_data_df,
+                              assessment_names, module_names, num_assessments)
     # Temp saving
     '''
     file_name = 'Master_res_check_{}.csv'.format(ft.generate_time_string())
@@ -453,8 +548,15 @@ def analysis():
     # Save Analysis file
     file_name = 'Analysis_{}_{}.csv'.format(course_code,
                           ft.generate_time_string())
-    comp_data_df.to_csv(file_name, index=False)
+    time_stage(run_log, 'Save analysis', comp_data_df.to_csv, file_name,
+               index=False)
     print('\nAnalysis file saved as {}'.format(file_name))
+    if job is not None:
+        # Keep for reports later in the job (as it would be loaded from file)
+        job['data']['Analysis_{}'.format(course_code)] = (
+                comp_data_df.astype(object).fillna('').astype(str)
+                .values.tolist())
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
 
 
@@ -464,167 +566,332 @@ def analysis_message():
     # Get % of assessments completed
 
 
-def apply_age_filter(age, lower, upper):
-    """Convert to NaN ages outside of the provided range.
+def apply_age_filter(ages, lower, upper):
+    """Return a mask of the ages within the provided range.
     
     Args:
-        age (int): Student age.
+        ages (series): Student ages.
         lower (int): Lower boundary of filter.
         upper (int): Upper boundary of filter.
     
     Returns:
-       age (int) Original age or NaN if outside of filter range.
+       mask (series): True for ages in the range. Blank ages are False.
     """
-    if age in (None, ''):
-        return np.nan
-    elif age >= lower and age <= upper:
-        return age
-    else:
-        return np.nan
-    
+    return pd.to_numeric(ages, errors='coerce').between(lower, upper)
+
 
-def apply_course_filter(course, target, wild_cards=True):
-    """Convert to NaN courses not in the target filter.
+def apply_course_filter(courses, target, wild_cards=True):
+    """Return a mask of the courses matching the target filter.
     
     Args:
-        course (str): Student course.
+        courses (series): Student courses.
         target (str): Course code or base code to be searched for.
         wild_cards (bool): If True, .+ used either side of course code. Used if
         looking at study type etc. If False, .+ not used, e.g. for searching
         for a specific course.
     
     Returns:
-       course (str) Original course or NaN if outside of filter target.
+       mask (series): True for courses matching the target. Blank courses are
+       False.
     """
     if wild_cards:
         wild = '.+'
     else:
         wild = ''
-    if course in (None, ''):
-        return np.nan
-    elif re.search('{}{}{}'.format(wild, target, wild), course):
-        return course
-    else:
-        return np.nan
+    return courses.str.contains('{}{}{}'.format(wild, target, wild),
+                                regex=True, na=False).astype(bool)
 
 
-def apply_el_filter_above(enrolment_length, minimum):
-    """Convert to NaN enrolment lengths not above or equal to minimum.
+def apply_el_filter_above(enrolment_lengths, minimum):
+    """Return a mask of the enrolment lengths above or equal to minimum.
     
     Args:
-       enrolment_length (int): Length of enrolment.
+       enrolment_lengths (series): Lengths of enrolment.
        minimum (int): Minimum allowed enrolment length.
     
     Returns:
-       enrolment_length (int): Original enrolment length or NaN if less than
-       minimum.
+       mask (series): True for enrolment lengths of at least minimum. Blank
+       enrolment lengths are False.
     """
-    if enrolment_length in (None, ''):
-        return np.nan
-    elif enrolment_length >= minimum:
-        return enrolment_length
-    else:
-        return np.nan
+    return pd.to_numeric(enrolment_lengths, errors='coerce') >= minimum
 
 
-def apply_el_filter_below(enrolment_length, maximum):
-    """Convert to NaN enrolment lengths not below or equal to maximum.
+def apply_el_filter_below(enrolment_lengths, maximum):
+    """Return a mask of the enrolment lengths below or equal to maximum.
     
     Args:
-       enrolment_length (int): Length of enrolment.
+       enrolment_lengths (series): Lengths of enrolment.
        maximum (int): Maximum allowed enrolment length.
     
     Returns:
-       enrolment_length (int): Original enrolment length or NaN if greater than
-       maximum.
+       mask (series): True for enrolment lengths of at most maximum. Blank
+       enrolment lengths are False.
     """
-    if enrolment_length in (None, ''):
-        return np.nan
-    elif enrolment_length <= maximum:
-        return enrolment_length
-    else:
-        return np.nan
+    return pd.to_numeric(enrolment_lengths, errors='coerce') <= maximum
 
 
-def apply_el_filter_between(enrolment_length, minimum, maximum):
-    """Convert to NaN enrolment lengths not between required range.
+def apply_el_filter_between(enrolment_lengths, minimum, maximum):
+    """Return a mask of the enrolment lengths in the required range.
     
     Args:
-       enrolment_length (int): Length of enrolment.
+       enrolment_lengths (series): Lengths of enrolment.
        minimum (int): Minimum allowed enrolment length.
        maximum (int): Maximum allowed enrolment length.
     
     Returns:
-       enrolment_length (int): Original enrolment length or NaN if not in
-       allowed range.
+       mask (series): True for enrolment lengths in the range. Blank
+       enrolment lengths are False.
     """
-    if enrolment_length in (None, ''):
-        return np.nan
-    elif enrolment_length >= minimum and enrolment_length <= maximum:
-        return enrolment_length
-    else:
-        return np.nan
+    return pd.to_numeric(enrolment_lengths, errors='coerce').between(minimum,
+                                                                     maximum)
 
 
-def apply_filter(value, filter_value, keep=True):
-    """Convert to NaN students not matching the filter_value.
+def apply_filter(values, filter_value, keep=True):
+    """Return a mask of the students matching the filter_value.
     
-    Drops students that do not match the filter_value. If keep = False,
-    drops students that do match the target_value.
+    Keeps students that match the filter_value. If keep = False, keeps
+    students that do not match the filter_value. Students with a blank value
+    are never kept.
     
     Args:
-        value (str): Value for student.
-        target_value (str): Value to filter on.
-        keep (bool): True then drop non-matching students, False then
-        drop matching students.
+        values (series): Value for each student.
+        filter_value (str): Value to filter on.
+        keep (bool): True then keep matching students, False then keep
+        non-matching students.
     
     Returns:
-       value (str): Original value or NaN if outside filter.
+       mask (series): True for students to keep.
     """
-    if value in (None, ''):
-        return np.nan
-    # Removing non-matching students
+    present = values.notna() & (values != '')
     if keep:
-        if value == filter_value:
-            return value
-        else:
-            return np.nan
-    # Removing matching students
-    else:
-        if value == filter_value:
-            return np.nan
+        return present & (values == filter_value)
+    return present & (values != filter_value)
+
+
+def apply_filter_option(filter_group, filter_option, comp_data, res_data,
+                        age_range=None, el_limits=None):
+    """Return the masks for a filter of the Completion and Results data.
+    
+    Args:
+        filter_group (str): Filter group, e.g. Age, Gender.
+        filter_option (str): Filter option to be applied.
+        comp_data (dataframe): Completion data.
+        res_data (dataframe): Results data.
+        age_range (tuple): Lower and upper values for age filters.
+        el_limits (tuple): Days enrolled for enrolment length filters (see
+        process_el_filter). Asked for if not passed.
+        
+    Returns:
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
+    """
+    if filter_group == 'Age':
+        # Send to age processing function
+        lower, upper = age_range
+        return process_age_filter(lower, upper, comp_data, res_data)
+    elif filter_group == 'Course':
+        # Send to course processing function
+        return process_course_filter(filter_option, comp_data, res_data)
+    elif filter_group == 'Enrolment Length':
+        # Send to enrolment length processing function
+        return process_el_filter(filter_option, comp_data, res_data,
+                                 el_limits)
+    elif filter_group == 'Ethnicity':
+        # Send to ethnicity processing function
+        return process_ethnicity_filter(filter_option, comp_data, res_data)
+    elif filter_group == 'Gender':
+        # Send to gender processing function
+        return process_gender_filter(filter_option, comp_data, res_data)
+    elif filter_group == 'Status':
+        # Send to status processing function
+        return process_status_filter(filter_option, comp_data, res_data)
+    elif filter_group == 'Tutor':
+        # Send to tutor processing function
+        return process_tutor_filter(filter_option, comp_data, res_data)
+    return create_filter_masks(comp_data, res_data, False)
+
+
+def apply_job_filters(comp_data, res_data, filters):
+    """Apply the filters listed for an action in a job file.
+    
+    The masks of the filters are combined and the data is filtered once all
+    of the filters have been found. Values that would be asked for are taken
+    from the job. Filter options that are not finished, or that would ask for
+    a value that can not be given in the job, are not applied.
+    
+    Args:
+        comp_data (dataframe): Master Completion data.
+        res_data (dataframe): Master Results data.
+        filters (list): Filters to apply. Each filter is a list of the filter
+        group and filter option, followed by the values for the option:
+            - Specified range: lower and upper age, e.g.
+            ['Age', 'Specified range', 20, 30]
+            - No more than x days enrolled: maximum days
+            - No less than x days enrolled: minimum days
+            - Between x and y days enrolled: minimum and maximum days
+    
+    Return:
+        filtered_comp_data (dataframe): Filtered Master Completion data.
+        filtered_res_data (dataframe): Filtered Master Results data.
+    """
+    applied_filters = []
+    masks = create_filter_masks(comp_data, res_data)
+    # Options that are not finished or use a fixed value
+    unsupported = ['Specific course students', 'Specific ethnicity students',
+                   'Filter on multiple ethnicities', 'Multiple',
+                   'Specific tutor', 'Filter on multiple tutors']
+    # Number of values needed for options that ask for values
+    num_values = {'Specified range': 2, 'No more than x days enrolled': 1,
+                  'No less than x days enrolled': 1,
+                  'Between x and y days enrolled': 2}
+    for job_filter in filters:
+        filter_group, filter_option = job_filter[:2]
+        values = tuple(job_filter[2:])
+        if filter_option in unsupported:
+            print('\n{} can not be used in a job file. The filter will not be '
+                  'used.'.format(filter_option))
+            continue
+        if len(values) != num_values.get(filter_option, 0):
+            print('\n{} needs {} values in the job file. The filter will not '
+                  'be used.'.format(filter_option,
+                                    num_values.get(filter_option, 0)))
+            continue
+        age_range = None
+        el_limits = None
+        if filter_group == 'Age':
+            if filter_option == 'Specified range':
+                age_range = values
+            else:
+                age_range = get_age_range(filter_option)
+            if age_range is None:
+                print('\n{} is not an Age filter option. The filter will not '
+                      'be used.'.format(filter_option))
+                continue
+        elif filter_group == 'Enrolment Length':
+            el_limits = values
+        masks, valid_filter = combine_filter_masks(masks, apply_filter_option(
+                filter_group, filter_option, comp_data, res_data, age_range,
+                el_limits))
+        if valid_filter:
+            applied_filters.append(filter_option)
         else:
-            return value
+            print('\n{} resulted in 0 students being returned. For this '
+                  'reason the filter will not be used. Data stays the same'
+                  '.'.format(filter_option))
+    if applied_filters:
+        display_applied_filters(applied_filters)
+        return comp_data[masks[0]], res_data[masks[1]]
+    print('\nNo filters will be applied to the data.')
+    return comp_data, res_data
+
+
+def apply_master_delta(master, master_delta):
+    """Apply changes held in a master delta to the master.
+    
+    Updates each changed cell in place and adds new students to the end of
+    the master. Called once when the master is saved so that the master is
+    not copied for each update.
+    
+    Args:
+        master (list): Master record for each student.
+        master_delta (dict): Changed cells and new students.
+        
+    Returns:
+        master (list): Master with changes applied.
+    """
+    for position, changes in master_delta['cells'].items():
+        for col, value in changes.items():
+            master[position][col] = value
+    master.extend(master_delta['rows'])
+    return master
+
+
+def apply_master_journal(master_df, journal_df):
+    """Apply changes in a master journal to master data.
+    
+    Each journal entry sets a cell for a student. Entries are applied in the
+    order they were recorded so the last entry for a cell is kept. Students
+    not in the master are added to the end in the order they were recorded.
+    
+    Args:
+        master_df (dataframe): Master file data.
+        journal_df (dataframe): Journal entries (EnrolmentID, Column, Value,
+        Source, Timestamp).
+        
+    Returns:
+        master_df (dataframe): Master data with journal entries applied.
+    """
+    headings = list(master_df.columns)
+    # Only apply entries for loaded columns
+    journal_df = journal_df[journal_df['Column'].isin(headings)]
+    if journal_df.empty:
+        return master_df
+    students = pd.Index(journal_df['EnrolmentID'].unique())
+    new_students = students[~students.isin(master_df['EnrolmentID'])]
+    # Keep the last value recorded for each cell
+    journal_df = journal_df.drop_duplicates(subset=['EnrolmentID', 'Column'],
+                                            keep='last')
+    changes = journal_df.pivot(index='EnrolmentID', columns='Column',
+                               values='Value')
+    master_df = master_df.set_index('EnrolmentID')
+    new_df = pd.DataFrame('', index=new_students, columns=master_df.columns)
+    master_df = pd.concat([master_df, new_df])
+    master_df.update(changes)
+    master_df.index.name = 'EnrolmentID'
+    return master_df.reset_index()[headings]
 
 
 def apply_pacific_filter(pacific, keep=True):
-    """Convert to NaN students not of Pacific ethnicity.
+    """Return a mask of the students of Pacific ethnicity.
     
-    Drops students that do not have Yes in Pacific column. If keep = False,
-    drops students that are of Pacific ethnicity.
+    Keeps students that have Yes in Pacific column. If keep = False, keeps
+    students that are not of Pacific ethnicity.
     
     Args:
-        pacific (str): Value of Pacific column (Yes, No).
-        keep (bool): True then drop non-pacific students, False then drop
-        pacific students.
+        pacific (series): Value of Pacific column (Yes, No).
+        keep (bool): True then keep pacific students, False then keep
+        non-pacific students.
     
     Returns:
-       pacific (str): Original Pacific value or NaN if outside filter.
+       mask (series): True for students to keep.
     """
-    if pacific in (None, ''):
-        return np.nan
-    # Removing non-pacific students
-    if keep:
-        if pacific == 'Yes':
-            return pacific
-        else:
-            return np.nan
-    # Removing pacific students
-    else:
-        if pacific == 'Yes':
-            return np.nan
-        else:
-            return pacific
+    return apply_filter(pacific, 'Yes', keep)
+
+
+def check_applied_export(applied, source, file_types, row_hashes=None):
+    """Check if an export has already been applied to the masters.
+    
+    Also records the export as the one being applied (see
+    save_applied_export).
+    
+    Args:
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports).
+        source (str): Fingerprint of the Assessment Data File.
+        file_types (list): Masters being updated, from: Completion, Results.
+        row_hashes (index): Fingerprint of each row of the export. None if
+        the rows have not been read yet (they are counted as they are
+        read).
+        
+    Returns:
+        True if the export has been applied to each master. Rows that could
+        not be matched to a student (e.g. unknown names) were saved for
+        manual processing when it was applied.
+        False if not.
+    """
+    applied['export'] = {'Source': source, 'Rows': 0, 'Pending': 0,
+                         'New': 0, 'Row hashes': row_hashes}
+    if row_hashes is not None:
+        applied['export']['Rows'] = len(row_hashes)
+    exports = applied['exports']
+    for file_type in file_types:
+        match = exports[(exports['Master'] == file_type) &
+                        (exports['Source'] == source)]
+        if row_hashes is not None:
+            match = match[match['Rows'] == str(len(row_hashes))]
+        if match.empty:
+            return False
+    return True
 
 
 def check_assesment(completed=True):
@@ -685,23 +952,6 @@ def check_df(dataframe):
         return
 
 
-def check_scores(score, grade_item, passing_scores):
-    """Return score if passing or nan if not.
-    
-    Finds the minimum passing score for the grade item in the passing_scores
-    dictionary and determines if the provided score is a passing score.
-    
-    Args:
-        score (int): Revised grade for assessment.
-        grade_item (str): Assessment task name.
-        passing_scores (dict): Minimum passing score for each assessment.
-    """
-    if score >= passing_scores[grade_item]: # passing score
-        return score
-    else:
-        return np.nan
-
-
 def clean_modules(modules):
     """Remove empty items from modules list.
     
@@ -729,6 +979,28 @@ def clean_modules(modules):
     return modules                
 
 
+def combine_filter_masks(masks, filter_masks):
+    """Combine the masks of a filter with the masks of the applied filters.
+    
+    The filter is only added if at least one row of both the Completion and
+    Results data still meets every filter.
+    
+    Args:
+        masks (tuple): Completion and Results masks of the applied filters.
+        filter_masks (tuple): Completion and Results masks of the filter.
+    
+    Returns:
+        masks (tuple): Combined masks, or the passed masks if the filter was
+        not added.
+        valid_filter (bool): True if filter has been added, False if not.
+    """
+    comp_mask = masks[0] & filter_masks[0]
+    res_mask = masks[1] & filter_masks[1]
+    if not comp_mask.any() or not res_mask.any():
+        return masks, False
+    return (comp_mask, res_mask), True
+
+
 def convert_grade_item(item, grades_dict):
     """Converts a Grade item into the correct heading value.
     
@@ -747,21 +1019,51 @@ def convert_grade_item(item, grades_dict):
     return grades_dict[item]
 
 
-def convert_month(month, month_order):
+def convert_month(month, month_index):
     """Converts a month into an int for its place in the order of months.
     
-    month_order is a dictionary holding each month. Values are an int stating
-    the position of the month in the order, oldest first. Function converts
-    the passed month to an int that represents its position in month_order.
-    Older months will have a lower int value. Months can then be sorted based
-    on their int (position in month_order).
+    The code for a month is its year multiplied by 12 plus its position in the
+    year, so older months have a lower int and months can be sorted and
+    compared on their int. Months in the month index are looked up and any
+    other month in the format Mmm-YY is calculated.
     
     Args:
         month (str): Month and Year passed.
-        month_order (dict): Keys are month + year combinations and values are
-        the position of the month + year combination in month_order.
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
+    
+    Returns:
+        code (int): Code for the month. None if month is not in the format
+        Mmm-YY.
+    """
+    if month in month_index:
+        return month_index[month]
+    name, _, year = str(month).partition('-')
+    if name[:3].title() not in MONTH_NAMES or not year.isdigit():
+        return None
+    year = int(year)
+    if year < 100:
+        year += 2000
+    return year * 12 + MONTH_NAMES.index(name[:3].title())
+
+
+def convert_to_categories(data_df, columns):
+    """Return the dataframe with the columns stored as categories.
+    
+    Each distinct value of a column is stored once and each row holds a small
+    int code, so repeated values such as Status, Gender and the completion
+    months use less memory, and filters and group-bys work on the codes.
+    Columns that are not in the dataframe are ignored.
+    
+    Args:
+        data_df (dataframe): Data to convert.
+        columns (list): Columns to store as categories.
+    
+    Returns:
+        data_df (dataframe): Copy of the data with the columns converted.
     """
-    return month_order[month]
+    return data_df.astype({col: 'category' for col in columns
+                           if col in data_df.columns})
 
 
 def convert_scores(scores):
@@ -786,6 +1088,68 @@ def convert_scores(scores):
     return updated_scores
 
 
+def create_enrolment_dimension(master_dfs, enrol_data_df, student_data_df,
+                               grad_data_df, island_nations, as_of=None):
+    """Return the enrolment details for the students in the masters.
+    
+    The enrolment, student and graduation details are merged once for each
+    EnrolmentID in the masters, and the Pacific, Age and EnrolLength columns
+    are added. Status, Gender, Ethnicity and Pacific are stored as categories.
+    The details can then be joined to each master (see add_enrolment_details).
+    
+    Args:
+        master_dfs (tuple): Master Completion and Results dataframes.
+        enrol_data_df (dataframe): Enrolment data.
+        student_data_df (dataframe): Student data.
+        grad_data_df (dataframe): Graduation dates data.
+        island_nations (list): Pacific Island nations.
+        as_of (datetime): Date enrolment lengths are calculated to for Active
+        and Suspended students. Today's date if not passed.
+    
+    Returns:
+        enrolment_dim (dataframe): Enrolment details indexed by EnrolmentID.
+    """
+    # Each enrolment in the masters with its student
+    id_cols = ['EnrolmentID', 'StudentID']
+    enrolment_dim = pd.concat([master_df[id_cols] for master_df in
+                               master_dfs]).drop_duplicates('EnrolmentID')
+    # Merge with Enrolments Table data
+    enrolment_dim = pd.merge(enrolment_dim, enrol_data_df, on='EnrolmentID',
+                             how='left')
+    # Merge with Student Table data
+    enrolment_dim = pd.merge(enrolment_dim, student_data_df, on='StudentID',
+                             how='left')
+    # Merge with Graduate Dates data
+    enrolment_dim = pd.merge(enrolment_dim, grad_data_df, on='EnrolmentID',
+                             how='left')
+    # Add column for Pacific Island status
+    enrolment_dim['Pacific'] = enrolment_dim['Ethnicity'].apply(get_pacific,
+                 args=(island_nations,))
+    # Add columns for Age at enrolment and enrolment length
+    enrolment_dim = add_age_length_cols(enrolment_dim, as_of)
+    # Store repeated values as categories
+    enrolment_dim = convert_to_categories(enrolment_dim, ['Status', 'Gender',
+                                          'Ethnicity', 'Pacific'])
+    return enrolment_dim.set_index('EnrolmentID')
+
+
+def create_filter_masks(comp_data, res_data, keep=True):
+    """Return masks that keep (or drop) every row of the data.
+    
+    Args:
+        comp_data (dataframe): Completion data.
+        res_data (dataframe): Results data.
+        keep (bool): True for masks that keep every row, False for masks that
+        drop every row.
+    
+    Returns:
+        comp_mask (series): Mask for the Completion data.
+        res_mask (series): Mask for the Results data.
+    """
+    return (pd.Series(keep, index=comp_data.index),
+            pd.Series(keep, index=res_data.index))
+
+
 def create_grades_dict(assessments, master_headings):
     """Create dictionary to hold assessment names for results.
     
@@ -811,6 +1175,90 @@ def create_grades_dict(assessments, master_headings):
     return grades_dict
 
 
+def create_name_index(enrolments, source):
+    """Create the name index for a course from its enrolments.
+    
+    Each name is given the IDs and Course of its first enrolment. Names shared
+    by more than one student are flagged as ambiguous as their assessments
+    cannot be matched to a student by name.
+    
+    Args:
+        enrolments (list): Enrolment data (EnrolmentID, StudentID, Course,
+        Name) for each enrolment.
+        source (str): Fingerprint of the Enrolment IDs File.
+        
+    Returns:
+        name_index (dataframe): Name, EnrolmentID, StudentID, Course,
+        Ambiguous and Source for each name.
+    """
+    headings = ['EnrolmentID', 'StudentID', 'Course', 'Name']
+    enrolments_df = pd.DataFrame(data=[enrolment[:4] for enrolment in
+                                       enrolments], columns=headings)
+    num_students = enrolments_df.groupby('Name')['StudentID'].transform(
+            'nunique')
+    enrolments_df['Ambiguous'] = num_students > 1
+    name_index = enrolments_df.drop_duplicates(subset=['Name'])
+    name_index = name_index[['Name', 'EnrolmentID', 'StudentID', 'Course',
+                             'Ambiguous']].reset_index(drop=True)
+    name_index['Source'] = source
+    return name_index
+
+
+def create_progress(total, interval=0.5):
+    """Create a progress display for a loop.
+    
+    The display is only updated every interval seconds and is not shown if
+    output is not to a terminal (e.g. in a batch update or job log).
+    
+    Args:
+        total (int): Number of items in the loop.
+        interval (float): Minimum seconds between updates of the display.
+        
+    Returns:
+        progress (dict): Progress for the loop (see update_progress).
+    """
+    start = time.perf_counter()
+    return {'total': total, 'done': 0, 'start': start, 'last': start,
+            'interval': interval, 'width': 0, 'display': sys.stdout.isatty()}
+
+
+def create_run_log(action, trace_memory=None):
+    """Create a run log to record the time and memory used by an action.
+    
+    The peak memory of the process is recorded for each stage. Memory
+    tracing, which finds the memory allocated by each stage but slows the
+    stages down, is only used if trace_memory is True or the
+    ASSESSMENTS_TRACE_MEMORY environment variable is set to 1.
+    
+    Args:
+        action (str): Name of the action being run.
+        trace_memory (bool): True to trace the memory allocated by each
+        stage. Uses ASSESSMENTS_TRACE_MEMORY if not passed.
+        
+    Returns:
+        run_log (dict): Empty run log for the action.
+    """
+    if trace_memory is None:
+        trace_memory = os.environ.get('ASSESSMENTS_TRACE_MEMORY') == '1'
+    return {'Run': ft.generate_time_string(), 'Action': action,
+            'Course': '', 'Stages': [], 'Trace memory': trace_memory}
+
+
+def create_master_delta():
+    """Create dictionary to hold changes to a master file.
+    
+    Changes are held separately from the loaded master so that the master
+    does not need to be copied to be updated. 'cells' holds the changed cells
+    of students already in the master, by position of the student and then
+    position of the column. 'rows' holds new students, in the order they are
+    added to the master.
+        
+    Returns:
+        master_delta (dict): Empty changes for a master file.
+    """
+    return {'cells': {}, 'rows': []}
+
+
 def create_master_file(file_type):
     """Create a master file for a course.
     
@@ -848,6 +1296,32 @@ def create_master_file(file_type):
     ft.process_warning_log(warnings, warnings_to_process)
 
 
+def create_master_index(master):
+    """Create dictionary to locate each student in a master file.
+    
+    Takes the EnrolmentID (first item) of each student in the master file and
+    sets it as a dictionary key, with the position of the student in the
+    master as the value. Used to find a student in O(1) rather than searching
+    the master for each assessment. Where an EnrolmentID appears more than
+    once, the first position is kept so that the same row is updated as when
+    searching the master in order.
+    
+    Args:
+        master (list): Master record of all assessments for each student.
+        
+    Returns:
+        master_index (dict): Dictionary with each EnrolmentID as a key and the
+        position of the student in master as the value.
+    """
+    master_index = {}
+    n = 0
+    for student in master:
+        if student[0] not in master_index:
+            master_index[student[0]] = n
+        n += 1
+    return master_index
+
+
 def create_module_dict(modules, target_module):
     """Create dictionary to hold assessment names for one module.
     
@@ -892,6 +1366,24 @@ def create_modules_dict(modules):
     return module_dict     
 
 
+def create_month_index(month_order):
+    """Return the month index for the order of months.
+    
+    Each month is converted to its code once so that the codes can be shared
+    by the functions that order or compare months.
+    
+    Args:
+        month_order (list): List with each month in order.
+    
+    Returns:
+        month_index (dict): Keys are months and values are their codes.
+    """
+    month_index = {}
+    for month in month_order:
+        month_index[month] = convert_month(month, month_index)
+    return month_index
+
+
 def display_avail_filter_groups():
     """Display filter group options."""
     print('\nAvailable filter groups:')
@@ -939,8 +1431,45 @@ def display_current_filters(filters):
     return
 
 
-def extract_comp_students(student_data, valid_students, min_comp, max_comp):
-    """Return students with completion % in the passed range.
+def export_master_files(job=None):
+    """Export the Master Completion and Master Results files to CSV.
+    
+    Masters are updated in columnar format with a journal of changes. This
+    saves a CSV copy of each master for the course, including all changes.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course from the job.
+    """
+    warnings = ['\nProcessing Master File Export Data Warnings:\n']
+    warnings_to_process = False
+    print('\nProcessing Master File Export Data.')
+    # Get course code
+    course_code = job['course'] if job else get_course_code()
+    for file_type in ['Completion', 'Results']:
+        if not get_master_source(file_type, course_code):
+            warnings.append('There is no Master {} File for {}.'.format(
+                    file_type, course_code))
+            warnings_to_process = True
+            continue
+        # Load Master headings file
+        print('\nLoading {}...'.format('Master_{}_Headings_{}'.format(
+                file_type, course_code)))
+        master_headings = ft.load_headings('Master_{}_Headings_{}'.format(
+                file_type, course_code), 'e')
+        print('Loaded {}.'.format('Master_{}_Headings_{}'.format(file_type,
+              course_code)))
+        master_df = get_job_data(job, 'Master_{}_{}'.format(file_type,
+                                 course_code), None, load_master, file_type,
+                                 course_code, master_headings)
+        master_name = 'Master_{}_{}_'.format(file_type, course_code)
+        ft.save_list_csv(master_df.values.tolist(), master_headings,
+                         master_name)
+    ft.process_warning_log(warnings, warnings_to_process)
+
+
+def extract_comp_students(student_data, valid_students, min_comp, max_comp):
+    """Return students with completion % in the passed range.
     
     Retruns students from valid_students that are in student_data and have
     their completion status fall within the min and max completion %.
@@ -964,13 +1493,10 @@ def extract_comp_students(student_data, valid_students, min_comp, max_comp):
     # List of enrolment ids in student_data
     analysis_students = ad.extract_list_item(student_data, 0)
     warnings = ['\nExtracting Students Warnings:\n']
-    num_students = len(valid_students) # For calculating % complete
-    n = 0
+    progress = create_progress(len(valid_students))
     for student in valid_students:
         # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Check if student is in student data
         if student not in analysis_students:
             warnings.append('Enrolment ID {} is not in the Analysis '
@@ -992,6 +1518,7 @@ def extract_comp_students(student_data, valid_students, min_comp, max_comp):
                             this_student.append(analysis_student[i])
                         students.append(this_student)
                         break             
+    finish_progress(progress)
     # Check if any warnings have been identified, return if they have
     if len(warnings) > 1:
         return students, True, warnings
@@ -999,52 +1526,37 @@ def extract_comp_students(student_data, valid_students, min_comp, max_comp):
         return students, False, warnings
 
 
-def extract_day_month_year(date_data):
-    """Extract day, month and year from date time data.
-    
-    Finds the day, month and year and returns as a string.
-    
-    Args:
-        date_data (str): Time stame information.
-        
-    Returns:
-        extracted_date (str): Day + Month + Year.
-    """
-    # Find first space
-    first_space = date_data.index(' ')
-    # Find second space
-    first_slice = date_data[first_space+1:]
-    comma = first_slice.index(',')
-    extracted_date = first_slice[:comma]
-    # Return from the Day number up to the end of the Year
-    return extracted_date
-    
-
-def extract_month_year(date_data):
-    """Extract month and year from date time data.
+def extract_dates(date_data):
+    """Extract the completion month and date from date time data.
     
-    Finds the month and year and returns as a string.
+    The day, month and year are taken from between the first space and the
+    next comma of each timestamp (e.g. 'Monday, 3 June 2019, 10:15 AM') and
+    parsed with an explicit format for the whole column at once.
     
     Args:
-        date_data (str): Time stame information.
+        date_data (series): Time stamp information.
         
     Returns:
-        extracted_date (str): Month + Year.
+        months (series): Month and Year as Mmm-YY.
+        dates (series): Date as DD/MM/YYYY.
+        unparsed (set): Time stamps that could not be read.
     """
-    # Find first space
-    first_space = date_data.index(' ')
-    # Find second space
-    first_slice = date_data[first_space+1:]
-    second_space = first_slice.index(' ')
-    # Find next comma
-    second_slice = first_slice[second_space+1:]
-    comma = second_slice.index(',')
-    return second_slice[:comma]
+    day_month_year = date_data.astype(str).str.extract(r'^\S+ ([^,]+),',
+                                                       expand=False)
+    parsed = pd.to_datetime(day_month_year, format='%d %B %Y',
+                            errors='coerce')
+    unparsed = set(date_data[parsed.isna()])
+    months = parsed.dt.strftime('%b-%y')
+    dates = parsed.dt.strftime('%d/%m/%Y')
+    return months, dates, unparsed
 
 
 def filtering(comp_data, res_data):
     """Get and apply filters to data prior to analysis.
     
+    The masks of the selected filters are combined and the data is filtered
+    once the filters are kept.
+    
     Args:
         comp_data (dataframe): Master Completion data.
         res_data (dataframe): Master Results data.
@@ -1053,11 +1565,9 @@ def filtering(comp_data, res_data):
         filtered_comp_data (dataframe): Filtered Master Completion data.
         filtered_res_data (dataframe): Filtered Master Results data.
     """
-    # Make copy of dataframes in case need to revert
-    f_comp_data = comp_data.copy()
-    f_res_data = res_data.copy()
-    # Hold applied filters
+    # Hold applied filters and the rows meeting them
     filters = []
+    masks = create_filter_masks(comp_data, res_data)
     # Present filter group options and get filter
     while True:
         # Display current filters
@@ -1068,7 +1578,7 @@ def filtering(comp_data, res_data):
             if filters: # One or more filter selected
                 if keep_filters():
                     display_applied_filters(filters)
-                    return f_comp_data, f_res_data
+                    return comp_data[masks[0]], res_data[masks[1]]
                 else:
                     print('\nNo filters will be applied to the data.')
                     return comp_data, res_data
@@ -1088,34 +1598,11 @@ def filtering(comp_data, res_data):
         # Apply the selected filter
         if filter_group == 'Age':
             # Get lower and upper values
-            lower, upper = get_age_range(filter_option)
-            # Send to age processing function
-            f_comp_data, f_res_data, valid_filter = process_age_filter(
-                    lower, upper, f_comp_data, f_res_data)
-        elif filter_group == 'Course':
-            # Send to course processing function
-            f_comp_data, f_res_data, valid_filter = process_course_filter(
-                    filter_option, f_comp_data, f_res_data)
-        elif filter_group == 'Enrolment Length':
-            # Send to enrolment length processing function
-            f_comp_data, f_res_data, valid_filter = process_el_filter(
-                    filter_option, f_comp_data, f_res_data)
-        elif filter_group == 'Ethnicity':
-            # Send to ethnicity processing function
-            f_comp_data, f_res_data, valid_filter = process_ethnicity_filter(
-                    filter_option, f_comp_data, f_res_data)
-        elif filter_group == 'Gender':
-            # Send to gender processing function
-            f_comp_data, f_res_data, valid_filter = process_gender_filter(
-                    filter_option, f_comp_data, f_res_data)
-        elif filter_group == 'Status':
-            # Send to status processing function
-            f_comp_data, f_res_data, valid_filter = process_status_filter(
-                    filter_option, f_comp_data, f_res_data)
-        elif filter_group == 'Tutor':
-            # Send to tutor processing function
-            f_comp_data, f_res_data, valid_filter = process_tutor_filter(
-                    filter_option, f_comp_data, f_res_data)
+            age_range = get_age_range(filter_option)
+        else:
+            age_range = None
+        masks, valid_filter = combine_filter_masks(masks, apply_filter_option(
+                filter_group, filter_option, comp_data, res_data, age_range))
         if valid_filter:
             # Add filter to the filters list if it was applied
             filters.append(filter_option)
@@ -1197,35 +1684,37 @@ def filter_options_tutor_message():
     print('3. No further filter')
 
 
-def find_transferred(feedback):
+def find_transferred(feedback, transfer_pattern):
     """Find students that have been transferred.
     
-    Examines the feedback text for the student and looks for a note that the
-    student has been transferred. If not found, column is set to 'NA' so that
-    it can be dropped in a future step.
+    Examines the feedback text for each student and looks for a note that the
+    student has been transferred. The whole column is searched at once with
+    the transfer pattern. Entries that are not transfers are set to nan so
+    that they can be dropped in a future step.
     
     Args:
-        feedback (str): Feedback column for student.
+        feedback (series): Feedback column for students.
+        transfer_pattern (re.Pattern): Pattern from get_transfer_pattern.
         
     Returns:
-        (str): 'Transferred' if transferred, 'NA' if not.
+        transferred (series): 'Transfer' if transferred, nan if not.
+        reasons (series): Phrase that was matched (lower case) for each
+        transfer, nan if not transferred.
     """
-    if feedback in ('', None):
-        return np.nan
-    elif re.search('.+transfer.+', feedback.lower()):
-        return 'Transfer'
-    elif re.search('transfer.+', feedback.lower()):
-        return 'Transfer'
-    elif re.search('.+cross credit.+', feedback.lower()):
-        return 'Transfer'
-    elif re.search('cross credit.+', feedback.lower()):
-        return 'Transfer'
-    elif re.search('cross credit', feedback.lower()):
-        return 'Transfer'
-    elif re.search('transfer', feedback.lower()):
-        return 'Transfer'
-    else:
-        return np.nan
+    reasons = feedback.fillna('').str.extract(transfer_pattern,
+                                               expand=False).str.lower()
+    transferred = reasons.mask(reasons.notna(), 'Transfer')
+    return transferred, reasons
+
+
+def finish_progress(progress):
+    """Clear a progress display once its loop has finished.
+    
+    Args:
+        progress (dict): Progress for the loop (see create_progress).
+    """
+    if progress['display'] and progress['width']:
+        print('\r{}\r'.format(' ' * progress['width']), end='', flush=True)
 
 
 def float_perc_to_string(value):
@@ -1245,27 +1734,6 @@ def float_perc_to_string(value):
     return '{}%'.format(val[:place])
 
 
-def get_age(date_of_birth, enrolment_date):
-    """Return age based on enrolment date.
-    
-    Args:
-        date_of_birth (date): Date of birth in format DD/MM/YYYY.
-        enrolment_date (date): Enrolment date in format DD/MM/YYYY.
-        
-    Returns:
-        age (int): Age in years.
-    """
-    # Skip empty Date of Birth columns
-    if date_of_birth in (None, '', np.nan):
-        return ''
-    # Convert date_of_birth to format YYYY-MM-DD
-    updated_date = da.convert_to_datetime(date_of_birth, "%d/%m/%Y")
-    # Convert enrolment_date to format YYYY-MM-DD
-    updated_enrolment = da.convert_to_datetime(enrolment_date, "%d/%m/%Y")
-    age = da.calculate_age(updated_date, updated_enrolment)
-    return age
-
-
 def get_age_filter():
     """Return age filter selection.
     
@@ -1337,7 +1805,54 @@ def get_age_range(selection):
         return lower, upper
     
 
-def get_completion_month(months, month_order, order='last'):
+def get_batch_courses(valid_codes):
+    """Get the courses to update in a batch update from the user.
+    
+    Args:
+        valid_codes (list): Course codes in the Course Codes File.
+        
+    Returns:
+        course_codes (list): Course codes to update.
+    """
+    while True:
+        codes = input('\nEnter the codes of the courses to update separated by'
+                      ' commas, or a to update all courses. Alternatively, '
+                      'type q to quit: ')
+        if codes == 'q':
+            print('\nProgram cancelled. Goodbye.')
+            sys.exit()
+        elif codes == 'a':
+            return list(valid_codes)
+        course_codes = [code.strip() for code in codes.split(',') if
+                        code.strip()]
+        invalid_codes = [code for code in course_codes if code not in
+                         valid_codes]
+        if course_codes and not invalid_codes:
+            return course_codes
+        print('\nThat is not a valid selection. The courses must be present '
+              'in the list of valid courses (Course_codes.txt).')
+
+
+def get_batch_period():
+    """Get the month of the Assessment Data Files for a batch update.
+    
+    Returns:
+        period (str): Month and year in the Assessment Data File names, e.g.
+        July_18 for ADV-PT-003_July_18.csv.
+    """
+    while True:
+        period = input('\nWhat is the month and year of the Assessment Data '
+                       'Files (e.g. July_18 for ADV-PT-003_July_18.csv)? '
+                       'Alternatively, type q to quit: ').strip()
+        if period == 'q':
+            print('\nProgram cancelled. Goodbye.')
+            sys.exit()
+        elif period:
+            return period
+        print('\nThat is not a valid response.')
+
+
+def get_completion_month(months, month_index, order='last'):
     """Return the last completion month.
     
     Checks each item in months and returns the item that is the latest (newest)
@@ -1345,47 +1860,17 @@ def get_completion_month(months, month_order, order='last'):
     
     Args:
         months (list): Months in which assessments were completed.
-        month_order (list): List with each month in order.
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
         order (str): Order to return.
             last = return the latest date (newest)
             first = return the earliest date (oldest)
     """
-    # Debugging script - uncomment to check format of dates
-    '''
-    print('\nMonths:\n')
-    ad.debug_list(months)
-    print('\nMonth order:\n')
-    ad.debug_list(month_order)
-    '''
-    # Create dictionary with month values in order
-    month_order_dict = ad.create_ordered_dict(month_order)
-    # Debugging script - uncomment to check format of dates
-    '''
-    print('Months list (completed months):')
-    ad.debug_list(months)
-    print('Months_order_dict:')
-    ad.debug_dict(month_order_dict)
-    '''
     if months: # make sure there is at least one month passed
-        # Set initial latest and earliest months
-        latest = month_order_dict[months[0]]
-        # print('Latest: {}'.format(latest))
-        earliest = month_order_dict[months[0]]
-        # print('Earliest: {}'.format(earliest))
-        for month in months:
-            # Update latest if month is later
-            if month_order_dict[month] > latest:
-                latest = month_order_dict[month]
-            # Update earliest if month is earlier
-            elif month_order_dict[month] < earliest:
-                earliest = month_order_dict[month]
-        # Return desired month
-        if order == 'last':
-            return month_order[latest]
-        elif order == 'first':
-            return month_order[earliest]
-        else:
-            return month_order[latest]
+        ordered_months = get_month_order(months, month_index)
+        if order == 'first':
+            return ordered_months[0]
+        return ordered_months[-1]
     # Empty string returned if no months passed
     else:
         return ''
@@ -1525,51 +2010,83 @@ def get_expired_under(expiry, num_days):
     return expired_under
 
 
-def get_e_length(status, start, expiry, graduation):
-    """Return number of days student has been enrolled.
-    
-    Calculation is based on student's status. Active and Suspended are
-    calculated from start and today dates. Graduated from start and graduation.
-    Withdrawn and Cancelled are returned as NaN. Expired from start and expiry.
-    Converts dates into a timestamp and then subtracts from today's date (or 
-    appropriate date).
-    
-    Args:
-        status (str): Student status.
-        start (str): Start date in format DD/MM/YYYY.
-        expiry (str): Expiry date in format DD/MM/YYYY.
-        graduation (str): Graduation date in format DD/MM/YYYY.
-        
-    Returns:
-        e_length (int): Number of days enrolled.
-    """
-    if status in ('Active', 'Suspended'):
-        # Get today's date
-        today = da.get_todays_date()
-        # Convert start to a datetime object
-        start_date = da.convert_to_datetime(start, '%d/%m/%Y')
-        # Subtract today's date from start date
-        e_length = da.calculate_days_dt(start_date, today)
-    elif status in ('Withdrawn', 'Cancelled'):
-        return np.nan
-    elif status == 'Graduated':
-        # Convert start to a datetime object
-        start_date = da.convert_to_datetime(start, '%d/%m/%Y')
-        # Convert graduation to a datetime object
-        grad_date = da.convert_to_datetime(graduation, '%d/%m/%Y')
-        # Subtract graduation date from start date
-        e_length = da.calculate_days_dt(start_date, grad_date)
-    elif status == 'Expired':
-        # Convert start to a datetime object
-        start_date = da.convert_to_datetime(start, '%d/%m/%Y')
-        # Convert expiry to a datetime object
-        expiry_date = da.convert_to_datetime(expiry, '%d/%m/%Y')
-        # Subtract expiry date from start date
-        e_length = da.calculate_days_dt(start_date, expiry_date)
-    else:
-        # Empty status or any that is not covered above
-        return np.nan
-    return e_length
+def get_duplicate_names(assessments_df, name_index, duplicates):
+    """Return the names in the assessment data that are duplicated.
+    
+    Names in the assessment data are matched to the name index in one pass to
+    find those shared by more than one student. Names listed in the Duplicate
+    Names File are also included.
+    
+    Args:
+        assessments_df (dataframe): Assessment data without IDs.
+        name_index (dataframe): Name index for the course.
+        duplicates (list): Listed duplicated student names.
+        
+    Returns:
+        duplicate_names (set): Duplicated names found in the assessment data.
+    """
+    ambiguous = name_index.loc[name_index['Ambiguous'], 'Name']
+    names = assessments_df['Name']
+    found = names.isin(ambiguous) | names.isin(duplicates)
+    return set(names[found])
+
+
+def get_export_headings(assessment_headings):
+    """Return the column headings of the Assessment Data File.
+    
+    Args:
+        assessment_headings (list): Column headings of the assessment data
+        with IDs.
+        
+    Returns:
+        export_headings (list): assessment_headings without the EnrolmentID,
+        StudentID and Course columns.
+    """
+    id_cols = ['EnrolmentID', 'StudentID', 'Course']
+    return [heading for heading in assessment_headings if heading not in
+            id_cols]
+
+
+def get_file_hash(file_name):
+    """Return a fingerprint for a file.
+    
+    The file is read in blocks so that large files are not held in memory.
+    
+    Args:
+        file_name (str): Name of the file.
+        
+    Returns:
+        file_hash (str): SHA-1 hash of the file (first 12 characters).
+    """
+    file_hash = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1048576), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()[:12]
+
+
+def get_export_file_name(course_code):
+    """Get the name of the Assessment Data File from the user.
+    
+    Args:
+        course_code (str): Course code being processed.
+        
+    Returns:
+        file_name (str): Name of an existing Assessment Data File.
+    """
+    while True:
+        file_name = input('\nWhat is the name of the {} Assessment Data File? '
+                          'Alternatively, type q to quit: '.format(
+                                  course_code))
+        if file_name == 'q':
+            print('\nProgram cancelled. Goodbye.')
+            sys.exit()
+        if not file_name.endswith('.csv'):
+            file_name = '{}.csv'.format(file_name)
+        if os.path.isfile(file_name):
+            return file_name
+        print('\n{} could not be found. Please check the name and try '
+              'again.'.format(file_name))
 
 
 def get_filter_group_option():
@@ -1660,6 +2177,36 @@ def get_gender_filter():
                   'available options.')
 
 
+def get_job_data(job, key, description, load_func, *args):
+    """Return data for an action, reusing data loaded earlier in a job.
+    
+    When running a job file, data loaded by one action is kept so that later
+    actions in the job do not load it again.
+    
+    Args:
+        job (dict): Action being run from a job file (None if not).
+        key (str): Name the data is kept under.
+        description (str): Name of the data to display when loading. None if
+        load_func displays its own messages.
+        load_func (function): Function to load the data.
+        *args: Arguments for load_func.
+        
+    Returns:
+        data: The loaded data.
+    """
+    if job is not None and key in job['data']:
+        print('\nUsing {} loaded earlier in the job.'.format(key))
+        return job['data'][key]
+    if description:
+        print('\nLoading {}...'.format(description))
+    data = load_func(*args)
+    if description:
+        print('Loaded {}.'.format(description))
+    if job is not None:
+        job['data'][key] = data
+    return data
+
+
 def get_limit(paramater):
     """Get limit for completion % from user.
     
@@ -1695,6 +2242,133 @@ def get_limit(paramater):
             return float(value)
 
 
+def get_master_cell(master, master_delta, position, col):
+    """Return the value of a master cell including changes.
+    
+    Args:
+        master (list): Master record for each student.
+        master_delta (dict): Changed cells and new students.
+        position (int): Position of the student in the master. Positions past
+        the end of master are new students in master_delta.
+        col (int): Position of the column.
+        
+    Returns:
+        value (str): Current value of the cell.
+    """
+    if position >= len(master):
+        return master_delta['rows'][position - len(master)][col]
+    changes = master_delta['cells'].get(position)
+    if changes and col in changes:
+        return changes[col]
+    return master[position][col]
+
+
+def get_master_date_cols(file_type, master_headings):
+    """Return the date columns of a master file.
+    
+    Args:
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        master_headings (list): Column headings of the master file.
+        
+    Returns:
+        date_cols (list): Headings of columns holding dates. Only the Results
+        master has date columns (the column after each Grade column).
+    """
+    if file_type == 'Results':
+        return master_headings[5::2]
+    return []
+
+
+def get_master_journal_entries(master, master_delta, master_headings,
+                               source):
+    """Return journal entries for the changes in a master delta.
+    
+    Each changed cell is an entry. New students have an entry for each of
+    their non-empty cells.
+    
+    Args:
+        master (list): Master record for each student.
+        master_delta (dict): Changed cells and new students.
+        master_headings (list): Column headings of the master file.
+        source (str): Identifier of the export the changes came from.
+        
+    Returns:
+        journal_df (dataframe): Journal entries (EnrolmentID, Column, Value,
+        Source, Timestamp).
+    """
+    entries = []
+    for position, changes in master_delta['cells'].items():
+        for col, value in changes.items():
+            entries.append([master[position][0], master_headings[col], value])
+    for student in master_delta['rows']:
+        for col in range(1, len(master_headings)):
+            if student[col] not in (None, ''):
+                entries.append([student[0], master_headings[col],
+                                student[col]])
+    journal_df = pd.DataFrame(data=entries, columns=['EnrolmentID', 'Column',
+                                                     'Value'])
+    journal_df['Source'] = source
+    journal_df['Timestamp'] = ft.generate_time_string()
+    return journal_df
+
+
+def get_master_source(file_type, course_code):
+    """Return the source to load a master file from.
+    
+    The columnar master (with its journal) is used unless the CSV master has
+    been saved since both were last updated (e.g. after a manual update).
+    
+    Args:
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        
+    Returns:
+        source (str): 'feather', 'csv' or None if there is no master file.
+    """
+    csv_name = 'Master_{}_{}.csv'.format(file_type, course_code)
+    feather_name = 'Master_{}_{}.feather'.format(file_type, course_code)
+    journal_name = 'Master_{}_{}_Journal.csv'.format(file_type, course_code)
+    if not os.path.isfile(feather_name):
+        if os.path.isfile(csv_name):
+            return 'csv'
+        return None
+    if os.path.isfile(csv_name):
+        updated = os.path.getmtime(feather_name)
+        if os.path.isfile(journal_name):
+            updated = max(updated, os.path.getmtime(journal_name))
+        if os.path.getmtime(csv_name) > updated:
+            print('\n{} is newer than {} and will be used.'.format(
+                    csv_name, feather_name))
+            return 'csv'
+    return 'feather'
+
+
+def get_master_row(master, master_delta, position):
+    """Return a student's master record including changes.
+    
+    Args:
+        master (list): Master record for each student.
+        master_delta (dict): Changed cells and new students.
+        position (int): Position of the student in the master. Positions past
+        the end of master are new students in master_delta.
+        
+    Returns:
+        row (list): Current record for the student. A copy is returned if the
+        student has changed cells so that master is not updated.
+    """
+    if position >= len(master):
+        return master_delta['rows'][position - len(master)]
+    changes = master_delta['cells'].get(position)
+    if not changes:
+        return master[position]
+    row = list(master[position])
+    for col, value in changes.items():
+        row[col] = value
+    return row
+
+
 def get_module_headings(start_headings, modules, target_module):
     """Return module headings.
     
@@ -1752,6 +2426,93 @@ def get_module_name(module_names):
                   'the list of valid modules for the course.')
 
 
+def get_month_codes(months_df, month_index):
+    """Return the months encoded as ints for their place in the order.
+    
+    Each distinct value is converted once (see convert_month) to a small int,
+    so months can be compared and the latest found with array operations.
+    Blank and missing entries are set to MONTH_BLANK and 'Transferred' to
+    MONTH_TRANSFERRED, both lower than any month. Values that are not a month
+    are placed after every month in the order they are found. Spellings of
+    the same month (e.g. Jun-23 and June-23) share a code, and the code is
+    labelled with the spelling in the month index (or Mmm-YY).
+    
+    Args:
+        months_df (dataframe): Months in which assessments were completed.
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
+    
+    Returns:
+        month_codes (array): Code of each month, same shape as months_df.
+        months (dict): Keys are codes and values are the months.
+    """
+    # Values are found once for each column (from the categories of
+    # category columns)
+    columns = [pd.factorize(months_df[col]) for col in months_df]
+    codes = {'': MONTH_BLANK, 'Transferred': MONTH_TRANSFERRED}
+    others = []
+    for _, uniques in columns:
+        for value in uniques:
+            if value not in codes:
+                codes[value] = convert_month(value, month_index)
+                if codes[value] is None:
+                    others.append(value)
+    last = max([code for code in codes.values() if code is not None])
+    for pos, value in enumerate(others, start=last + 1):
+        codes[value] = pos
+    month_codes = np.empty(months_df.shape, dtype=np.int16)
+    for col, (positions, uniques) in enumerate(columns):
+        # Missing values (position -1) are blank
+        unique_codes = np.array([codes[value] for value in uniques] +
+                                [MONTH_BLANK], dtype=np.int16)
+        month_codes[:, col] = unique_codes[positions]
+    months = {code: value for value, code in codes.items()}
+    # One label for each month (the month index spelling, or Mmm-YY) so that
+    # spellings of the same month are labelled the same
+    labels = {code: month for month, code in month_index.items()}
+    others = set(others)
+    for value, code in codes.items():
+        if code >= 0 and value not in others:
+            months[code] = labels.get(code, '{}-{:02d}'.format(
+                    MONTH_NAMES[code % 12], code // 12 % 100))
+    return month_codes, months
+
+
+def get_month_order(months, month_index):
+    """Return the months placed in order, oldest first.
+    
+    Values that are not a month are placed after every month.
+    
+    Args:
+        months (list): Months to order.
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
+    
+    Returns:
+        ordered_months (list): Months in order.
+    """
+    codes = {month: convert_month(month, month_index) for month in months}
+    return sorted(months, key=lambda month: (codes[month] is None,
+                                             codes[month] or 0))
+
+
+def get_new_rows(data_df, applied, file_type):
+    """Return the rows of assessment data not yet applied to a master.
+    
+    Args:
+        data_df (dataframe): Assessment data indexed by row fingerprint (see
+        get_row_hashes).
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports).
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        
+    Returns:
+        data_df (dataframe): Rows not yet applied to the master.
+    """
+    return data_df[~data_df.index.isin(applied['rows'][file_type])]
+
+
 def get_num_assessments(master_headings, non=4):
     """Return the number of assessments.
     
@@ -1788,6 +2549,94 @@ def get_pacific(ethnicity, islands):
         return 'No' 
 
 
+def get_passing_assessments(assessments_df, passing_scores, check=True,
+                            unknown_items=None, unparsed_dates=None):
+    """Return the passed assessments from the month's assessment data.
+    
+    Drops non-assessment entries and entries that do not have a passing score
+    for the assessment. The month and date each assessment was completed are
+    added for updating the masters. Entries with a Date and time that cannot
+    be read are dropped.
+    
+    Args:
+        assessments_df (dataframe): Current month assessment data with IDs.
+        passing_scores (dict): Minimum passing score for each assessment.
+        check (bool): True to exit if no entries are left to process. False
+        when processing part of the data (chunks).
+        unknown_items (set): If passed, grade items without a passing score
+        are added to it rather than being displayed (so that they can be
+        displayed once for all chunks).
+        unparsed_dates (set): If passed, Date and time values that cannot be
+        read are added to it rather than being displayed.
+        
+    Returns:
+        passing_df (dataframe): Passed assessments with EnrolmentID,
+        StudentID, Date and time, Name, Course, Grade item, Revised grade,
+        Month completed (Mmm-YY) and Date completed (DD/MM/YYYY) columns.
+    """
+    passing_df = assessments_df.copy()
+    # Drop non-assessment entries
+    passing_df['Grade item'] = passing_df['Grade item'].apply(
+            ad.convert_to_nan, args=(['Course total'],))
+    passing_df.dropna(subset=['Grade item'], inplace=True)
+    # Check there are entries to process
+    if check:
+        check_df(passing_df)
+    # Convert Revised grades to numbers (currently string), rounding down to
+    # the nearest whole number. Grades that are not numbers are set to nan
+    grades = np.floor(pd.to_numeric(passing_df['Revised grade'],
+                                    errors='coerce'))
+    # Drop entries that do not pass
+    passing, unknown = get_passing_mask(grades, passing_df['Grade item'],
+                                        passing_scores)
+    if unknown_items is None:
+        process_unknown_grade_items(unknown)
+    else:
+        unknown_items.update(unknown)
+    passing_df = passing_df[passing].copy()
+    passing_df['Revised grade'] = grades[passing].astype(int)
+    # Add month (Mmm-YY) and date (DD/MM/YYYY) assessments were completed
+    months, dates, unparsed = extract_dates(passing_df['Date and time'])
+    passing_df['Month completed'] = months
+    passing_df['Date completed'] = dates
+    if unparsed_dates is None:
+        process_unparsed_dates(unparsed)
+    else:
+        unparsed_dates.update(unparsed)
+    passing_df.dropna(subset=['Date completed'], inplace=True)
+    # Check there are entries to process
+    if check:
+        check_df(passing_df)
+    # Get just desired columns
+    revised_headings = ['EnrolmentID', 'StudentID','Date and time', 'Name',
+                        'Course', 'Grade item', 'Revised grade',
+                        'Month completed', 'Date completed']
+    return passing_df[revised_headings]
+
+
+def get_passing_mask(grades, grade_items, passing_scores):
+    """Return which grades are passing scores for their grade item.
+    
+    The minimum passing score for each grade item is looked up for the whole
+    column at once and compared with the grades in a single step. Grade items
+    that are not in passing_scores do not pass and are returned so that they
+    can be reported together.
+    
+    Args:
+        grades (series): Revised grade for each assessment (nan if missing).
+        grade_items (series): Assessment task name for each grade.
+        passing_scores (dict): Minimum passing score for each assessment.
+        
+    Returns:
+        passing (series): True for each grade that is a passing score.
+        unknown (set): Grade items that do not have a passing score.
+    """
+    thresholds = grade_items.map(passing_scores)
+    unknown = set(grade_items[~grade_items.isin(list(passing_scores))])
+    passing = (grades >= thresholds).fillna(False).astype(bool)
+    return passing, unknown
+
+
 def get_passing_scores(scores, assessments):
     """Return dictionary holding the minimum passing value for each assessment.
     
@@ -1811,6 +2660,22 @@ def get_passing_scores(scores, assessments):
     return passing_scores
     
 
+def get_process_peak_memory():
+    """Return the peak memory used by the process so far.
+    
+    Returns:
+        peak_memory (float): Peak resident memory in MB. None if it cannot be
+        found on this system.
+    """
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return round(peak_memory / 1048576, 1)
+    return round(peak_memory / 1024, 1)
+
+
 def get_range():
     """Get range for completion % from user.
     
@@ -1836,6 +2701,41 @@ def get_range():
             return minimum, maximum            
             
 
+def get_row_count(data):
+    """Return the number of rows in data used or returned by a stage.
+    
+    Args:
+        data: Data to count. DataFrames and lists are counted. For tuples the
+        first item is counted and for masters being updated (see
+        load_master_update) the students in the master.
+        
+    Returns:
+        rows (int): Number of rows (None if data is not counted).
+    """
+    if isinstance(data, tuple) and data:
+        data = data[0]
+    if isinstance(data, dict):
+        data = data.get('data')
+    if isinstance(data, pd.DataFrame):
+        return data.shape[0]
+    if isinstance(data, list):
+        return len(data)
+    return None
+
+
+def get_row_hashes(assessments_df):
+    """Return a fingerprint for each row of assessment data.
+    
+    Args:
+        assessments_df (dataframe): Assessment data as exported (no IDs).
+        
+    Returns:
+        row_hashes (index): Fingerprint of each row.
+    """
+    row_hashes = pd.util.hash_pandas_object(assessments_df, index=False)
+    return pd.Index(row_hashes.map('{:016x}'.format), name='Row')
+
+
 def get_score_name(course_code):
     """Return file name for assessment scores file.
     
@@ -1899,6 +2799,73 @@ def get_status_filter():
                   'available options.')
 
 
+def get_transfer_pattern(phrases=None):
+    """Return the pattern used to find transfers in feedback text.
+    
+    Args:
+        phrases (list): Phrases that mark a transfer. If not passed, they are
+        loaded with get_transfer_phrases.
+        
+    Returns:
+        transfer_pattern (re.Pattern): Case insensitive pattern matching any
+        of the phrases, with the matched phrase as the only group.
+    """
+    if phrases is None:
+        phrases = get_transfer_phrases()
+    # Longest phrases first so the most specific phrase is given as reason
+    phrases = sorted(phrases, key=len, reverse=True)
+    return re.compile('({})'.format('|'.join(re.escape(phrase) for phrase
+                      in phrases)), re.IGNORECASE)
+
+
+def get_transfer_phrases():
+    """Return the phrases in feedback text that mark a transfer.
+    
+    Phrases are loaded from the Transfer Phrases File if it is present.
+    Otherwise, the default phrases are used.
+    
+    Returns:
+        phrases (list): Phrases that mark a transfer.
+    """
+    if os.path.isfile('Transfer_Phrases.txt'):
+        phrases = ft.load_headings('Transfer_Phrases', 'e')
+        phrases = [phrase.strip() for phrase in phrases if phrase.strip()]
+        if phrases:
+            return phrases
+    return ['transfer', 'cross credit']
+
+
+def get_transfers(assessments_df, transfer_pattern=None):
+    """Return the transferred assessments from the month's assessment data.
+    
+    Args:
+        assessments_df (dataframe): Current month assessment data with IDs.
+        transfer_pattern (re.Pattern): Pattern from get_transfer_pattern.
+        Created if not passed.
+        
+    Returns:
+        transfers_df (dataframe): Transferred assessments with EnrolmentID,
+        StudentID, Name, Course, Grade item and Transfer reason columns.
+    """
+    if transfer_pattern is None:
+        transfer_pattern = get_transfer_pattern()
+    transfers_df = assessments_df.copy()
+    # Drop rows where feedback column does not have 'transferred' etc
+    transfers_df['Feedback text'], transfers_df['Transfer reason'] = (
+            find_transferred(transfers_df['Feedback text'], transfer_pattern))
+    transfers_df.dropna(subset=['Feedback text'], inplace=True)
+    # Drop columns so left with EnrolmentID, Name, Course, Grade Item and the
+    # phrase that identified the transfer (for checking)
+    revised_headings = ['EnrolmentID', 'StudentID','Name', 'Course',
+                        'Grade item', 'Transfer reason']
+    transfers_df = transfers_df[revised_headings]
+    '''
+    transfers_df.to_csv('Transfer_df_check_{}.csv'.format(
+            ft.generate_time_string()), index=False)
+    '''
+    return transfers_df
+
+
 def get_tutor_filter():
     """Return tutor filter selection.
     
@@ -1948,13 +2915,10 @@ def get_valid_students(student_data, graduates, expiry):
     grads = ad.extract_list_item(graduates, 0)
     # Extract IDs of students expired less than 30 days prior
     expired_under_30 = get_expired_under(expiry, 30)
-    num_students = len(student_data) # For calculating % complete
-    n = 0
+    progress = create_progress(len(student_data))
     for student in student_data:
         # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Check if student has graduated
         if student[0] in grads:
             # Don't add student
@@ -1973,6 +2937,7 @@ def get_valid_students(student_data, graduates, expiry):
         # Add student
         else:
             students.append(student[0])
+    finish_progress(progress)
     return students
 
 
@@ -2108,13 +3073,10 @@ def get_zero_students(student_data, student_ids, expiry):
         4 from student_data.
     """
     students = []
-    num_students = len(student_data) # For calculating % complete
-    n = 0
+    progress = create_progress(len(student_data))
     for student in student_data:
         # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Check if student id is in analysis data - process if not
         if student[0] not in student_ids:
             add = True
@@ -2138,15 +3100,20 @@ def get_zero_students(student_data, student_ids, expiry):
                     this_student.append(student[column])
                     column += 1
                 students.append(this_student)
+    finish_progress(progress)
     return students
 
 
-def identify_at_least_comp():
+def identify_at_least_comp(job=None):
     """Return expired students that have at least X% completion for the course.
     
     Asks for a minimum completion percentage and returns students with at least
     that % of the course completed. Used for expired students and only returns
     students that have not been updated in the assessments download data file.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course and minimum from the job.
     """
     warnings = ['\nProcessing Expired At Least Completion Data Warnings:\n']
     warnings_to_process = False
@@ -2154,40 +3121,43 @@ def identify_at_least_comp():
     # Confirm the required files are in place
     required_files = ['Assessment Downloads File', 'Analysis File',
                       'Graduation Dates File', 'Expiry Dates File']
-    ad.confirm_files('Process Expired At Least Completion Data',
-                     required_files)
+    if job is None:
+        ad.confirm_files('Process Expired At Least Completion Data',
+                         required_files)
     # Get course code
-    course_code = get_course_code()
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Expired At Least Completion')
+    run_log['Course'] = course_code
     # Load Assessments Download file
-    print('\nLoading {}...'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
-    assess_downloads_data = ft.load_csv('Assessment_Downloads_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
+    assess_downloads_data = time_stage(run_log, 'Load assessment downloads',
+            get_job_data, job, 'Assessment_Downloads_{}'.format(course_code),
+            'Assessment_Downloads_{}.csv'.format(course_code), ft.load_csv,
+            'Assessment_Downloads_{}.csv'.format(course_code))
     # Load Analysis file
-    print('\nLoading {}...'.format('Analysis_{}.csv'.format(course_code)))
-    analysis_data = ft.load_csv('Analysis_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Analysis_{}.csv'.format(
-            course_code)))
+    analysis_data = time_stage(run_log, 'Load analysis', get_job_data, job,
+                               'Analysis_{}'.format(course_code),
+                               'Analysis_{}.csv'.format(course_code),
+                               ft.load_csv, 'Analysis_{}.csv'.format(
+                                       course_code))
     # Load Graduation Dates file
-    print('\nLoading {}...'.format('Graduation Dates Data'))
-    grad_dates_data = ft.load_csv('graduation_dates', 'e')
-    print('Loaded {}.'.format('Graduation Dates Data'))
+    grad_dates_data = get_job_data(job, 'graduation_dates',
+                                   'Graduation Dates Data', ft.load_csv,
+                                   'graduation_dates', 'e')
     # Load Expiry Dates file
-    print('\nLoading {}...'.format('expiry_dates_{}.csv'.format(course_code)))
-    expiry_dates_data = ft.load_csv('expiry_dates_{}'.format(course_code), 'e')
-    print('Loaded {}.'.format('expiry_dates_{}.csv'.format(course_code)))
+    expiry_dates_data = get_job_data(job, 'expiry_dates_{}'.format(
+            course_code), 'expiry_dates_{}.csv'.format(course_code),
+            ft.load_csv, 'expiry_dates_{}'.format(course_code), 'e')
     # Get minimum % completion
-    min_completion = get_limit('minimum')
+    min_completion = job['minimum'] if job else get_limit('minimum')
     # Create string representation of % value
     min_completion_string = float_perc_to_string(min_completion)
     # Extract students in assess_downloads_data that have not been processed
-    assess_pool = get_valid_students(assess_downloads_data, grad_dates_data,
-                                     expiry_dates_data)
+    assess_pool = time_stage(run_log, 'Get valid students',
+                             get_valid_students, assess_downloads_data,
+                             grad_dates_data, expiry_dates_data)
     # Extract details of target students
-    extracted_students, to_add,  items_to_add = extract_comp_students(
+    extracted_students, to_add,  items_to_add = time_stage(
+            run_log, 'Extract students', extract_comp_students,
             analysis_data, assess_pool, min_completion, 1)
     if to_add:
         for item in items_to_add:
@@ -2198,15 +3168,20 @@ def identify_at_least_comp():
     file_name = 'Completed_at_least_{}_{}_'.format(min_completion_string,
                           course_code)
     ft.save_data_csv(extracted_students, headings, file_name)
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
 
 
-def identify_at_most_comp():
+def identify_at_most_comp(job=None):
     """Return expired students that have at most X% completion for the course.
     
     Asks for a maximum completion percentage and returns students with at most
     that % of the course completed. Used for expired students and only returns
     students that have not been updated in the assessments download data file.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course and maximum from the job.
     """
     warnings = ['\nProcessing Expired At Most Completion Data Warnings:\n']
     warnings_to_process = False
@@ -2214,40 +3189,43 @@ def identify_at_most_comp():
     # Confirm the required files are in place
     required_files = ['Assessment Downloads File', 'Analysis File',
                       'Graduation Dates File', 'Expiry Dates File']
-    ad.confirm_files('Process Expired At Most Completion Data',
-                     required_files)
+    if job is None:
+        ad.confirm_files('Process Expired At Most Completion Data',
+                         required_files)
     # Get course code
-    course_code = get_course_code()
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Expired At Most Completion')
+    run_log['Course'] = course_code
     # Load Assessments Download file
-    print('\nLoading {}...'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
-    assess_downloads_data = ft.load_csv('Assessment_Downloads_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
+    assess_downloads_data = time_stage(run_log, 'Load assessment downloads',
+            get_job_data, job, 'Assessment_Downloads_{}'.format(course_code),
+            'Assessment_Downloads_{}.csv'.format(course_code), ft.load_csv,
+            'Assessment_Downloads_{}.csv'.format(course_code))
     # Load Analysis file
-    print('\nLoading {}...'.format('Analysis_{}.csv'.format(course_code)))
-    analysis_data = ft.load_csv('Analysis_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Analysis_{}.csv'.format(
-            course_code)))
+    analysis_data = time_stage(run_log, 'Load analysis', get_job_data, job,
+                               'Analysis_{}'.format(course_code),
+                               'Analysis_{}.csv'.format(course_code),
+                               ft.load_csv, 'Analysis_{}.csv'.format(
+                                       course_code))
     # Load Graduation Dates Data
-    print('\nLoading {}...'.format('Graduation Dates Data'))
-    grad_dates_data = ft.load_csv('graduation_dates', 'e')
-    print('Loaded {}.'.format('Graduation Dates Data'))
+    grad_dates_data = get_job_data(job, 'graduation_dates',
+                                   'Graduation Dates Data', ft.load_csv,
+                                   'graduation_dates', 'e')
     # Load Expiry Dates file
-    print('\nLoading {}...'.format('expiry_dates_{}.csv'.format(course_code)))
-    expiry_dates_data = ft.load_csv('expiry_dates_{}'.format(course_code), 'e')
-    print('Loaded {}.'.format('expiry_dates_{}.csv'.format(course_code)))
+    expiry_dates_data = get_job_data(job, 'expiry_dates_{}'.format(
+            course_code), 'expiry_dates_{}.csv'.format(course_code),
+            ft.load_csv, 'expiry_dates_{}'.format(course_code), 'e')
     # Get maximum % completion
-    max_completion = get_limit('maximum')
+    max_completion = job['maximum'] if job else get_limit('maximum')
     # Create string representation of % value
     max_completion_string = float_perc_to_string(max_completion)
     # Extract students in assess_downloads_data that have not been processed
-    assess_pool = get_valid_students(assess_downloads_data, grad_dates_data,
-                                     expiry_dates_data)
+    assess_pool = time_stage(run_log, 'Get valid students',
+                             get_valid_students, assess_downloads_data,
+                             grad_dates_data, expiry_dates_data)
     # Extract details of target students
-    extracted_students, to_add,  items_to_add = extract_comp_students(
+    extracted_students, to_add,  items_to_add = time_stage(
+            run_log, 'Extract students', extract_comp_students,
             analysis_data, assess_pool, 0, max_completion)
     if to_add:
         for item in items_to_add:
@@ -2258,16 +3236,21 @@ def identify_at_most_comp():
     file_name = 'Completed_at_most_{}_{}_'.format(max_completion_string,
                           course_code)
     ft.save_data_csv(extracted_students, headings, file_name)
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
 
 
-def identify_range_comp():
+def identify_range_comp(job=None):
     """Return expired students within X% completion range for the course.
     
     Asks for a minimum and maximum completion percentage and returns students 
     whose completion falls within that range. Used for expired students and
     only returns students that have not been updated in the assessments
     download data file.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course, minimum and maximum from the job.
     """
     warnings = ['\nProcessing Expired Range Completion Data Warnings:\n']
     warnings_to_process = False
@@ -2275,41 +3258,47 @@ def identify_range_comp():
     # Confirm the required files are in place
     required_files = ['Assessment Downloads File', 'Analysis File',
                       'Graduation Dates File', 'Expiry Dates File']
-    ad.confirm_files('Process Expired At Most Completion Data',
-                     required_files)
+    if job is None:
+        ad.confirm_files('Process Expired At Most Completion Data',
+                         required_files)
     # Get course code
-    course_code = get_course_code()
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Expired Range Completion')
+    run_log['Course'] = course_code
     # Load Assessments Download file
-    print('\nLoading {}...'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
-    assess_downloads_data = ft.load_csv('Assessment_Downloads_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
+    assess_downloads_data = time_stage(run_log, 'Load assessment downloads',
+            get_job_data, job, 'Assessment_Downloads_{}'.format(course_code),
+            'Assessment_Downloads_{}.csv'.format(course_code), ft.load_csv,
+            'Assessment_Downloads_{}.csv'.format(course_code))
     # Load Analysis file
-    print('\nLoading {}...'.format('Analysis_{}.csv'.format(course_code)))
-    analysis_data = ft.load_csv('Analysis_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Analysis_{}.csv'.format(
-            course_code)))
+    analysis_data = time_stage(run_log, 'Load analysis', get_job_data, job,
+                               'Analysis_{}'.format(course_code),
+                               'Analysis_{}.csv'.format(course_code),
+                               ft.load_csv, 'Analysis_{}.csv'.format(
+                                       course_code))
     # Load Graduation Dates Data
-    print('\nLoading {}...'.format('Graduation Dates Data'))
-    grad_dates_data = ft.load_csv('graduation_dates', 'e')
-    print('Loaded {}.'.format('Graduation Dates Data'))
+    grad_dates_data = get_job_data(job, 'graduation_dates',
+                                   'Graduation Dates Data', ft.load_csv,
+                                   'graduation_dates', 'e')
     # Load Expiry Dates file
-    print('\nLoading {}...'.format('expiry_dates_{}.csv'.format(course_code)))
-    expiry_dates_data = ft.load_csv('expiry_dates_{}'.format(course_code), 'e')
-    print('Loaded {}.'.format('expiry_dates_{}.csv'.format(course_code)))
+    expiry_dates_data = get_job_data(job, 'expiry_dates_{}'.format(
+            course_code), 'expiry_dates_{}.csv'.format(course_code),
+            ft.load_csv, 'expiry_dates_{}'.format(course_code), 'e')
     # Get minimum and maximum % completion
-    min_completion, max_completion = get_range()
+    if job is None:
+        min_completion, max_completion = get_range()
+    else:
+        min_completion, max_completion = job['minimum'], job['maximum']
     # Create string representation of % value
     min_completion_string = float_perc_to_string(min_completion)
     max_completion_string = float_perc_to_string(max_completion)
     # Extract students in assess_downloads_data that have not been processed
-    assess_pool = get_valid_students(assess_downloads_data, grad_dates_data,
-                                     expiry_dates_data)
+    assess_pool = time_stage(run_log, 'Get valid students',
+                             get_valid_students, assess_downloads_data,
+                             grad_dates_data, expiry_dates_data)
     # Extract details of target students
-    extracted_students, to_add,  items_to_add = extract_comp_students(
+    extracted_students, to_add,  items_to_add = time_stage(
+            run_log, 'Extract students', extract_comp_students,
             analysis_data, assess_pool, min_completion, max_completion)
     if to_add:
         for item in items_to_add:
@@ -2320,14 +3309,19 @@ def identify_range_comp():
     file_name = 'Completed_between_{}_and_{}_{}_'.format(min_completion_string,
                          max_completion_string, course_code)
     ft.save_data_csv(extracted_students, headings, file_name)
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
 
 
-def identify_zero_comp():
+def identify_zero_comp(job=None):
     """Return expired students that have 0% completion for the course.
     
     Finds students with 0% completion that have not been updated in the
     assessments download data file. Only returns expired students.
+    
+    Args:
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course from the job.
     """
     warnings = ['\nProcessing Zero Completion Data Warnings:\n']
     warnings_to_process = False
@@ -2335,39 +3329,42 @@ def identify_zero_comp():
     # Confirm the required files are in place
     required_files = ['Assessment Downloads File', 'Analysis File',
                       'Expiry Dates File']
-    ad.confirm_files('Process Zero Completion Data', required_files)
+    if job is None:
+        ad.confirm_files('Process Zero Completion Data', required_files)
     # Get course code
-    course_code = get_course_code()
+    course_code = job['course'] if job else get_course_code()
+    run_log = create_run_log('Zero Completion')
+    run_log['Course'] = course_code
     # Load Assessments Download file
-    print('\nLoading {}...'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
-    assess_downloads_data = ft.load_csv('Assessment_Downloads_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Assessment_Downloads_{}.csv'.format(
-            course_code)))
+    assess_downloads_data = time_stage(run_log, 'Load assessment downloads',
+            get_job_data, job, 'Assessment_Downloads_{}'.format(course_code),
+            'Assessment_Downloads_{}.csv'.format(course_code), ft.load_csv,
+            'Assessment_Downloads_{}.csv'.format(course_code))
     # Load Analysis file
-    print('\nLoading {}...'.format('Analysis_{}.csv'.format(course_code)))
-    analysis_data = ft.load_csv('Analysis_{}.csv'.format(
-            course_code))
-    print('Loaded {}.'.format('Analysis_{}.csv'.format(
-            course_code)))
+    analysis_data = time_stage(run_log, 'Load analysis', get_job_data, job,
+                               'Analysis_{}'.format(course_code),
+                               'Analysis_{}.csv'.format(course_code),
+                               ft.load_csv, 'Analysis_{}.csv'.format(
+                                       course_code))
     # Load Expiry Dates file
-    print('\nLoading {}...'.format('expiry_dates_{}.csv'.format(course_code)))
-    expiry_dates_data = ft.load_csv('expiry_dates_{}'.format(course_code), 'e')
-    print('Loaded {}.'.format('expiry_dates_{}.csv'.format(course_code)))
+    expiry_dates_data = get_job_data(job, 'expiry_dates_{}'.format(
+            course_code), 'expiry_dates_{}.csv'.format(course_code),
+            ft.load_csv, 'expiry_dates_{}'.format(course_code), 'e')
     # Extract Enrolment IDs from Analysis data into a list
     analysis_ids = ad.extract_list_item(analysis_data, 0)
     # Extract Enrolment IDs of students expiring < 30 days ago
     expiry_ids = get_expired_under(expiry_dates_data, 30)
     # Extract from Assessments Download data students with zero completion
-    zero_students = get_zero_students(assess_downloads_data, analysis_ids,
-                                      expiry_ids)
+    zero_students = time_stage(run_log, 'Get zero students',
+                               get_zero_students, assess_downloads_data,
+                               analysis_ids, expiry_ids)
     # Save file
     print('')
     headings = ['EnrolmentPK', 'StudentPK', 'NameGiven', 'NameSurname',
                 'CoursePK']
     file_name = 'Completed_0%_{}_'.format(course_code)
     ft.save_data_csv(zero_students, headings, file_name)
+    save_run_log(run_log)
     ft.process_warning_log(warnings, warnings_to_process)
 
 
@@ -2392,10 +3389,403 @@ def keep_filters():
             print('\nThat is not a valid response! Please enter either y or '
                   'n.')
 
+def load_applied_exports(course_code):
+    """Load the exports already applied to the masters for a course.
+    
+    Args:
+        course_code (str): Course code for the masters.
+        
+    Only the rows of the latest APPLIED_SOURCES exports applied to each
+    master are kept, so that the rows file does not grow with every export.
+    
+    Returns:
+        applied (dict): 'exports' holds each export applied to a master
+        (Master, Source, Rows, Pending, Timestamp), 'rows' holds the
+        fingerprint of each row applied to each master and 'export' the
+        export being applied (see check_applied_export).
+    """
+    exports_name = 'Applied_Exports_{}.csv'.format(course_code)
+    rows_name = 'Applied_Rows_{}.csv'.format(course_code)
+    applied = {'exports': pd.DataFrame(columns=['Master', 'Source', 'Rows',
+                                                'Pending', 'Timestamp']),
+               'rows': {'Completion': set(), 'Results': set()},
+               'export': None}
+    if os.path.isfile(exports_name):
+        print('\nLoading {}...'.format(exports_name))
+        applied['exports'] = pd.read_csv(exports_name, dtype=str,
+                                         keep_default_na=False)
+        print('Loaded {}.'.format(exports_name))
+    if os.path.isfile(rows_name):
+        print('\nLoading {}...'.format(rows_name))
+        rows_df = pd.read_csv(rows_name, dtype=str, keep_default_na=False)
+        print('Loaded {}.'.format(rows_name))
+        # Latest sources applied to each master
+        sources = rows_df[['Master', 'Source']].drop_duplicates(keep='last')
+        sources = sources.groupby('Master').tail(APPLIED_SOURCES)
+        keep = pd.MultiIndex.from_frame(rows_df[['Master', 'Source']]).isin(
+                pd.MultiIndex.from_frame(sources))
+        if not keep.all():
+            rows_df = rows_df[keep]
+            rows_df.to_csv(rows_name, index=False)
+            print('\nRemoved the rows of older exports from {}.'.format(
+                    rows_name))
+        for file_type, rows in rows_df.groupby('Master')['Row']:
+            applied['rows'][file_type] = set(rows)
+    return applied
+
+
+def load_assessment_data(course_code, file_name=None, confirm=True,
+                         applied=None, file_types=None):
+    """Load and prepare the month's assessment data for a course.
+    
+    Loads the Assessment Data File, removes students with duplicated names,
+    adds the student and enrolment IDs and Course and drops students that
+    could not be identified. Done once for updating either or both masters.
+    Rows already applied to the masters being updated are skipped.
+    
+    Args:
+        course_code (str): Course code to process.
+        file_name (str): Name of the Assessment Data File. Asked for if not
+        passed.
+        confirm (bool): False to continue without asking if there are
+        unknown students.
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports). All rows are kept if not passed.
+        file_types (list): Masters being updated, from: Completion, Results.
+        
+    Returns:
+        assessments_df (dataframe): Current month assessment data with IDs,
+        indexed by row fingerprint. None if every row has already been
+        applied.
+        source (str): Fingerprint of the Assessment Data File.
+    """
+    if not file_name:
+        file_name = get_export_file_name(course_code)
+    # Load assessment data file
+    print('\nLoading {}...'.format('{} Assessment Data File'.format(
+            course_code)))
+    assessment_data = ft.load_csv(file_name)
+    print('Loaded {}.'.format('{} Assessment Data File'.format(course_code)))
+    # Fingerprint of the export for recording changes against (the same on
+    # every update path)
+    source = get_file_hash(file_name)
+    # Load name index (Name to e_id, s_id, Course)
+    name_index = load_name_index(course_code)
+    # Load list of duplicate names (if any)
+    duplicates = load_duplicate_names(course_code)
+    # Load Assessments headings file
+    print('\nLoading {}...'.format('Assessment_Data_Headings.txt'))
+    assessment_headings = ft.load_headings('Assessment_Data_Headings', 'e')
+    print('Loaded {}.'.format('Assessment_Data_Headings.txt'))
+    # Place assessment_data into a DataFrame
+    assessments_df = pd.DataFrame(data = assessment_data, columns =
+                                  get_export_headings(assessment_headings))
+    # Check there are entries to process
+    check_df(assessments_df)
+    assessments_df.index = get_row_hashes(assessments_df)
+    if applied is not None:
+        # Skip the export, or the rows of it, already applied
+        if check_applied_export(applied, source, file_types,
+                                assessments_df.index):
+            print('\n{} Assessment Data File has already been applied to the '
+                  'Master {} File.'.format(course_code, ' and '.join(
+                          file_types)))
+            return None, source
+        assessments_df = remove_applied_rows(assessments_df, applied,
+                                             file_types)
+        if assessments_df.empty:
+            print('\nThere are no new rows in the {} Assessment Data File.'
+                  .format(course_code))
+            return None, source
+    num_rows = assessments_df.shape[0]
+    assessments_df, unknown_names = prepare_assessment_data(
+            assessments_df, name_index, duplicates, course_code,
+            assessment_headings)
+    if applied is not None:
+        applied['export']['Pending'] += num_rows - assessments_df.shape[0]
+    # Process unknown names so can be added manually or fixed and repeated
+    process_unknown_names(unknown_names, course_code, confirm)
+    # Check there are entries to process
+    check_df(assessments_df)
+    return assessments_df, source
+
+
+def load_assessment_data_chunks(file_name, course_code, chunk_size,
+                               unknown_names, applied=None, file_types=None):
+    """Yield the month's assessment data for a course in chunks.
+    
+    Streamed equivalent of load_assessment_data. The Assessment Data File is
+    read chunk_size rows at a time so that memory use does not grow with the
+    size of the file. Each chunk has rows already applied to the masters
+    removed, students with duplicated names removed, IDs added and unknown
+    students dropped.
+    
+    Args:
+        file_name (str): Name of the Assessment Data File.
+        course_code (str): Course code to process.
+        chunk_size (int): Number of rows to read at a time.
+        unknown_names (set): Updated with the names that could not be
+        matched to a student.
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports). All rows are kept if not passed.
+        file_types (list): Masters being updated, from: Completion, Results.
+        
+    Yields:
+        assessments_df (dataframe): Chunk of assessment data with IDs,
+        indexed by row fingerprint.
+    """
+    # Load name index (Name to e_id, s_id, Course)
+    name_index = load_name_index(course_code)
+    # Load list of duplicate names (if any)
+    duplicates = load_duplicate_names(course_code)
+    # Load Assessments headings file
+    print('\nLoading {}...'.format('Assessment_Data_Headings.txt'))
+    assessment_headings = ft.load_headings('Assessment_Data_Headings', 'e')
+    print('Loaded {}.'.format('Assessment_Data_Headings.txt'))
+    print('\nProcessing {} in chunks of {} rows.'.format(file_name,
+          chunk_size))
+    export_headings = get_export_headings(assessment_headings)
+    for assessments_df in pd.read_csv(file_name, chunksize=chunk_size,
+                                      dtype=str, keep_default_na=False):
+        assessments_df.columns = export_headings
+        assessments_df.index = get_row_hashes(assessments_df)
+        if applied is not None:
+            applied['export']['Rows'] += assessments_df.shape[0]
+            assessments_df = remove_applied_rows(assessments_df, applied,
+                                                 file_types)
+            applied['export']['New'] += assessments_df.shape[0]
+        num_rows = assessments_df.shape[0]
+        assessments_df, chunk_unknown = prepare_assessment_data(
+                assessments_df, name_index, duplicates, course_code,
+                assessment_headings)
+        if applied is not None:
+            applied['export']['Pending'] += (num_rows -
+                                             assessments_df.shape[0])
+        unknown_names.update(chunk_unknown)
+        yield assessments_df
+
+
+def load_master_update(file_type, course_code, job=None):
+    """Load a master file to be updated.
+    
+    Args:
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        job (dict): Action being run from a job file (None if not).
+        
+    Returns:
+        master (dict): Master being updated:
+            - headings: Column headings of the master file.
+            - data: Master record for each student (list of lists).
+            - index: Position of each EnrolmentID in data.
+            - delta: Changes to data.
+    """
+    # Load Master headings file
+    print('\nLoading {}...'.format('Master_{}_Headings_{}'.format(file_type,
+          course_code)))
+    master_headings = ft.load_headings('Master_{}_Headings_{}'.format(
+            file_type, course_code), 'e')
+    print('Loaded {}.'.format('Master_{}_Headings_{}'.format(file_type,
+          course_code)))
+    # Load master file for course
+    master_data = get_job_data(job, 'Master_{}_{}'.format(file_type,
+                               course_code), None, load_master, file_type,
+                               course_code, master_headings).values.tolist()
+    master = {}
+    master['headings'] = master_headings
+    master['data'] = master_data
+    # Index position of each student in the master (shared by all updates)
+    master['index'] = create_master_index(master_data)
+    # Changes to the master (shared by all updates)
+    master['delta'] = create_master_delta()
+    return master
+
+
+def load_passing_scores(course_code, assessments):
+    """Load the minimum passing score for each assessment in a course.
+    
+    Args:
+        course_code (str): Course code. Used to find the scores file.
+        assessments (list): Names of each assessment.
+        
+    Returns:
+        passing_scores (dict): Minimum passing score for each assessment.
+    """
+    # Load assessment scores
+    scores_name = get_score_name(course_code)
+    print('\nLoading {}...'.format(scores_name))
+    scores = ft.load_headings(scores_name, 'e')
+    print('Loaded {}.'.format(scores_name))
+    # Convert scores to ints
+    scores = convert_scores(scores)
+    # Create dictionary to hold passing scores for each assessment
+    passing_scores = get_passing_scores(scores, assessments)
+    # ad.debug_dict(passing_scores)
+    return passing_scores
+
+
+def load_month_index():
+    """Return the month index for the Months (Short) File.
+    
+    Returns:
+        month_index (dict): Keys are months and values are their codes (see
+        create_month_index).
+    """
+    return create_month_index(ft.load_headings('months_short', 'e'))
+
+
+def load_name_index(course_code):
+    """Load the name index for a course.
+    
+    The name index (Name_Index_<course_code>.csv) is created from the
+    Enrolment IDs File and saved. It is created again if the Enrolment IDs
+    File has changed since it was saved.
+    
+    Args:
+        course_code (str): Course code for the name index.
+        
+    Returns:
+        name_index (dataframe): Name index for the course (see
+        create_name_index).
+    """
+    enrolments_name = 'Enrolment_IDs_{}.csv'.format(course_code)
+    index_name = 'Name_Index_{}.csv'.format(course_code)
+    source = get_file_hash(enrolments_name)
+    if os.path.isfile(index_name):
+        name_index = pd.read_csv(index_name, dtype=str,
+                                 keep_default_na=False)
+        if not name_index.empty and (name_index['Source'] == source).all():
+            print('\nLoaded {}.'.format(index_name))
+            name_index['Ambiguous'] = name_index['Ambiguous'] == 'True'
+            return name_index
+    # Load Enrolment data (e_id, s_id, Course, Name) into a list of lists
+    print('\nLoading {}...'.format(enrolments_name))
+    enrolments = ft.load_csv(enrolments_name)
+    print('Loaded {}.'.format(enrolments_name))
+    name_index = create_name_index(enrolments, source)
+    name_index.to_csv(index_name, index=False)
+    print('\n{} has been updated.'.format(index_name))
+    return name_index
+
+
+def load_batch_inputs(course_codes):
+    """Load the files shared by the courses in a batch update.
+    
+    Loaded once and passed to each course rather than being loaded again for
+    every course.
+    
+    Args:
+        course_codes (list): Course codes to update.
+        
+    Returns:
+        shared (dict): Shared inputs:
+            - headings: Column headings of the assessment data with IDs.
+            - scores: Converted scores from each Scores File, by file name.
+            - transfer_pattern: Pattern used to find transfers.
+    """
+    shared = {}
+    # Load Assessments headings file
+    print('\nLoading {}...'.format('Assessment_Data_Headings.txt'))
+    shared['headings'] = ft.load_headings('Assessment_Data_Headings', 'e')
+    print('Loaded {}.'.format('Assessment_Data_Headings.txt'))
+    # Load assessment scores (courses with the same base code share a file)
+    shared['scores'] = {}
+    for course_code in course_codes:
+        scores_name = get_score_name(course_code)
+        if scores_name not in shared['scores']:
+            print('\nLoading {}...'.format(scores_name))
+            scores = ft.load_headings(scores_name, 'e')
+            print('Loaded {}.'.format(scores_name))
+            shared['scores'][scores_name] = convert_scores(scores)
+    shared['transfer_pattern'] = get_transfer_pattern()
+    return shared
+
+
+def load_duplicate_names(course_code):
+    """Load the names listed in the Duplicate Names File for a course.
+    
+    Names shared by more than one student in the Enrolment IDs File are found
+    automatically (see create_name_index), so the Duplicate Names File is
+    optional. It can be used to list further names to be processed manually.
+    
+    Args:
+        course_code (str): Course code for the Duplicate Names File.
+        
+    Returns:
+        duplicates (list): Listed duplicate names. Empty if there is no
+        Duplicate Names File.
+    """
+    file_name = 'Duplicate_Names_{}'.format(course_code)
+    if not os.path.isfile('{}.txt'.format(file_name)):
+        return []
+    print('\nLoading {}...'.format(file_name))
+    duplicates = ft.load_headings(file_name, 'e')
+    print('Loaded {}.'.format(file_name))
+    return duplicates
+
+
+def load_master(file_type, course_code, master_headings, columns=None):
+    """Return a master file as a dataframe.
+    
+    Loads the columnar (feather) master for the course and applies the
+    changes in its journal. If there is no feather master, or the CSV master
+    has been saved since it was updated, the CSV master is loaded instead.
+    Dates are held as dates in the feather master and are returned as
+    DD/MM/YYYY strings so that both sources give the same data.
+    
+    Args:
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        master_headings (list): Column headings of the master file.
+        columns (list): Columns to load. All columns are loaded if not passed.
+        Must include EnrolmentID.
+        
+    Returns:
+        master_df (dataframe): Master file data.
+    """
+    csv_name = 'Master_{}_{}.csv'.format(file_type, course_code)
+    feather_name = 'Master_{}_{}.feather'.format(file_type, course_code)
+    journal_name = 'Master_{}_{}_Journal.csv'.format(file_type, course_code)
+    use_feather = get_master_source(file_type, course_code) == 'feather'
+    if use_feather:
+        print('\nLoading {}...'.format(feather_name))
+        try:
+            master_df = pd.read_feather(feather_name, columns=columns)
+        except ImportError:
+            print('\npyarrow is required to load {}. {} will be used '
+                  'instead.'.format(feather_name, csv_name))
+            use_feather = False
+        else:
+            print('Loaded {}.'.format(feather_name))
+            # Convert dates back to DD/MM/YYYY
+            for col in get_master_date_cols(file_type, master_headings):
+                if (col in master_df.columns and
+                    pd.api.types.is_datetime64_any_dtype(master_df[col])):
+                    master_df[col] = master_df[col].dt.strftime(
+                            '%d/%m/%Y').fillna('')
+            # Apply changes made since the feather master was saved
+            if os.path.isfile(journal_name):
+                print('\nLoading {}...'.format(journal_name))
+                journal_df = pd.read_csv(journal_name, dtype=str,
+                                         keep_default_na=False)
+                print('Loaded {}.'.format(journal_name))
+                master_df = apply_master_journal(master_df, journal_df)
+    if not use_feather:
+        print('\nLoading {}...'.format(csv_name))
+        master_data = ft.load_csv(csv_name)
+        print('Loaded {}.'.format(csv_name))
+        master_df = pd.DataFrame(data=master_data, columns=master_headings)
+        if columns is not None:
+            master_df = master_df[columns]
+    return master_df
+
+
 def main():
     repeat = True
     low = 1
-    high = 14
+    high = 17
     while repeat:
         try_again = False
         main_message()
@@ -2436,6 +3826,12 @@ def main():
                 identify_range_comp()
             elif action == 13:
                 continue
+            elif action == 14:
+                export_master_files()
+            elif action == 15:
+                update_both_files()
+            elif action == 16:
+                update_batch_files()
             elif action == high:
                 print('\nIf you have generated any files, please find them '
                       'saved to disk. Goodbye.')
@@ -2464,16 +3860,174 @@ def main_message():
     print('11 Identify Expired Students At Most X% Completion')
     print('12 Identify Expired Students Between X% and Y% Completion')
     print('13 Identify Graduated Students')
-    print('14 Exit')
+    print('14 Export Master Files')
+    print('15 Update Master Completion and Results Files')
+    print('16 Batch Update Master Files')
+    print('17 Exit')
+
+
+def merge_grades(master, assessments_df, grade_cols, num_cols, values,
+                 master_index=None, master_delta=None):
+    """Merge the month's assessments into a master file in one step.
+    
+    Set based equivalent of the row by row update functions. The first entry
+    for each student and grade item is pivoted into a student x grade item
+    grid and applied to the master rows for those students in a single step.
+    Only cells that are empty in the master are filled (first value wins).
+    Students not in the master are appended in the order they are first seen.
+    Changes are recorded in master_delta rather than made to master.
+    
+    Args:
+        master (list): Master record for each student.
+        assessments_df (dataframe): Current month assessments to be updated.
+        grade_cols (dict): Position in the master of the column for each
+        Grade item.
+        num_cols (int): Number of columns in a master row.
+        values (dict): Column in assessments_df to take each value from as the
+        key and the offset from the Grade item column it is saved to as the
+        value.
+        master_index (dict): Position of each EnrolmentID in master. Created
+        from master if not passed. Students added to the master are added to
+        the index so that it can be shared with further updates.
+        master_delta (dict): Changes to master from earlier updates. Created
+        if not passed.
+    
+    Returns:
+        master_delta (dict): Updated with current month assessments.
+    """
+    if master_index is None:
+        master_index = create_master_index(master)
+    if master_delta is None:
+        master_delta = create_master_delta()
+    # Nothing to merge
+    if assessments_df.empty:
+        return master_delta
+    # Keep the first entry for each student and grade item
+    month_df = assessments_df.drop_duplicates(subset=['EnrolmentID',
+                                                      'Grade item'])
+    students = month_df['EnrolmentID'].unique()
+    grade_items = month_df['Grade item'].unique()
+    positions = [master_index.get(student) for student in students]
+    # Create records for students not in the master
+    info_df = assessments_df.drop_duplicates(subset=['EnrolmentID'])
+    info_df = info_df.set_index('EnrolmentID')
+    new_students = [student for student, position in zip(students, positions)
+                    if position is None]
+    new_info = info_df.loc[new_students, ['StudentID', 'Name',
+                                          'Course']].values.tolist()
+    blank = [''] * (num_cols - 4)
+    new_records = [[student] + info + blank for student, info in
+                   zip(new_students, new_info)]
+    # Rows to be updated, in the order students are first seen
+    rows = []
+    n = 0
+    for position in positions:
+        if position is None:
+            rows.append(new_records[n])
+            n += 1
+        else:
+            rows.append(get_master_row(master, master_delta, position))
+    data = np.array(rows, dtype=object)
+    # Student x grade item grid for each value
+    month_grid = month_df.pivot(index='EnrolmentID', columns='Grade item',
+                                values=list(values.keys()))
+    month_grid = month_grid.reindex(index=students)
+    # Get columns to update
+    cols = np.array([grade_cols[item] for item in grade_items])
+    # Cells to fill - empty in the master and completed this month
+    current = data[:, cols]
+    first_value = list(values.keys())[0]
+    completed = month_grid[first_value].reindex(columns=grade_items).notna()
+    fill = (pd.isna(current) | (current == '')) & completed.values
+    for value, offset in values.items():
+        grid = month_grid[value].reindex(columns=grade_items).values
+        data[:, cols + offset] = np.where(fill, grid, data[:, cols + offset])
+    # Record filled cells of students already in the master
+    fill_rows, fill_cols = np.nonzero(fill)
+    for i, j in zip(fill_rows.tolist(), fill_cols.tolist()):
+        if positions[i] is not None:
+            for offset in values.values():
+                col = cols[j] + offset
+                set_master_cell(master, master_delta, positions[i], col,
+                                data[i, col])
+    # Add new students
+    for i in range(len(students)):
+        if positions[i] is None:
+            master_index[students[i]] = len(master) + len(
+                    master_delta['rows'])
+            master_delta['rows'].append(data[i].tolist())
+    return master_delta
+
+
+def merge_grades_comp(master, assessments_df, assessment_names,
+                      master_index=None, master_delta=None):
+    """Merge completed assessments into Master Completions in one step.
+    
+    Set based equivalent of update_grades_comp. Allocates to each grade item
+    the month the assessment was completed where it is empty in the master.
+    
+    Args:
+        master (list): Master record of all assessments for each student.
+        assessments_df (dataframe): Current month assessments to be updated.
+        assessment_names (list): List of each assessment name.
+        master_index (dict): Position of each EnrolmentID in master.
+        master_delta (dict): Changes to master from earlier updates.
+    
+    Returns:
+        master_delta (dict): Updated with current month assessments.
+    """
+    print('\nUpdating Master File (Completions)')
+    # Add 4 to skip the non-assessment columns in Master
+    grade_cols = {}
+    n = 4
+    for assessment in assessment_names:
+        grade_cols[assessment] = n
+        n += 1
+    master_delta = merge_grades(master, assessments_df, grade_cols, n,
+                                {'Date and time': 0}, master_index,
+                                master_delta)
+    print('Finished processing Assessment Data\n')
+    return master_delta
+
+
+def merge_grades_res(master, assessments_df, master_headings,
+                     master_index=None, master_delta=None):
+    """Merge completed assessments into Master Results in one step.
+    
+    Set based equivalent of update_grades_res. Allocates to each grade item
+    the grade, and to the following column the date completed, where the
+    grade item is empty in the master.
+    
+    Args:
+        master (list): Master record of all results for each student.
+        assessments_df (dataframe): Current month assessments to be updated.
+        Grade item must be the heading used in the Master Results file.
+        master_headings (list): Column headings of the Master Results file.
+        master_index (dict): Position of each EnrolmentID in master.
+        master_delta (dict): Changes to master from earlier updates.
+    
+    Returns:
+        master_delta (dict): Updated with current month results.
+    """
+    print('\nUpdating Master File (Results)')
+    grade_cols = {}
+    n = 4 # Skip first four items in master_headings (student data)
+    while n < len(master_headings):
+        grade_cols[master_headings[n]] = n
+        n += 2 # Skip date column and progress to next assessment
+    master_delta = merge_grades(master, assessments_df, grade_cols,
+                                len(master_headings),
+                                {'Revised grade': 0, 'Date and time': 1},
+                                master_index, master_delta)
+    print('Finished processing Assessment Data\n')
+    return master_delta
 
 
 def process_age_filter(lower, upper, comp_data, res_data):
-    """Apply age filter to data.
+    """Return the masks for an age filter.
     
-    Applies the selected age filter to the Completion and Results data. Only
-    rows meeting the filter condition are returned. If the filter will result
-    in no rows being returned, the filter is discarded and the passed data is
-    returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    age filter condition. The data itself is not changed.
     
     Args:
         lower (int): Lowest value for age range.
@@ -2482,39 +4036,18 @@ def process_age_filter(lower, upper, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
-    """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Convert ages outside lower and upper values to NaN
-    filtered_comp_data['Age'] = filtered_comp_data['Age'].apply(
-            apply_age_filter, args=(lower, upper,))
-    filtered_res_data['Age'] = filtered_res_data['Age'].apply(
-            apply_age_filter, args=(lower, upper,))
-    # Drop ages that are NaN
-    filtered_comp_data.dropna(subset=['Age'], inplace=True)
-    filtered_res_data.dropna(subset=['Age'], inplace=True)
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter
-        
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
+    """
+    return (apply_age_filter(comp_data['Age'], lower, upper),
+            apply_age_filter(res_data['Age'], lower, upper))
+
 
 def process_course_filter(filter_option, comp_data, res_data):
-    """Apply course filter to data.
+    """Return the masks for a course filter.
     
-    Applies the selected course filter to the Completion and Results data. Only
-    rows meeting the filter condition are returned. If the filter will result
-    in no rows being returned, the filter is discarded and the passed data is
-    returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    course filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
@@ -2522,140 +4055,78 @@ def process_course_filter(filter_option, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter
     if filter_option == 'Online students':
-        # Convert non-online courses to NaN
-        filtered_comp_data['Course'] = filtered_comp_data['Course'].apply(
-                apply_course_filter, args=('ON',))
-        filtered_res_data['Course'] = filtered_res_data['Course'].apply(
-                apply_course_filter, args=('ON',))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Course'], inplace=True)
-        filtered_res_data.dropna(subset=['Course'], inplace=True)
+        target, wild_cards = 'ON', True
     elif filter_option == 'Part-time students':
-        # Convert non-part-time courses to NaN
-        filtered_comp_data['Course'] = filtered_comp_data['Course'].apply(
-                apply_course_filter, args=('PT',))
-        filtered_res_data['Course'] = filtered_res_data['Course'].apply(
-                apply_course_filter, args=('PT',))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Course'], inplace=True)
-        filtered_res_data.dropna(subset=['Course'], inplace=True)
+        target, wild_cards = 'PT', True
     elif filter_option == 'CPD students':
-        # Convert non-cpd courses to NaN
-        filtered_comp_data['Course'] = filtered_comp_data['Course'].apply(
-                apply_course_filter, args=('CPD',))
-        filtered_res_data['Course'] = filtered_res_data['Course'].apply(
-                apply_course_filter, args=('CPD',))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Course'], inplace=True)
-        filtered_res_data.dropna(subset=['Course'], inplace=True)
+        target, wild_cards = 'CPD', True
     elif filter_option == 'Specific course students':
         # Load list of valid course codes
         # Get specific course
         course = 'ADV-PT-006' # Temp working value
         # Check if course exists
-        # Filter based on course
-        filtered_comp_data['Course'] = filtered_comp_data['Course'].apply(
-                apply_course_filter, args=(course,False))
-        filtered_res_data['Course'] = filtered_res_data['Course'].apply(
-                apply_course_filter, args=(course,False))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Course'], inplace=True)
-        filtered_res_data.dropna(subset=['Course'], inplace=True)
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
+        target, wild_cards = course, False
     else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter 
+        return create_filter_masks(comp_data, res_data)
+    return (apply_course_filter(comp_data['Course'], target, wild_cards),
+            apply_course_filter(res_data['Course'], target, wild_cards))
 
 
-def process_el_filter(filter_option, comp_data, res_data):
-    """Apply enrolment length filter to data.
+def process_el_filter(filter_option, comp_data, res_data, limits=None):
+    """Return the masks for an enrolment length filter.
     
-    Applies the selected enrolment length filter to the Completion and Results
-    data. Only rows meeting the filter condition are returned. If the filter
-    will result in no rows being returned, the filter is discarded and the 
-    passed data is returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    enrolment length filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
         comp_data (dataframe): Completion data.
         res_data (dataframe): Results data.
+        limits (tuple): Days enrolled for the option - (maximum,),
+        (minimum,) or (minimum, maximum). Asked for if not passed.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter
     if filter_option == 'No more than x days enrolled':
         # Get max days enrolled
-        maximum = get_value('maximum days enrolled')
-        # Convert enrolment lenghts outside filter to NaN
-        filtered_comp_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_below, args=(maximum,))
-        filtered_res_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_below, args=(maximum,))
-        # Drop enrolment lengths that are NaN
-        filtered_comp_data.dropna(subset=['EnrolLength'], inplace=True)
-        filtered_res_data.dropna(subset=['EnrolLength'], inplace=True)
+        if limits:
+            maximum = limits[0]
+        else:
+            maximum = get_value('maximum days enrolled')
+        return (apply_el_filter_below(comp_data['EnrolLength'], maximum),
+                apply_el_filter_below(res_data['EnrolLength'], maximum))
     elif filter_option == 'No less than x days enrolled':
         # Get min days enrolled
-        minimum = get_value('minimum days enrolled')
-        # Convert enrolment lenghts outside filter to NaN
-        filtered_comp_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_above, args=(minimum,))
-        filtered_res_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_above, args=(minimum,))
-        # Drop enrolment lengths that are NaN
-        filtered_comp_data.dropna(subset=['EnrolLength'], inplace=True)
-        filtered_res_data.dropna(subset=['EnrolLength'], inplace=True)
+        if limits:
+            minimum = limits[0]
+        else:
+            minimum = get_value('minimum days enrolled')
+        return (apply_el_filter_above(comp_data['EnrolLength'], minimum),
+                apply_el_filter_above(res_data['EnrolLength'], minimum))
     elif filter_option == 'Between x and y days enrolled':
-        # Get min days enrolled
-        minimum, maximum = get_value_range('days enrolled')
-        # Convert enrolment lenghts outside filter to NaN
-        filtered_comp_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_between, args=(minimum,
-                maximum,))
-        filtered_res_data['EnrolLength'] = filtered_comp_data[
-                'EnrolLength'].apply(apply_el_filter_between, args=(minimum,
-                maximum,))
-        # Drop enrolment lengths that are NaN
-        filtered_comp_data.dropna(subset=['EnrolLength'], inplace=True)
-        filtered_res_data.dropna(subset=['EnrolLength'], inplace=True)
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter 
+        # Get min and max days enrolled
+        if limits:
+            minimum, maximum = limits
+        else:
+            minimum, maximum = get_value_range('days enrolled')
+        return (apply_el_filter_between(comp_data['EnrolLength'], minimum,
+                                        maximum),
+                apply_el_filter_between(res_data['EnrolLength'], minimum,
+                                        maximum))
+    return create_filter_masks(comp_data, res_data)
 
 
 def process_ethnicity_filter(filter_option, comp_data, res_data):
-    """Apply ethnicity filter to data.
+    """Return the masks for an ethnicity filter.
     
-    Applies the selected ethnicity filter to the Completion and Results data.
-    Only rows meeting the filter condition are returned. If the filter will
-    result in no rows being returned, the filter is discarded and the passed
-    data is returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    ethnicity filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
@@ -2663,64 +4134,31 @@ def process_ethnicity_filter(filter_option, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter
     if filter_option == 'Maori students':
-        # Convert non-maori students to NaN
-        filtered_comp_data['Ethnicity'] = filtered_comp_data[
-                'Ethnicity'].apply(apply_filter, args=('Maori',))
-        filtered_comp_data['Ethnicity'] = filtered_comp_data[
-                'Ethnicity'].apply(apply_filter, args=('Maori',))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Ethnicity'], inplace=True)
-        filtered_res_data.dropna(subset=['Ethnicity'], inplace=True)
+        return (apply_filter(comp_data['Ethnicity'], 'Maori'),
+                apply_filter(res_data['Ethnicity'], 'Maori'))
     elif filter_option == 'Pacific Island students':
-        # Convert non-pacific students to NaN
-        filtered_comp_data['Pacific'] = filtered_comp_data['Pacific'].apply(
-                apply_pacific_filter, args=(True,))
-        filtered_res_data['Pacific'] = filtered_res_data['Pacific'].apply(
-                apply_pacific_filter, args=(True,))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Pacific'], inplace=True)
-        filtered_res_data.dropna(subset=['Pacific'], inplace=True)
+        return (apply_pacific_filter(comp_data['Pacific'], True),
+                apply_pacific_filter(res_data['Pacific'], True))
     elif filter_option == 'Specific ethnicity students':
         # Get ethnicity
         target_ethnicity = 'NZ European' # Temp value
-        # Convert non-target etnicity students to NaN
-        filtered_comp_data['Ethnicity'] = filtered_comp_data[
-                'Ethnicity'].apply(apply_filter, args=(target_ethnicity,))
-        filtered_comp_data['Ethnicity'] = filtered_comp_data[
-                'Ethnicity'].apply(apply_filter, args=(target_ethnicity,))
-        # Drop students that are NaN
-        filtered_comp_data.dropna(subset=['Ethnicity'], inplace=True)
-        filtered_res_data.dropna(subset=['Ethnicity'], inplace=True)
+        return (apply_filter(comp_data['Ethnicity'], target_ethnicity),
+                apply_filter(res_data['Ethnicity'], target_ethnicity))
     elif filter_option == 'Filter on multiple ethnicities':
         # To complete
         print('\nFunction to be written.')
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter
+    return create_filter_masks(comp_data, res_data)
 
 
 def process_gender_filter(filter_option, comp_data, res_data):
-    """Apply gender filter to data.
+    """Return the masks for a gender filter.
     
-    Applies the selected gender filter to the Completion and Results data.
-    Only rows meeting the filter condition are returned. If the filter will
-    result in no rows being returned, the filter is discarded and the passed
-    data is returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    gender filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
@@ -2728,50 +4166,23 @@ def process_gender_filter(filter_option, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter
     if filter_option == 'Female students':
-        # Convert non-female students to NaN
-        filtered_comp_data['Gender'] = filtered_comp_data[
-                'Gender'].apply(apply_filter, args=('Female',))
-        filtered_res_data['Gender'] = filtered_res_data[
-                'Gender'].apply(apply_filter, args=('Female',))
-        # Drop courses that are NaN
-        filtered_comp_data.dropna(subset=['Gender'], inplace=True)
-        filtered_res_data.dropna(subset=['Gender'], inplace=True)
+        return (apply_filter(comp_data['Gender'], 'Female'),
+                apply_filter(res_data['Gender'], 'Female'))
     elif filter_option == 'Male students':
-        # Convert non-male students to NaN
-        filtered_comp_data['Gender'] = filtered_comp_data[
-                'Gender'].apply(apply_filter, args=('Male',))
-        filtered_res_data['Gender'] = filtered_res_data[
-                'Gender'].apply(apply_filter, args=('Male',))
-        # Drop students that are NaN
-        filtered_comp_data.dropna(subset=['Gender'], inplace=True)
-        filtered_res_data.dropna(subset=['Gender'], inplace=True)
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter
+        return (apply_filter(comp_data['Gender'], 'Male'),
+                apply_filter(res_data['Gender'], 'Male'))
+    return create_filter_masks(comp_data, res_data)
 
 
 def process_status_filter(filter_option, comp_data, res_data):
-    """Apply status filter to data.
+    """Return the masks for a status filter.
     
-    Applies the selected status filter to the Completion and Results data.
-    Only rows meeting the filter condition are returned. If the filter will
-    result in no rows being returned, the filter is discarded and the passed
-    data is returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    status filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
@@ -2779,53 +4190,27 @@ def process_status_filter(filter_option, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter TO DO
     if filter_option == 'Multiple':
         # To complete
         print('\nFunction to be written.')
     elif filter_option == 'Non-active':
-        # Convert active students to NaN
-        filtered_comp_data['Status'] = filtered_comp_data['Status'].apply(
-                apply_filter, args=('Active',False,))
-        filtered_res_data['Status'] = filtered_res_data['Status'].apply(
-                apply_filter, args=('Active',False,))
-        # Drop students that are NaN
-        filtered_comp_data.dropna(subset=['Status'], inplace=True)
-        filtered_res_data.dropna(subset=['Status'], inplace=True)
+        # Keep students that are not active
+        return (apply_filter(comp_data['Status'], 'Active', False),
+                apply_filter(res_data['Status'], 'Active', False))
     elif filter_option:
-        # Convert non-matching students to NaN
-        filtered_comp_data['Status'] = filtered_comp_data['Status'].apply(
-                apply_filter, args=(filter_option,))
-        filtered_res_data['Status'] = filtered_res_data['Status'].apply(
-                apply_filter, args=(filter_option,))
-        # Drop students that are NaN
-        filtered_comp_data.dropna(subset=['Status'], inplace=True)
-        filtered_res_data.dropna(subset=['Status'], inplace=True)
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter
+        return (apply_filter(comp_data['Status'], filter_option),
+                apply_filter(res_data['Status'], filter_option))
+    return create_filter_masks(comp_data, res_data)
 
 
 def process_tutor_filter(filter_option, comp_data, res_data):
-    """Apply tutor filter to data.
+    """Return the masks for a tutor filter.
     
-    Applies the selected status filter to the Completion and Results data.
-    Only rows meeting the filter condition are returned. If the filter will
-    result in no rows being returned, the filter is discarded and the passed
-    data is returned.
+    Finds the rows of the Completion and Results data that meet the selected
+    tutor filter condition. The data itself is not changed.
     
     Args:
         filter_option (str): Filter option to be applied.
@@ -2833,32 +4218,73 @@ def process_tutor_filter(filter_option, comp_data, res_data):
         res_data (dataframe): Results data.
     
     Returns:
-        filtered_comp_data (dataframe): Filtered Completion data.
-        filtered_res_data (dataframe): Filtered Results data.
-        valid_filter (bool): True if filter has been applied, False if not.
+        comp_mask (series): True for Completion rows meeting the filter.
+        res_mask (series): True for Results rows meeting the filter.
     """
-    # Make copy of dataframes in case need to revert
-    filtered_comp_data = comp_data.copy()
-    filtered_res_data = res_data.copy()
-    # Apply passed filter TO DO
     if filter_option == 'Specific tutor':
         # To complete
         print('\nFunction to be written.')
     elif filter_option == 'Filter on multiple tutors':
         # To complete
         print('\nFunction to be written.')
-    # Check that filter returns at least one row
-    if filtered_comp_data.empty or filtered_comp_data.empty:
-        # Return original data
-        valid_filter = False
-        return comp_data, res_data, valid_filter
-    else:
-        # Return updated data
-        valid_filter = True
-        return filtered_comp_data, filtered_res_data, valid_filter
+    return create_filter_masks(comp_data, res_data)
+
 
+def prepare_assessment_data(assessments_df, name_index, duplicates,
+                            course_code, assessment_headings):
+    """Prepare assessment data for updating the masters.
+    
+    Removes students with duplicated or ambiguous names, adds the student and
+    enrolment IDs and Course and drops students that could not be
+    identified.
+    
+    Args:
+        assessments_df (dataframe): Assessment data without IDs.
+        name_index (dataframe): Name index for the course.
+        duplicates (list): Listed duplicated student names.
+        course_code (str): Course code. Used for save file names.
+        assessment_headings (list): Column headings of the assessment data
+        with IDs.
+        
+    Returns:
+        assessments_df (dataframe): Assessment data with IDs.
+        unknown_names (set): Names that could not be matched to a student.
+    """
+    # Names that cannot be matched to one student: those listed and those
+    # shared by more than one student in the Enrolment IDs File
+    duplicates = get_duplicate_names(assessments_df, name_index, duplicates)
+    # Extract data for students on duplicates list and remove from assessments
+    assessments_df = remove_duplicated(assessments_df, duplicates,
+                                       course_code)
+    # Add student and enrolment IDs and Course to assessment data
+    assessments_df, unknown_names = add_enrolment_ids(assessments_df,
+                                                      name_index,
+                                                      assessment_headings)
+    # Drop Unknown students so can be done manually
+    assessments_df = assessments_df[assessments_df['EnrolmentID'] !=
+                                    'Unknown']
+    return assessments_df, unknown_names
 
-def process_unknown_names(names, course):
+
+def process_unknown_grade_items(grade_items):
+    """Display grade items that do not have a passing score.
+    
+    Entries for these grade items are not counted as passing. They are
+    usually assessments that have been added to the course but not to the
+    Assessment Names and Scores files.
+    
+    Args:
+        grade_items (set): Grade items without a passing score.
+    """
+    if grade_items:
+        print('\nThe following grade items do not have a passing score. '
+              'Their entries have not been processed. Please add them to the '
+              'Assessment Names and Scores files if they need to be '
+              'processed.')
+        ad.debug_list(sorted(grade_items))
+
+
+def process_unknown_names(names, course, confirm=True):
     """Display unknown names and save to file.
     
     If there are unknown names, they are displayed and saved to a text file.
@@ -2870,6 +4296,7 @@ def process_unknown_names(names, course):
     Args:
         names (set): Names that are not recognised.
         course (str): Course code for save file name.
+        confirm (bool): False to continue without asking (batch updates).
     """
     if names:
         print('\nCould not find the Student ID for the following students. '
@@ -2880,6 +4307,8 @@ def process_unknown_names(names, course):
         f_name = 'Unknown_students_{}_{}.txt'.format(course,
                                    ft.generate_time_string())
         ft.save_list_to_text(names, f_name)
+        if not confirm:
+            return
         print('\nIf you continue, you will need to update the Master File '
               'manually to add these students. Alterntaively, you can quit the'
               ' program now and add these students to the Enrolment_IDs file '
@@ -2898,6 +4327,72 @@ def process_unknown_names(names, course):
         print('\nNo unknown names found.')
             
 
+def process_unparsed_dates(dates):
+    """Display Date and time values that could not be read.
+    
+    Entries with these values are not processed as the month and date they
+    were completed is not known.
+    
+    Args:
+        dates (set): Date and time values that could not be read.
+    """
+    if dates:
+        print('\nThe following Date and time values could not be read. Their '
+              'entries have not been processed and will need to be updated '
+              'manually.')
+        ad.debug_list(sorted(dates))
+
+
+def record_new_students(new_order, master, enrolment_ids, key):
+    """Record when students not in a master are first seen.
+    
+    Used by update_masters_streamed so that students added to the master are
+    put in the same order as when the Assessment Data File is processed in
+    one go (see sort_new_students).
+    
+    Args:
+        new_order (dict): Sort key of each student not in the master.
+        Updated with the students in enrolment_ids.
+        master (dict): Master being updated (see load_master_update).
+        enrolment_ids (series): EnrolmentID of each entry, in file order.
+        key (tuple): Start of the sort key for the entries. The position the
+        student is first seen in enrolment_ids is added to it.
+    """
+    num_students = len(master['data'])
+    for n, enrolment_id in enumerate(pd.unique(enrolment_ids)):
+        # Students already in the master keep their place
+        if master['index'].get(enrolment_id, num_students) < num_students:
+            continue
+        order = key + (n,)
+        new_order[enrolment_id] = min(new_order.get(enrolment_id, order),
+                                      order)
+
+
+def remove_applied_rows(assessments_df, applied, file_types):
+    """Remove rows of assessment data already applied to the masters.
+    
+    Rows are kept if they have not been applied to at least one of the
+    masters being updated.
+    
+    Args:
+        assessments_df (dataframe): Assessment data indexed by row
+        fingerprint (see get_row_hashes).
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports).
+        file_types (list): Masters being updated, from: Completion, Results.
+        
+    Returns:
+        assessments_df (dataframe): Rows not yet applied.
+    """
+    done = np.ones(assessments_df.shape[0], dtype=bool)
+    for file_type in file_types:
+        done &= assessments_df.index.isin(applied['rows'][file_type])
+    if done.any():
+        print('\n{} rows have already been applied and will be skipped.'
+              .format(done.sum()))
+    return assessments_df[~done]
+
+
 def remove_duplicated(assessments, duplicates, course):
     """Saves data for duplicated names and removes that data from enrolments.
     
@@ -2909,24 +4404,17 @@ def remove_duplicated(assessments, duplicates, course):
     dataset.
     
     Args:
-        assessments (list): List of lists with assessment data.
-        duplicates (list): List of duplicated student names.
+        assessments (dataframe): Assessment data without IDs.
+        duplicates (set): Duplicated student names.
         course (str): Course code. Used for save file name.
         
     Returns:
-        updated_assessments (list): Student assessments with duplicated student
-        names' entries removed.
+        updated_assessments (dataframe): Student assessments with duplicated
+        student names' entries removed.
     """
-    duplicate_assessments = [] # To hold entries for found duplicates
-    duplicate_names = set() # To hold names that have been extracted
-    updated_assessments = [] # To hold non-duplicates
     # Check each record for a duplicate name
-    for record in assessments:
-        if record[1] in duplicates:
-            duplicate_assessments.append(record)
-            duplicate_names.add(record[1])
-        else:
-            updated_assessments.append(record)
+    duplicated = assessments['Name'].isin(duplicates)
+    duplicate_names = set(assessments.loc[duplicated, 'Name'])
     # Print out list of duplicates removed
     if not duplicate_names:
         print('\nNo duplicated names were found.')
@@ -2936,202 +4424,742 @@ def remove_duplicated(assessments, duplicates, course):
         # Save duplicated data
         file_name = '{}_Duplicate_Name_Assessments_{}.txt'.format(course,
                      ft.generate_time_string())
-        ft.save_list_to_text(duplicate_assessments, file_name)
+        ft.save_list_to_text(assessments[duplicated].values.tolist(),
+                             file_name)
         print('\nDuplicated students saved to {}. Please process these students '
               'manually.'.format(file_name))
     # Return updated_assessments
-    return updated_assessments
+    return assessments[~duplicated]
+
+
+def run_job_file(file_name):
+    """Run the actions listed in a job file without asking for input.
+    
+    Actions are run in order in one process. Data loaded by an action (e.g.
+    masters, enrolment and student data) is reused by later actions, and
+    masters updated by an action are used by later actions.
+    
+    Args:
+        file_name (str): Name of the job file (JSON). See README for the
+        structure.
+    """
+    actions = {'update_comp_file': update_comp_file,
+               'update_res_file': update_res_file,
+               'update_both_files': update_both_files,
+               'analysis': analysis,
+               'analyse_module': analyse_module,
+               'identify_zero_comp': identify_zero_comp,
+               'identify_at_least_comp': identify_at_least_comp,
+               'identify_at_most_comp': identify_at_most_comp,
+               'identify_range_comp': identify_range_comp,
+               'export_master_files': export_master_files}
+    print('\nLoading {}...'.format(file_name))
+    with open(file_name) as f:
+        job_file = json.load(f)
+    print('Loaded {}.'.format(file_name))
+    # Data shared by the actions
+    data = {}
+    for step in job_file['actions']:
+        job = dict(step)
+        action = job.pop('action')
+        job['data'] = data
+        if action not in actions:
+            print('\n{} is not a valid action and will be skipped.'.format(
+                    action))
+            continue
+        print('\nRunning {} for {}.'.format(action, job.get('course')))
+        try:
+            actions[action](job=job)
+        except SystemExit:
+            print('\n{} for {} did not complete. Continuing with the next '
+                  'action.'.format(action, job.get('course')))
+    print('\nJob {} has been completed.'.format(file_name))
+
+
+def save_applied_export(applied, course_code, file_type):
+    """Record the rows of the export being applied to a master.
+    
+    Every row of the export is recorded, including rows that could not be
+    matched to a student (e.g. unknown names). Those rows are saved for
+    manual processing when the export is loaded and are counted as pending.
+    The rows of a streamed export are not recorded, only the export. Nothing
+    is recorded if every row had already been applied.
+    
+    Args:
+        applied (dict): Exports applied to the masters (see
+        load_applied_exports).
+        course_code (str): Course code for the master.
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+    """
+    exports_name = 'Applied_Exports_{}.csv'.format(course_code)
+    rows_name = 'Applied_Rows_{}.csv'.format(course_code)
+    export = applied['export']
+    rows = applied['rows'][file_type]
+    if export['Row hashes'] is None:
+        new_rows = []
+        if not export['New']:
+            return
+    else:
+        new_rows = sorted(set(export['Row hashes']) - rows)
+        if not new_rows:
+            return
+    rows.update(new_rows)
+    export_df = pd.DataFrame(data=[[file_type, export['Source'],
+                                    str(export['Rows']),
+                                    str(export['Pending']),
+                                    ft.generate_time_string()]],
+                             columns=applied['exports'].columns)
+    applied['exports'] = pd.concat([applied['exports'], export_df],
+                                   ignore_index=True)
+    export_df.to_csv(exports_name, mode='a',
+                     header=not os.path.isfile(exports_name), index=False)
+    if new_rows:
+        rows_df = pd.DataFrame({'Master': file_type,
+                                'Source': export['Source'], 'Row': new_rows})
+        rows_df.to_csv(rows_name, mode='a',
+                       header=not os.path.isfile(rows_name), index=False)
+
+
+def save_master(master_df, file_type, course_code, master_headings):
+    """Save a master file in columnar (feather) format.
+    
+    The feather master is read in preference to the CSV master by
+    load_master. Date columns are saved as dates, unless a column has a value
+    that is not a DD/MM/YYYY date, in which case it is saved as text so that
+    no value is lost. If pyarrow is not installed
+    the feather master is not saved and the CSV master must be used.
+    
+    Args:
+        master_df (dataframe): Master file data.
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        master_headings (list): Column headings of the master file.
+        
+    Returns:
+        True if the feather master was saved.
+        False if pyarrow is not installed.
+    """
+    feather_name = 'Master_{}_{}.feather'.format(file_type, course_code)
+    master_df = master_df.copy()
+    # Store dates as dates, keeping columns with other values as text
+    for col in get_master_date_cols(file_type, master_headings):
+        dates = pd.to_datetime(master_df[col], format='%d/%m/%Y',
+                               errors='coerce')
+        entered = master_df[col].notna() & (master_df[col] != '')
+        unchanged = dates.dt.strftime('%d/%m/%Y') == master_df[col]
+        bad_cells = master_df.loc[entered & ~unchanged, col]
+        if bad_cells.empty:
+            master_df[col] = dates
+        else:
+            print('\n{} has {} values that are not dates in the format '
+                  'DD/MM/YYYY (e.g. {}). It will be saved as text.'.format(
+                  col, len(bad_cells), bad_cells.iloc[0]))
+    try:
+        master_df.reset_index(drop=True).to_feather(feather_name)
+    except ImportError:
+        print('\npyarrow is required to save {}.'.format(feather_name))
+        return False
+    print('\n{} has been saved.'.format(feather_name))
+    return True
+
+
+def save_master_changes(master, master_delta, file_type, course_code,
+                        master_headings, source, max_entries=50000):
+    """Save the changes made to a master file.
+    
+    Changes are appended to the journal for the master so that only the
+    changes are written. When the journal has more than max_entries entries,
+    or the master was loaded from the CSV master, the changes are applied to
+    the master and the feather master is saved in place of the journal. If
+    pyarrow is not installed the CSV master is saved instead.
+    
+    Args:
+        master (list): Master record for each student as loaded.
+        master_delta (dict): Changed cells and new students.
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        master_headings (list): Column headings of the master file.
+        source (str): Identifier of the export the changes came from.
+        max_entries (int): Journal entries allowed before compacting.
+    """
+    journal_name = 'Master_{}_{}_Journal.csv'.format(file_type, course_code)
+    journal_df = get_master_journal_entries(master, master_delta,
+                                            master_headings, source)
+    compact = get_master_source(file_type, course_code) != 'feather'
+    if not compact:
+        # Append changes to the journal
+        journal_exists = os.path.isfile(journal_name)
+        journal_df.to_csv(journal_name, mode='a', header=not journal_exists,
+                          index=False)
+        print('\n{} changes have been saved to {}.'.format(
+                journal_df.shape[0], journal_name))
+        with open(journal_name) as journal:
+            num_entries = sum(1 for line in journal) - 1
+        compact = num_entries > max_entries
+    if compact:
+        # Save master with changes applied and start a new journal
+        master = apply_master_delta(master, master_delta)
+        if save_master(pd.DataFrame(data=master, columns=master_headings),
+                       file_type, course_code, master_headings):
+            if os.path.isfile(journal_name):
+                os.remove(journal_name)
+        else:
+            # Save CSV master instead
+            master_name = 'Master_{}_{}_'.format(file_type, course_code)
+            ft.save_list_csv(master, master_headings, master_name)
+
 
+def save_master_update(master, file_type, course_code, source, job=None):
+    """Save the changes made to a master loaded with load_master_update.
+    
+    Args:
+        master (dict): Master being updated (see load_master_update).
+        file_type (str): The type of master file. Options are from:
+        Completion, Results.
+        course_code (str): Course code for the master file.
+        source (str): Fingerprint of the Assessment Data File.
+        job (dict): Action being run from a job file (None if not). The
+        updated master is kept for later actions in the job.
+    """
+    if job is not None:
+        updated = apply_master_delta([list(row) for row in master['data']],
+                                     master['delta'])
+        job['data']['Master_{}_{}'.format(file_type, course_code)] = (
+                pd.DataFrame(data=updated, columns=master['headings']))
+    save_master_changes(master['data'], master['delta'], file_type,
+                        course_code, master['headings'], source)
 
-def update_comp_file():
-    """Update Master Completion File."""
+
+def save_run_log(run_log):
+    """Save a run log and display a summary of it.
+    
+    Each stage is appended as a line of JSON to Run_Log.jsonl so that the
+    runs of an action can be compared over time.
+    
+    Args:
+        run_log (dict): Run log for the action (see create_run_log).
+    """
+    if not run_log['Stages']:
+        return
+    with open('Run_Log.jsonl', 'a') as f:
+        for stage in run_log['Stages']:
+            record = {'Run': run_log['Run'], 'Action': run_log['Action'],
+                      'Course': run_log['Course']}
+            record.update(stage)
+            f.write(json.dumps(record) + '\n')
+    print('\nRun summary for {}:'.format(run_log['Action']))
+    print('{:<32}{:>10}{:>10}{:>12}{:>14}{:>10}{:>10}'.format(
+            'Stage', 'Wall (s)', 'CPU (s)', 'Peak (MB)', 'Process (MB)',
+            'Rows in', 'Rows out'))
+    for stage in run_log['Stages']:
+        values = [stage['Peak MB'], stage['Process peak MB'],
+                  stage['Rows in'], stage['Rows out']]
+        values = ['' if value is None else value for value in values]
+        print('{:<32}{:>10.2f}{:>10.2f}{:>12}{:>14}{:>10}{:>10}'.format(
+                stage['Stage'][:31], stage['Wall seconds'],
+                stage['CPU seconds'], *values))
+    print('Total: {:.2f} seconds. Saved to Run_Log.jsonl'.format(
+            sum(stage['Wall seconds'] for stage in run_log['Stages'])))
+
+
+def set_master_cell(master, master_delta, position, col, value):
+    """Record a change to a master cell.
+    
+    Args:
+        master (list): Master record for each student.
+        master_delta (dict): Changed cells and new students.
+        position (int): Position of the student in the master. Positions past
+        the end of master are new students in master_delta.
+        col (int): Position of the column.
+        value (str): New value for the cell.
+    """
+    if position >= len(master):
+        master_delta['rows'][position - len(master)][col] = value
+    else:
+        master_delta['cells'].setdefault(position, {})[col] = value
+
+
+def sort_new_students(master, new_order):
+    """Sort the students added to a master and update their positions.
+    
+    Args:
+        master (dict): Master being updated (see load_master_update).
+        new_order (dict): Sort key of each student added to the master (see
+        record_new_students).
+    """
+    rows = master['delta']['rows']
+    rows.sort(key=lambda row: new_order[row[0]])
+    for n, row in enumerate(rows):
+        master['index'][row[0]] = len(master['data']) + n
+
+
+def time_stage(run_log, stage, func, *args, **kwargs):
+    """Run a stage of an action, recording it in the run log.
+    
+    Records the wall time, CPU time and peak memory of the process for the
+    stage, along with the number of rows in the first argument and in the
+    result. If memory tracing is on for the run log (see create_run_log), the
+    peak memory allocated by the stage is also recorded. Tracing is stopped
+    when the stage ends, even if the stage fails or exits.
+    
+    Args:
+        run_log (dict): Run log for the action (None if not recording).
+        stage (str): Name of the stage.
+        func (function): Function that runs the stage.
+        *args: Arguments for func.
+        **kwargs: Keyword arguments for func.
+        
+    Returns:
+        result: The result of func.
+    """
+    if run_log is None:
+        return func(*args, **kwargs)
+    rows_in = get_row_count(args[0]) if args else None
+    # Only start tracing if not already traced (e.g. by an outer stage)
+    tracing = run_log['Trace memory'] and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        if run_log['Trace memory']:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        result = func(*args, **kwargs)
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        peak_memory = None
+        if run_log['Trace memory']:
+            peak_memory = round(max(tracemalloc.get_traced_memory()[1] -
+                                    start_memory, 0) / 1048576, 2)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    run_log['Stages'].append({
+            'Stage': stage, 'Wall seconds': round(wall, 4),
+            'CPU seconds': round(cpu, 4), 'Peak MB': peak_memory,
+            'Process peak MB': get_process_peak_memory(),
+            'Rows in': rows_in, 'Rows out': get_row_count(result)})
+    return result
+
+
+def update_batch_files(max_workers=None):
+    """Update the Master Completion and Results Files for several courses.
+    
+    Each course is updated in a separate worker process. Files shared by the
+    courses are loaded once. Each course saves its own masters and log
+    (Batch_Update_Log_<Course_Code>_<time>.txt) and a summary of each course
+    is saved once all courses have been updated.
+    
+    Args:
+        max_workers (int): Number of worker processes. Defaults to the number
+        of processors.
+    """
+    print('\nProcessing Batch Update of Master Completion and Results Files.')
+    # Confirm the required files are in place
+    required_files = ['Course Codes File', 'Assessment Data File',
+                      'Enrolment IDs File',
+                      'Master Completion File',
+                      'Master Completion Headings File',
+                      'Master Results File', 'Master Results Headings File',
+                      'Assessment Data Headings File', 'Assessment Scores',
+                      'Assessment Names File']
+    ad.confirm_files('Process Batch Update Data', required_files)
+    # Load list of allowed course codes
+    valid_codes = ft.load_headings('Course_codes', 'e')
+    course_codes = get_batch_courses(valid_codes)
+    period = get_batch_period()
+    shared = load_batch_inputs(course_codes)
+    summaries = []
+    print('\nUpdating {} courses.'.format(len(course_codes)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = []
+        for course_code in course_codes:
+            file_name = '{}_{}.csv'.format(course_code, period)
+            futures.append(executor.submit(update_course, course_code,
+                                           file_name, shared))
+        for future in concurrent.futures.as_completed(futures):
+            summary = future.result()
+            print('{}: {} ({} seconds)'.format(summary['Course'],
+                  summary['Status'], summary['Seconds']))
+            summaries.append(summary)
+    # Save summary in the order courses were selected
+    summaries.sort(key=lambda x: course_codes.index(x['Course']))
+    headings = list(summaries[0].keys()) if summaries else []
+    ft.save_data_csv([list(summary.values()) for summary in summaries],
+                     headings, 'Batch_Update_Summary_')
+
+
+def update_both_files(chunk_size=None, job=None):
+    """Update Master Completion and Master Results Files.
+    
+    The month's assessment data is loaded and prepared once and then used to
+    update both masters.
+    
+    Args:
+        chunk_size (int): If passed, the Assessment Data File is processed
+        this number of rows at a time (for very large files).
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course, file and chunk_size from the job.
+    """
+    warnings = ['\nProcessing Master Completion and Results Update Data '
+                'Warnings:\n']
+    warnings_to_process = False
+    print('\nProcessing Assessment Data.')
+    # Confirm the required files are in place
+    required_files = ['Course Codes File', 'Assessment Data File',
+                      'Enrolment IDs File',
+                      'Master Completion File',
+                      'Master Completion Headings File',
+                      'Master Results File', 'Master Results Headings File',
+                      'Assessment Data Headings File', 'Assessment Scores',
+                      'Assessment Names File']
+    if job is None:
+        ad.confirm_files('Process Master Completion and Results Update Data',
+                         required_files)
+    # Get course code to process
+    if job is None:
+        course_code = get_course_code()
+        file_name = None
+    else:
+        course_code = job['course']
+        file_name = job.get('file')
+        chunk_size = job.get('chunk_size', chunk_size)
+    run_log = create_run_log('Update Master Completion and Results')
+    run_log['Course'] = course_code
+    if chunk_size:
+        time_stage(run_log, 'Streamed update', update_masters_streamed,
+                   course_code, ['Completion', 'Results'], chunk_size,
+                   file_name, job)
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
+    # Load and prepare assessment data
+    applied = load_applied_exports(course_code)
+    assessments_df, source = time_stage(run_log, 'Load assessment data',
+                                        load_assessment_data, course_code,
+                                        file_name, job is None, applied,
+                                        ['Completion', 'Results'])
+    if assessments_df is None:
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
+    # Load assessment names file
+    print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
+    assessments = ft.load_headings('Assessment_Names_{}'.format(course_code),
+                                       'e')
+    print('Loaded {}.'.format('Assessment_Names_{}'.format(course_code)))
+    # Get transferred and passed assessments
+    transfers_df = time_stage(run_log, 'Get transfers', get_transfers,
+                              assessments_df)
+    passing_scores = load_passing_scores(course_code, assessments)
+    passing_df = time_stage(run_log, 'Get passing assessments',
+                            get_passing_assessments, assessments_df,
+                            passing_scores)
+    # Update each master with the rows not yet applied to it
+    update_comp_master(course_code, get_new_rows(transfers_df, applied,
+                                                 'Completion'),
+                       get_new_rows(passing_df, applied, 'Completion'),
+                       assessments, source, job, run_log)
+    save_applied_export(applied, course_code, 'Completion')
+    update_res_master(course_code, get_new_rows(passing_df, applied,
+                                                'Results'),
+                      assessments, source, job, run_log)
+    save_applied_export(applied, course_code, 'Results')
+    save_run_log(run_log)
+    ft.process_warning_log(warnings, warnings_to_process)
+
+
+def update_comp_file(chunk_size=None, job=None):
+    """Update Master Completion File.
+    
+    Args:
+        chunk_size (int): If passed, the Assessment Data File is processed
+        this number of rows at a time (for very large files).
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course, file and chunk_size from the job.
+    """
     warnings = ['\nProcessing Master Completion Update Data Warnings:\n']
     warnings_to_process = False
     print('\nProcessing Assessment Data.')
     # Confirm the required files are in place
     required_files = ['Course Codes File', 'Assessment Data File',
-                      'Enrolment IDs File', 'Duplicate Names File',
+                      'Enrolment IDs File',
                       'Master Completion File',
                       'Master Completion Headings File',
                       'Assessment Data Headings File', 'Assessment Scores',
                       'Assessment Names File']
-    ad.confirm_files('Process Master Completion Update Data', required_files)
+    if job is None:
+        ad.confirm_files('Process Master Completion Update Data', required_files)
     # Get course code to process
-    course_code = get_course_code()
-    # Load assessment data file
-    print('\nLoading {}...'.format('{} Assessment Data File'.format(
-            course_code)))
-    assessment_data = ft.get_csv_fname_load('{} Assessment Data File'.format(
-            course_code))
-    print('Loaded {}.'.format('{} Assessment Data File'.format(course_code)))
-    # Load Enrolment data (e_id, s_id, Name, Course) into a list of lists
-    print('\nLoading {}...'.format('Enrolment_IDs_{}.csv'.format(course_code)))
-    enrolments = ft.load_csv('Enrolment_IDs_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Enrolment_IDs_{}.csv'.format(course_code)))
-    # Load list of duplicate names
-    print('\nLoading {}...'.format('Duplicate_Names_{}'.format(course_code)))
-    duplicates = ft.load_headings('Duplicate_Names_{}'.format(course_code),
-                                  'e')
-    print('Loaded {}.'.format('Duplicate_Names_{}'.format(course_code)))
-    # Extract data for students on duplicates list and remove from assessments
-    assessment_data = remove_duplicated(assessment_data, duplicates,
-                                        course_code)
-    # Add student and enrolment IDs and Course to assessment data
-    assessment_data, unknown_names = db.add_ids(enrolments, assessment_data, 1)
-    # Process unknown names so can be added manually or fixed and repeated
-    process_unknown_names(unknown_names, course_code)
-    # Place assessment_data into a DataFrame
-    # Load Assessments headings file
-    print('\nLoading {}...'.format('Assessment_Data_Headings.txt'))
-    assessment_headings = ft.load_headings('Assessment_Data_Headings', 'e')
-    print('Loaded {}.'.format('Assessment_Data_Headings.txt'))
-    assessments_df = pd.DataFrame(data = assessment_data,
-                                  columns = assessment_headings)
+    if job is None:
+        course_code = get_course_code()
+        file_name = None
+    else:
+        course_code = job['course']
+        file_name = job.get('file')
+        chunk_size = job.get('chunk_size', chunk_size)
+    run_log = create_run_log('Update Master Completion')
+    run_log['Course'] = course_code
+    if chunk_size:
+        time_stage(run_log, 'Streamed update', update_masters_streamed,
+                   course_code, ['Completion'], chunk_size, file_name, job)
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
+    # Load and prepare assessment data
+    applied = load_applied_exports(course_code)
+    assessments_df, source = time_stage(run_log, 'Load assessment data',
+                                        load_assessment_data, course_code,
+                                        file_name, job is None, applied,
+                                        ['Completion'])
+    if assessments_df is None:
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
     # Load assessment names file
     print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
     assessments = ft.load_headings('Assessment_Names_{}'.format(course_code),
                                        'e')
     print('Loaded {}.'.format('Assessment_Names_{}'.format(course_code)))
-    # Check there are entries to process
-    check_df(assessments_df)
-    # Drop Unknown students so can be done manually
-    assessments_df['EnrolmentID'] = assessments_df['EnrolmentID'].apply(
-            ad.convert_to_nan, args=(['Unknown'],))
-    assessments_df.dropna(subset=['EnrolmentID'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
     # Process transferred students for the month first
-    transfers_df = assessments_df.copy()
-    # Drop rows where feedback column does not have 'transferred' etc
-    transfers_df['Feedback text'] = transfers_df['Feedback text'].apply(
-            find_transferred)
-    transfers_df.dropna(subset=['Feedback text'], inplace=True)
-    # Drop columns so left with EnrolmentID, Name, Course, Grade Item
-    revised_headings = ['EnrolmentID', 'StudentID','Name', 'Course',
-                        'Grade item']
-    transfers_df = transfers_df[revised_headings]
-    '''
-    transfers_df.to_csv('Transfer_df_check_{}.csv'.format(
-            ft.generate_time_string()), index=False)
-    '''
-    # Load master file for course
-    print('\nLoading {}...'.format('Master_Completion_{}.csv'.format(
-            course_code)))
-    master_data = ft.load_csv('Master_Completion_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Master_Completion_{}.csv'.format(course_code)))
-    # Load Master headings file
-    print('\nLoading {}...'.format('Master_Completion_Headings_{}'.format
-          (course_code)))
-    master_headings = ft.load_headings('Master_Completion_Headings_{}'.format
-                                       (course_code), 'e')
-    print('Loaded {}.'.format('Master_Completion_Headings_{}'.format
-          (course_code)))
+    transfers_df = time_stage(run_log, 'Get transfers', get_transfers,
+                              assessments_df)
+    # Now process assessments completed this month with the original data
+    passing_scores = load_passing_scores(course_code, assessments)
+    passing_df = time_stage(run_log, 'Get passing assessments',
+                            get_passing_assessments, assessments_df,
+                            passing_scores)
+    update_comp_master(course_code, transfers_df, passing_df, assessments,
+                       source, job, run_log)
+    save_applied_export(applied, course_code, 'Completion')
+    save_run_log(run_log)
+    ft.process_warning_log(warnings, warnings_to_process)
+
+
+def update_comp_master(course_code, transfers_df, passing_df, assessments,
+                       source, job=None, run_log=None):
+    """Update Master Completion File with the month's assessments.
+    
+    Args:
+        course_code (str): Course code to process.
+        transfers_df (dataframe): Transferred assessments.
+        passing_df (dataframe): Passed assessments.
+        assessments (list): Names of each assessment.
+        source (str): Fingerprint of the Assessment Data File.
+        job (dict): Action being run from a job file (None if not).
+        run_log (dict): Run log for the action (None if not recording).
+    """
+    master = time_stage(run_log, 'Load Master Completion', load_master_update,
+                        'Completion', course_code, job)
+    time_stage(run_log, 'Update Master Completion', update_comp_master_data,
+               master, transfers_df, passing_df, assessments)
+    # Save changes to the master
+    time_stage(run_log, 'Save Master Completion', save_master_update, master,
+               'Completion', course_code, source, job)
+
+
+def update_comp_master_data(master, transfers_df, passing_df, assessments):
+    """Apply transferred and passed assessments to a loaded Master Completion.
+    
+    Args:
+        master (dict): Master being updated (see load_master_update).
+        transfers_df (dataframe): Transferred assessments.
+        passing_df (dataframe): Passed assessments.
+        assessments (list): Names of each assessment.
+    """
     # Update Master File - add 'Transferred' in appropriate Grade Item column
-    transferred_master = update_grades_comp_trans(master_data, transfers_df,
-                                                  assessments)
+    update_grades_comp_trans(master['data'], transfers_df, assessments,
+                             master['index'], master['delta'])
     '''
-    ft.save_list_csv(transferred_master, master_headings,
+    ft.save_list_csv(apply_master_delta([list(row) for row in
+                                         master['data']], master['delta']),
+                     master['headings'],
                      'Transfer_Check_{}.csv'.format(ft.generate_time_string()))
     '''
-    # Now process assessments completed this month with the original data
-    # Drop non-assessment entries
-    assessments_df['Grade item'] = assessments_df['Grade item'].apply(
-            ad.convert_to_nan, args=(['Course total'],))
-    assessments_df.dropna(subset=['Grade item'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
-    # Load assessment scores
-    scores_name = get_score_name(course_code)
-    print('\nLoading {}...'.format(scores_name))
-    scores = ft.load_headings(scores_name, 'e')
-    print('Loaded {}.'.format(scores_name))
-    # Convert scores to ints
-    scores = convert_scores(scores)
-    # Create dictionary to hold passing scores for each assessment
-    passing_scores = get_passing_scores(scores, assessments)
-    # ad.debug_dict(passing_scores)
-    # Convert Revised grades to a float (currently string)
-    assessments_df['Revised grade'] = assessments_df['Revised grade'].apply(
-            ad.convert_to_float)
-    # Convert Revised grades to int (will round down to nearest whole number)
-    assessments_df['Revised grade'] = assessments_df['Revised grade'].apply(
-            ad.convert_to_int)
-    # Drop entries that do not pass
-    # Create a column to hold passing status of all entries
-    assessments_df['Passing'] = assessments_df.apply(lambda x: check_scores(x
-                  ['Revised grade'], x['Grade item'], passing_scores), axis=1)
-    assessments_df.dropna(subset=['Passing'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
+    if passing_df.empty:
+        return
     # Get just desired columns
     revised_headings = ['EnrolmentID', 'StudentID','Date and time', 'Name',
                         'Course', 'Grade item']
-    assessments_df = assessments_df[revised_headings]
-    # Extract Month and Year from Date and time column
-    assessments_df['Date and time'] = assessments_df['Date and time'].apply(
-            extract_month_year)
-    # Convert Month and Year to Mmm-YY
-    assessments_df['Date and time'] = assessments_df['Date and time'].apply(
-            da.convert_to_mmm_yy)
+    assessments_df = passing_df[revised_headings].copy()
+    # Month and Year as Mmm-YY
+    assessments_df['Date and time'] = passing_df['Month completed']
     # Temp save to check
+    '''
     assessments_df.to_csv('assessments_check_{}.csv'.format(
             ft.generate_time_string()), index=False)
+    '''
     # Update Master file with assessment dates
-    updated_master = update_grades_comp(transferred_master, assessments_df,
-                                   assessments)
-    master_name = 'Master_Completion_{}_'.format(course_code)
-    ft.save_list_csv(updated_master, master_headings, master_name)
-    ft.process_warning_log(warnings, warnings_to_process)
+    merge_grades_comp(master['data'], assessments_df, assessments,
+                      master['index'], master['delta'])
+
 
+def update_course(course_code, file_name, shared):
+    """Update the Master Completion and Results Files for a course.
+    
+    Worker for update_batch_files. Runs without asking the user for input.
+    Everything that would be displayed is saved to a log for the course
+    instead.
+    
+    Args:
+        course_code (str): Course code to process.
+        file_name (str): Name of the Assessment Data File for the course.
+        shared (dict): Inputs shared by all courses (see load_batch_inputs).
+        
+    Returns:
+        summary (dict): Status, time taken and row counts for the course.
+    """
+    start = time.perf_counter()
+    summary = {'Course': course_code, 'Status': '', 'Seconds': 0,
+               'Export rows': 0, 'Matched rows': 0, 'Transfers': 0,
+               'Passing rows': 0, 'Unknown names': 0,
+               'Completion changes': 0, 'Completion new students': 0,
+               'Results changes': 0, 'Results new students': 0}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            summary['Status'] = update_course_masters(course_code, file_name,
+                                                      shared, summary)
+        except Exception as e:
+            summary['Status'] = 'Error: {}'.format(e)
+            print('\n{}'.format(summary['Status']))
+    log_name = 'Batch_Update_Log_{}_{}.txt'.format(course_code,
+                                ft.generate_time_string())
+    ft.save_list_to_text(output.getvalue().splitlines(), log_name)
+    summary['Seconds'] = round(time.perf_counter() - start, 2)
+    return summary
 
-def update_grades_comp(master, assessments_df, assessment_names):
+
+def update_course_masters(course_code, file_name, shared, summary):
+    """Update the masters for a course in a batch update.
+    
+    Args:
+        course_code (str): Course code to process.
+        file_name (str): Name of the Assessment Data File for the course.
+        shared (dict): Inputs shared by all courses (see load_batch_inputs).
+        summary (dict): Updated with row counts for the course.
+        
+    Returns:
+        status (str): Result of the update.
+    """
+    if not os.path.isfile(file_name):
+        return 'No Assessment Data File ({})'.format(file_name)
+    file_types = [file_type for file_type in ['Completion', 'Results'] if
+                  get_master_source(file_type, course_code)]
+    if not file_types:
+        return 'No Master Files'
+    # Skip the export if it has already been applied
+    source = get_file_hash(file_name)
+    applied = load_applied_exports(course_code)
+    if check_applied_export(applied, source, file_types):
+        return 'Already applied'
+    # Load and prepare assessment data
+    assessments_df = pd.read_csv(file_name, dtype=str, keep_default_na=False)
+    assessments_df.columns = get_export_headings(shared['headings'])
+    summary['Export rows'] = assessments_df.shape[0]
+    assessments_df.index = get_row_hashes(assessments_df)
+    applied['export']['Rows'] = assessments_df.shape[0]
+    applied['export']['Row hashes'] = assessments_df.index
+    assessments_df = remove_applied_rows(assessments_df, applied, file_types)
+    if assessments_df.empty:
+        return 'No new rows'
+    num_rows = assessments_df.shape[0]
+    assessments_df, unknown_names = prepare_assessment_data(
+            assessments_df, load_name_index(course_code),
+            load_duplicate_names(course_code), course_code,
+            shared['headings'])
+    applied['export']['Pending'] += num_rows - assessments_df.shape[0]
+    summary['Matched rows'] = assessments_df.shape[0]
+    summary['Unknown names'] = len(unknown_names)
+    process_unknown_names(unknown_names, course_code, False)
+    # Load assessment names file
+    print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
+    assessments = ft.load_headings('Assessment_Names_{}'.format(course_code),
+                                       'e')
+    print('Loaded {}.'.format('Assessment_Names_{}'.format(course_code)))
+    passing_scores = get_passing_scores(
+            shared['scores'][get_score_name(course_code)], assessments)
+    transfers_df = get_transfers(assessments_df, shared['transfer_pattern'])
+    summary['Transfers'] = transfers_df.shape[0]
+    passing_df = get_passing_assessments(assessments_df, passing_scores,
+                                         False)
+    summary['Passing rows'] = passing_df.shape[0]
+    for file_type in file_types:
+        master = load_master_update(file_type, course_code)
+        if file_type == 'Completion':
+            update_comp_master_data(master, get_new_rows(
+                    transfers_df, applied, file_type), get_new_rows(
+                    passing_df, applied, file_type), assessments)
+        else:
+            update_res_master_data(master, get_new_rows(
+                    passing_df, applied, file_type), assessments)
+        summary['{} changes'.format(file_type)] = sum(len(cells) for cells in
+               master['delta']['cells'].values())
+        summary['{} new students'.format(file_type)] = len(
+                master['delta']['rows'])
+        save_master_changes(master['data'], master['delta'], file_type,
+                            course_code, master['headings'], source)
+        save_applied_export(applied, course_code, file_type)
+    if len(file_types) < 2:
+        return 'Updated (Master {} File only)'.format(file_types[0])
+    return 'Updated'
+
+
+def update_grades_comp(master, assessments_df, assessment_names,
+                       master_index=None, master_delta=None):
     """Updates Master Completions file with completed assessments grades.
     
     For each record in assessments, allocates to the grade item the month that
     the assessment was completed, in the row in the master file for the
-    enrolment ID.
+    enrolment ID. Changes are recorded in master_delta rather than made to
+    master.
     
     Args:
         master (list): Master record of all assessments for each student.
         assessments_df (dataframe): Current month assessments to be updated.
         assessment_names (list): List of each assessment name.
+        master_index (dict): Position of each EnrolmentID in master. Created
+        from master if not passed. Students added to the master are added to
+        the index so that it can be shared with further updates.
+        master_delta (dict): Changes to master from earlier updates. Created
+        if not passed.
     
     Returns:
-        updated_master (list): Updated with current month assessments.
+        master_delta (dict): Updated with current month assessments.
     """
-    updated_master = copy.deepcopy(master)
-    # Get a list of the EnrolmentID's in updated_master
-    students = db.get_ids(updated_master, 0)
-    # List to hold students that get added to updated_master
-    added = [] 
+    # Get the position of each EnrolmentID in master
+    if master_index is None:
+        master_index = create_master_index(master)
+    if master_delta is None:
+        master_delta = create_master_delta()
     print('\nUpdating Master File (Completions)')
-    num_assessments = assessments_df.shape[0] # For calculating % complete
-    n = 1
+    progress = create_progress(assessments_df.shape[0])
     # Process each record in assessments
     for index, row in assessments_df.iterrows():
         # Display progress
-        progress = round((n/num_assessments) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Get column to update
         # (add 4 to skip the non-assessment columns in Master dataframe)
         col_pos = assessment_names.index(row['Grade item']) + 4
-        # Check if enrolment ID present in updated_master and process
-        if row['EnrolmentID'] in students or row['EnrolmentID'] in added:
+        # Check if enrolment ID present in master and process
+        if row['EnrolmentID'] in master_index:
             # Find the student in master
-            for student in updated_master:
-                # print(student)
-                if student[0] == row['EnrolmentID']:
-                    # Check that entry is empty
-                    #print(col_pos)
-                    #print(student)
-                    if student[col_pos] in (None, ''):
-                        # Update assessment with month, year completed
-                        student[col_pos] = row['Date and time']
-                        break
+            position = master_index[row['EnrolmentID']]
+            # Check that entry is empty
+            if get_master_cell(master, master_delta, position, col_pos) in (
+                    None, ''):
+                # Update assessment with month, year completed
+                set_master_cell(master, master_delta, position, col_pos,
+                                row['Date and time'])
         # Not present - create entry
         else:
-            # Add student to added list so get updated correctly if found again
-            added.append(row['EnrolmentID'])
+            # Add student to index so get updated correctly if found again
+            master_index[row['EnrolmentID']] = len(master) + len(
+                    master_delta['rows'])
             # Create new student record
             new_student = []
             new_student.append(row['EnrolmentID'])
@@ -3144,58 +5172,63 @@ def update_grades_comp(master, assessments_df, assessment_names):
                 new_student.append('')
             # Update present assessment
             new_student[col_pos] = row['Date and time']
-            # Add to updated_master
-            updated_master.append(new_student)
-        n += 1
-    print('\rFinished processing Assessment Data\n')
-    return updated_master
+            # Add to new rows
+            master_delta['rows'].append(new_student)
+    finish_progress(progress)
+    print('Finished processing Assessment Data\n')
+    return master_delta
     
 
-def update_grades_comp_trans(master, assessments_df, assessment_names):
+def update_grades_comp_trans(master, assessments_df, assessment_names,
+                             master_index=None, master_delta=None):
     """Updates Master Completions file with transferred assessments.
     
     For each record in assessments, allocates to the grade item 'Transferred'
-    in the row in the master file for the enrolment ID.
+    in the row in the master file for the enrolment ID. Changes are recorded
+    in master_delta rather than made to master.
     
     Args:
         master (list): Master record of all assessments for each student.
         assessments_df (dataframe): Current month assessments to be transferred.
         assessment_names (list): List of each assessment name.
+        master_index (dict): Position of each EnrolmentID in master. Created
+        from master if not passed. Students added to the master are added to
+        the index so that it can be shared with further updates.
+        master_delta (dict): Changes to master from earlier updates. Created
+        if not passed.
     
     Returns:
-        updated_master (list): Updated with current month assessments.
+        master_delta (dict): Updated with current month assessments.
     """
     '''
     assessments_df.to_csv('transfer_assessments_update_master_{}.csv'.format(
             ft.generate_time_string()), index=False)
     '''
-    updated_master = copy.deepcopy(master)
-    # Get a list of the EnrolmentID's in updated_master
-    students = db.get_ids(updated_master, 0)
-    # List to hold students that get added to updated_master
-    added = [] 
+    # Get the position of each EnrolmentID in master
+    if master_index is None:
+        master_index = create_master_index(master)
+    if master_delta is None:
+        master_delta = create_master_delta()
     print('\nUpdating Master Completion File (Transfers)')
-    num_assessments = assessments_df.shape[0] # For calculating % complete
-    n = 1
+    progress = create_progress(assessments_df.shape[0])
     # Process each record in assessments
     for index, row in assessments_df.iterrows():
         # Display progress
-        progress = round((n/num_assessments) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Get column to update
         # (add 4 to skip the non-assessment columns in Master dataframe)
         col_pos = assessment_names.index(row['Grade item']) + 4
-        # Check if enrolment ID present in updated_master and process
-        if row['EnrolmentID'] in students or row['EnrolmentID'] in added:
+        # Check if enrolment ID present in master and process
+        if row['EnrolmentID'] in master_index:
             # Find the student in master
-            for student in updated_master:
-                if student[0] == row['EnrolmentID']:
-                    student[col_pos] = 'Transferred'
-                    break
+            position = master_index[row['EnrolmentID']]
+            set_master_cell(master, master_delta, position, col_pos,
+                            'Transferred')
         # Not present - create entry
         else:
-            # Add student to added list so get updated correctly if found again
-            added.append(row['EnrolmentID'])
+            # Add student to index so get updated correctly if found again
+            master_index[row['EnrolmentID']] = len(master) + len(
+                    master_delta['rows'])
             # Create new student record
             new_student = []
             new_student.append(row['EnrolmentID'])
@@ -3208,72 +5241,75 @@ def update_grades_comp_trans(master, assessments_df, assessment_names):
                 new_student.append('')
             # Update present assessment
             new_student[col_pos] = 'Transferred'
-            # Add to updated_master
-            updated_master.append(new_student)
-        n += 1
-    print('\rFinished processing Assessment Data')
+            # Add to new rows
+            master_delta['rows'].append(new_student)
+    finish_progress(progress)
+    print('Finished processing Assessment Data')
     # Make sure each student has the correct number of items
     # One per assessment + 4 identifiers
-    for item in updated_master:
-        num_items = len(assessment_names) + 4
-        if len(item) != num_items:
-            print('Warning! {} data is {} in length'.format(item[2],len(item)))
-        # print(item)
-    return updated_master
+    num_items = len(assessment_names) + 4
+    for records in (master, master_delta['rows']):
+        for item in records:
+            if len(item) != num_items:
+                print('Warning! {} data is {} in length'.format(item[2],
+                      len(item)))
+    return master_delta
 
 
-def update_grades_res(master, assessments_df, assessment_names):
+def update_grades_res(master, assessments_df, assessment_names,
+                      master_index=None, master_delta=None):
     """Updates Master Results file with completed assessments grades and dates.
     
     For each record in assessments, allocates to the grade item the month that
     the assessment was completed, in the row in the master file for the
-    enrolment ID.
+    enrolment ID. Changes are recorded in master_delta rather than made to
+    master.
     
     Args:
         master (list): Master record of all results for each student.
         assessments_df (dataframe): Current month assessments to be updated.
         assessment_names (list): List of each assessment name and date as per
         Results Master headings.
+        master_index (dict): Position of each EnrolmentID in master. Created
+        from master if not passed. Students added to the master are added to
+        the index so that it can be shared with further updates.
+        master_delta (dict): Changes to master from earlier updates. Created
+        if not passed.
     
     Returns:
-        updated_master (list): Updated with current month results.
+        master_delta (dict): Updated with current month results.
     """
-    updated_master = copy.deepcopy(master)
-    # Get a list of the EnrolmentID's in updated_master
-    students = db.get_ids(updated_master, 0)
-    # List to hold students that get added to updated_master
-    added = [] 
+    # Get the position of each EnrolmentID in master
+    if master_index is None:
+        master_index = create_master_index(master)
+    if master_delta is None:
+        master_delta = create_master_delta()
     print('\nUpdating Master File (Results)')
-    num_assessments = assessments_df.shape[0] # For calculating % complete
-    n = 1
+    progress = create_progress(assessments_df.shape[0])
     # Process each record in assessments
     for index, row in assessments_df.iterrows():
         # Display progress
-        progress = round((n/num_assessments) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
+        update_progress(progress)
         # Get column to update
         col_pos = assessment_names.index(row['Grade item'])
-        # Check if enrolment ID present in updated_master and process
-        if row['EnrolmentID'] in students or row['EnrolmentID'] in added:
+        # Check if enrolment ID present in master and process
+        if row['EnrolmentID'] in master_index:
             # Find the student in master
-            for student in updated_master:
-                # print(student)
-                if student[0] == row['EnrolmentID']:
-                    # Check that entry is empty
-                    #print(col_pos)
-                    #print(student)
-                    if student[col_pos] in (None, ''):
-                        # Update Grade with 'Competent'
-                        student[col_pos] = row['Revised grade']
-                        # Update Date with completion date
-                        student[col_pos+1] = row['Date and time']
-                        # Remove timestamp info
-                        # student[col_pos+1] = student[col_pos+1].dt.date
-                        break
+            position = master_index[row['EnrolmentID']]
+            # Check that entry is empty
+            if get_master_cell(master, master_delta, position, col_pos) in (
+                    None, ''):
+                # Update Grade with 'Competent'
+                set_master_cell(master, master_delta, position, col_pos,
+                                row['Revised grade'])
+                # Update Date with completion date
+                set_master_cell(master, master_delta, position, col_pos+1,
+                                row['Date and time'])
         # Not present - create entry
         else:
-            # Add student to added list so get updated correctly if found again
-            added.append(row['EnrolmentID'])
+            # Add student to index so get updated correctly if found again
+            master_index[row['EnrolmentID']] = len(master) + len(
+                    master_delta['rows'])
             # Create new student record
             new_student = []
             new_student.append(row['EnrolmentID'])
@@ -3288,215 +5324,221 @@ def update_grades_res(master, assessments_df, assessment_names):
             new_student[col_pos] = row['Revised grade']
             # Update Date with completion date
             new_student[col_pos+1] = row['Date and time']
-            # Remove timestamp info
-            # new_student[col_pos+1]
-            # Add to updated_master
-            updated_master.append(new_student)
-        n += 1
-    print('\rFinished processing Assessment Data\n')
-    return updated_master
+            # Add to new rows
+            master_delta['rows'].append(new_student)
+    finish_progress(progress)
+    print('Finished processing Assessment Data\n')
+    return master_delta
 
 
-def update_module_completion(student, module, modules_dict, month_order,
-                             transfers=True):
-    """Return completion status for a module.
+def update_masters_streamed(course_code, file_types, chunk_size,
+                            file_name=None, job=None):
+    """Update masters from an Assessment Data File processed in chunks.
     
-    For the provided module, determines if the student has completed all of the
-    required assesments. If they have, the date the final assessment was
-    completed is returned. If they have not, the empty string is returned.
+    Each chunk of the Assessment Data File is cleaned, checked for passing
+    scores and applied to the loaded masters before the next chunk is read,
+    so memory use stays flat for very large files (e.g. full history
+    backfills). Changes are saved once all chunks have been processed.
     
     Args:
-        student (DataFrame): Row of assessment data for student.
-        module (str): Module being checked
-        moddules_dict (dict): Modules and required assessments.
-        month_order (list): List containing each month in order.
-        transfers (bool): Whether to keep transferred assessments in analysis
-             - True: students with transferred assessments still have them
-             counted towards module completion date. 
-             - False: students with at least one transferred assessment
-             are listed as 'Transferred' in month column.
-    
-    Returns:
-        status (str): Completion status for the module.    
-    """
-    status = ''
-    months = set() # Hold completion month for each assessment
-    for assessment in modules_dict[module]:
-        if not student[assessment]:
-            # Assessment is False - has not been completed
-            return status
-        else:
-            # Add month completed
-            months.add(student[assessment])
-    # All completed
-    months = list(months)
-    if not transfers:
-        # Retrun 'Transferred' if any assessments transferred
-        if 'Transferred' in months:
-            return 'Transferred'
-    # Drop Transferred assessments
-    if 'Transferred' in months:
-        months.remove('Transferred')
-    # If no assessments left, return 'Transferred'
-    if not months:
-        return 'Transferred'
-    # If only one month, return that month
-    elif len(months) == 1:
-        return months[0]
-    # - TO DO: Calculate last month and return
-    else:
-        status = get_completion_month(months, month_order)
-    return status
+        course_code (str): Course code to process.
+        file_types (list): Masters to update, from: Completion, Results.
+        chunk_size (int): Number of rows to read at a time.
+        file_name (str): Name of the Assessment Data File. Asked for if not
+        passed.
+        job (dict): Action being run from a job file (None if not).
+    """
+    if not file_name:
+        file_name = get_export_file_name(course_code)
+    # Fingerprint of the export for recording changes against
+    source = get_file_hash(file_name)
+    applied = load_applied_exports(course_code)
+    if check_applied_export(applied, source, file_types):
+        print('\n{} has already been applied to the Master {} File.'.format(
+                file_name, ' and '.join(file_types)))
+        return
+    # Load assessment names file
+    print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
+    assessments = ft.load_headings('Assessment_Names_{}'.format(course_code),
+                                       'e')
+    print('Loaded {}.'.format('Assessment_Names_{}'.format(course_code)))
+    passing_scores = load_passing_scores(course_code, assessments)
+    transfer_pattern = get_transfer_pattern()
+    masters = {}
+    for file_type in file_types:
+        masters[file_type] = load_master_update(file_type, course_code, job)
+    unknown_names = set()
+    unknown_items = set()
+    unparsed_dates = set()
+    # When students not in Master Completion are first seen, in transfers
+    # and then in passed assessments (the order they are processed in one go)
+    new_order = {}
+    num_chunks = 0
+    for assessments_df in load_assessment_data_chunks(file_name, course_code,
+                                                      chunk_size,
+                                                      unknown_names, applied,
+                                                      file_types):
+        num_chunks += 1
+        if assessments_df.empty:
+            continue
+        passing_df = get_passing_assessments(assessments_df, passing_scores,
+                                             False, unknown_items,
+                                             unparsed_dates)
+        if 'Completion' in masters:
+            transfers_df = get_new_rows(get_transfers(
+                    assessments_df, transfer_pattern), applied, 'Completion')
+            comp_passing_df = get_new_rows(passing_df, applied, 'Completion')
+            record_new_students(new_order, masters['Completion'],
+                                transfers_df['EnrolmentID'], (0, num_chunks))
+            record_new_students(new_order, masters['Completion'],
+                                comp_passing_df['EnrolmentID'],
+                                (1, num_chunks))
+            update_comp_master_data(masters['Completion'], transfers_df,
+                                    comp_passing_df, assessments)
+        if 'Results' in masters:
+            update_res_master_data(masters['Results'], get_new_rows(
+                    passing_df, applied, 'Results'), assessments)
+    print('\nProcessed {} chunks.'.format(num_chunks))
+    if 'Completion' in masters:
+        sort_new_students(masters['Completion'], new_order)
+    process_unknown_grade_items(unknown_items)
+    process_unparsed_dates(unparsed_dates)
+    # Process unknown names so can be added manually or fixed and repeated
+    process_unknown_names(unknown_names, course_code, job is None)
+    for file_type, master in masters.items():
+        save_master_update(master, file_type, course_code, source, job)
+        save_applied_export(applied, course_code, file_type)
 
 
-def update_num_ass_col(student, assessments):
-    """Return number of assessments completed by a student.
+def update_progress(progress):
+    """Record an item of a loop as done and display progress if due.
     
-    Counts each assessment the student has completed (non-blank) and then
-    returns this count. Can also be used for counting completed modules etc.
+    Displays the % done, items per second and the estimated time remaining.
     
     Args:
-        student (DataFrame): Row of assessment data for student.
-        assessments (list): Assessment columns.
-        
-    Returns:
-        assess_count (int): Number of completed assessments.
+        progress (dict): Progress for the loop (see create_progress).
     """
-    num_assess = 0
-    for assessment in assessments:
-        if student[assessment]:
-            num_assess += 1
-    return num_assess
+    if not progress['display']:
+        return
+    progress['done'] += 1
+    now = time.perf_counter()
+    if (now - progress['last'] < progress['interval'] and
+            progress['done'] < progress['total']):
+        return
+    progress['last'] = now
+    elapsed = max(now - progress['start'], 1e-6)
+    rate = progress['done'] / elapsed
+    remaining = int((progress['total'] - progress['done']) / rate)
+    text = 'Progress: {}% ({:,.0f}/s, {}:{:02d} remaining)'.format(
+            round(progress['done'] / max(progress['total'], 1) * 100), rate,
+            remaining // 60, remaining % 60)
+    progress['width'] = max(progress['width'], len(text))
+    print('\r{}'.format(text.ljust(progress['width'])), end='', flush=True)
 
 
-def update_perc_comp_col(completed, total):
-    """Return percentage of assessments completed by a student.
-    
-    Divides the number of assessments completed by the total number of
-    assessments. Rounds the number to two decimal places.
+def update_res_file(chunk_size=None, job=None):
+    """Update Master Results File.
     
     Args:
-        completed (int): Number of assessments completed.
-        total (int): Number of assessments in course.
-        
-    Returns:
-        assess_perc (float): Percentage of completed assessments.
+        chunk_size (int): If passed, the Assessment Data File is processed
+        this number of rows at a time (for very large files).
+        job (dict): Action being run from a job file (None if asking for
+        input). Uses course, file and chunk_size from the job.
     """
-    return round((completed / total), 2)
-
-
-def update_res_file():
-    """Update Master Results File."""
     warnings = ['\nProcessing Master Results Update Data Warnings:\n']
     warnings_to_process = False
     print('\nProcessing Assessment Data.')
     # Confirm the required files are in place
     required_files = ['Course Codes File', 'Assessment Data File',
-                      'Enrolment IDs File', 'Duplicate Names File',
+                      'Enrolment IDs File',
                       'Master Results File',
                       'Master Results Headings File',
                       'Assessment Data Headings File', 'Assessment Scores',
                       'Assessment Names File']
-    ad.confirm_files('Process Master Results Update Data', required_files)
+    if job is None:
+        ad.confirm_files('Process Master Results Update Data', required_files)
     # Get course code to process
-    course_code = get_course_code()
-    # (C) means can copy and modify from update_comp_file()
-    # (N) means a new function will need to be written for this
-    # Load assessment data file
-    print('\nLoading {}...'.format('{} Assessment Data File'.format(
-            course_code)))
-    assessment_data = ft.get_csv_fname_load('{} Assessment Data File'.format(
-            course_code))
-    print('Loaded {}.'.format('{} Assessment Data File'.format(course_code)))
-    # Load Enrolment data (e_id, s_id, Name, Course) into a list of lists
-    print('\nLoading {}...'.format('Enrolment_IDs_{}.csv'.format(course_code)))
-    enrolments = ft.load_csv('Enrolment_IDs_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Enrolment_IDs_{}.csv'.format(course_code)))
-    # Load list of duplicate names
-    print('\nLoading {}...'.format('Duplicate_Names_{}'.format(course_code)))
-    duplicates = ft.load_headings('Duplicate_Names_{}'.format(course_code),
-                                  'e')
-    print('Loaded {}.'.format('Duplicate_Names_{}'.format(course_code)))
-    # Load master file for course
-    print('\nLoading {}...'.format('Master_Results_{}.csv'.format(
-            course_code)))
-    master_data = ft.load_csv('Master_Results_{}.csv'.format(course_code))
-    print('Loaded {}.'.format('Master_Results_{}.csv'.format(course_code)))
-    # Load Master headings file
-    print('\nLoading {}...'.format('Master_Results_Headings_{}'.format
-          (course_code)))
-    master_headings = ft.load_headings('Master_Results_Headings_{}'.format
-                                       (course_code), 'e')
-    print('Loaded {}.'.format('Master_Results_Headings_{}'.format
-          (course_code)))
-    # Load Assessments headings file
-    print('\nLoading {}...'.format('Assessment_Data_Headings.txt'))
-    assessment_headings = ft.load_headings('Assessment_Data_Headings', 'e')
-    print('Loaded {}.'.format('Assessment_Data_Headings.txt'))
-     # Load assessment names file
+    if job is None:
+        course_code = get_course_code()
+        file_name = None
+    else:
+        course_code = job['course']
+        file_name = job.get('file')
+        chunk_size = job.get('chunk_size', chunk_size)
+    run_log = create_run_log('Update Master Results')
+    run_log['Course'] = course_code
+    if chunk_size:
+        time_stage(run_log, 'Streamed update', update_masters_streamed,
+                   course_code, ['Results'], chunk_size, file_name, job)
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
+    # Load and prepare assessment data
+    applied = load_applied_exports(course_code)
+    assessments_df, source = time_stage(run_log, 'Load assessment data',
+                                        load_assessment_data, course_code,
+                                        file_name, job is None, applied,
+                                        ['Results'])
+    if assessments_df is None:
+        save_run_log(run_log)
+        ft.process_warning_log(warnings, warnings_to_process)
+        return
+    # Load assessment names file
     print('\nLoading {}...'.format('Assessment_Names_{}'.format(course_code)))
     assessments = ft.load_headings('Assessment_Names_{}'.format(course_code),
                                        'e')
     print('Loaded {}.'.format('Assessment_Names_{}'.format(course_code)))
-    # Extract data for students on duplicates list and remove from assessments
-    assessment_data = remove_duplicated(assessment_data, duplicates,
-                                        course_code)
-    # Add student and enrolment IDs and Course to assessment data
-    assessment_data, unknown_names = db.add_ids(enrolments, assessment_data, 1)
-    # Process unknown names so can be added manually or fixed and repeated
-    process_unknown_names(unknown_names, course_code)
-    # Place assessment_data into a DataFrame
-    assessments_df = pd.DataFrame(data = assessment_data,
-                                  columns = assessment_headings)
-    # Check there are entries to process
-    check_df(assessments_df)
-    # Drop Unknown students so can be done manually
-    assessments_df['EnrolmentID'] = assessments_df['EnrolmentID'].apply(
-            ad.convert_to_nan, args=(['Unknown'],))
-    assessments_df.dropna(subset=['EnrolmentID'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
-    # Drop non-assessment entries
-    assessments_df['Grade item'] = assessments_df['Grade item'].apply(
-            ad.convert_to_nan, args=(['Course total'],))
-    assessments_df.dropna(subset=['Grade item'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
-    # Load assessment scores
-    scores_name = get_score_name(course_code)
-    print('\nLoading {}...'.format(scores_name))
-    scores = ft.load_headings(scores_name, 'e')
-    print('Loaded {}.'.format(scores_name))
-    # Convert scores to ints
-    scores = convert_scores(scores)
-    # Create dictionary to hold passing scores for each assessment
-    passing_scores = get_passing_scores(scores, assessments)
-    # ad.debug_dict(passing_scores)
-    # Convert Revised grades to a float (currently string)
-    assessments_df['Revised grade'] = assessments_df['Revised grade'].apply(
-            ad.convert_to_float)
-    # Convert Revised grades to int (will round down to nearest whole number)
-    assessments_df['Revised grade'] = assessments_df['Revised grade'].apply(
-            ad.convert_to_int)
-    # Drop entries that do not pass
-    # Create a column to hold passing status of all entries
-    assessments_df['Passing'] = assessments_df.apply(lambda x: check_scores(x
-                  ['Revised grade'], x['Grade item'], passing_scores), axis=1)
-    assessments_df.dropna(subset=['Passing'], inplace=True)
-    # Check there are entries to process
-    check_df(assessments_df)
+    # Get passed assessments
+    passing_scores = load_passing_scores(course_code, assessments)
+    passing_df = time_stage(run_log, 'Get passing assessments',
+                            get_passing_assessments, assessments_df,
+                            passing_scores)
+    update_res_master(course_code, passing_df, assessments, source, job,
+                      run_log)
+    save_applied_export(applied, course_code, 'Results')
+    save_run_log(run_log)
+    ft.process_warning_log(warnings, warnings_to_process)
+
+
+def update_res_master(course_code, passing_df, assessments, source,
+                      job=None, run_log=None):
+    """Update Master Results File with the month's assessments.
+    
+    Args:
+        course_code (str): Course code to process.
+        passing_df (dataframe): Passed assessments.
+        assessments (list): Names of each assessment.
+        source (str): Fingerprint of the Assessment Data File.
+        job (dict): Action being run from a job file (None if not).
+        run_log (dict): Run log for the action (None if not recording).
+    """
+    master = time_stage(run_log, 'Load Master Results', load_master_update,
+                        'Results', course_code, job)
+    time_stage(run_log, 'Update Master Results', update_res_master_data,
+               master, passing_df, assessments)
+    # Save changes to the Master Results
+    time_stage(run_log, 'Save Master Results', save_master_update, master,
+               'Results', course_code, source, job)
+
+
+def update_res_master_data(master, passing_df, assessments):
+    """Apply passed assessments to a loaded Master Results.
+    
+    Args:
+        master (dict): Master being updated (see load_master_update).
+        passing_df (dataframe): Passed assessments.
+        assessments (list): Names of each assessment.
+    """
+    if passing_df.empty:
+        return
     # Get just desired columns
     revised_headings = ['EnrolmentID', 'StudentID','Date and time', 'Name',
                         'Course', 'Grade item', 'Revised grade']
-    assessments_df = assessments_df[revised_headings]
-    # Date as Day Month Year from Date and Time
-    assessments_df['Date and time'] = assessments_df['Date and time'].apply(
-            extract_day_month_year)
+    assessments_df = passing_df[revised_headings].copy()
     # Date as DD/MM/YYYY
-    assessments_df['Date and time'] = assessments_df['Date and time'].apply(
-            lambda x: pd.to_datetime(x).strftime('%d/%m/%Y'))
+    assessments_df['Date and time'] = passing_df['Date completed']
     # Dictionary storing assessment and Master Results headings for converting
-    grades_dict = create_grades_dict(assessments, master_headings)
+    grades_dict = create_grades_dict(assessments, master['headings'])
     # Convert Grade item to heading used in Master Results file
     assessments_df['Grade item'] = assessments_df['Grade item'].apply(
             convert_grade_item, args=(grades_dict,))
@@ -3508,13 +5550,13 @@ def update_res_file():
             ft.generate_time_string()), index=False)
     '''
     # Update Master Results File with Grade and Date
-    updated_master = update_grades_res(master_data, assessments_df,
-                                   master_headings)
-    master_name = 'Master_Results_{}_'.format(course_code)
-    # Save updated Master Results
-    ft.save_list_csv(updated_master, master_headings, master_name)
-    ft.process_warning_log(warnings, warnings_to_process)
+    merge_grades_res(master['data'], assessments_df, master['headings'],
+                     master['index'], master['delta'])
     
     
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    if len(sys.argv) > 1:
+        # Run job file without asking for input
+        run_job_file(sys.argv[1])
+    else:
+        main() 
\ No newline at end of file
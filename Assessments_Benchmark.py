@@ -0,0 +1,685 @@
+# Assessment Analyser Benchmarks
+# Created by Jeff Mitchell
+# Generates synthetic course data and times the Assessment Analyser functions
+# that do the most work, at increasing numbers of students
+
+
+import Assessments_Analyser as aa
+import contextlib
+import csv
+import custtools.filetools as ft
+import datetime
+import io
+import json
+import numpy as np
+import os
+import pandas as pd
+import sys
+import time
+
+
+# Number of students for each benchmark size
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Larger sizes are skipped for a benchmark expected to take longer than this
+MAX_SECONDS = 300
+# Benchmarks this much slower than the baseline are reported as regressions
+REGRESSION_RATIO = 1.25
+# Each benchmark is timed this many times and the fastest time is kept
+REPEATS = 5
+# Fewer repeats are used once a benchmark has run for this long in total
+REPEAT_SECONDS = 10
+BASELINE_FILE = 'Benchmark_Baseline.json'
+EXPORT_HEADINGS = ['Date and time', 'Name', 'Grade item', 'Original grade',
+                   'Revised grade', 'Grader', 'Source', 'Overridden', 'Locked',
+                   'Excluded from calculations', 'Feedback text']
+GIVEN_NAMES = ['Aroha', 'Ben', 'Chloe', 'Daniel', 'Ella', 'Finn', 'Grace',
+               'Hemi', 'Isla', 'Jack', 'Kiri', 'Liam', 'Mia', 'Noah', 'Olivia',
+               'Priya', 'Quinn', 'Rangi', 'Sophie', 'Tama', 'Uma', 'Vincent',
+               'Wiremu', 'Xavier', 'Yasmin', 'Zoe']
+SURNAMES = ['Anderson', 'Brown', 'Chen', 'Davies', 'Edwards', 'Fifita',
+            'Green', 'Harris', 'Iosefa', 'Jones', 'King', 'Lee', 'Martin',
+            'Ngata', 'OBrien', 'Patel', 'Robinson', 'Smith', 'Taylor',
+            'Tuilagi', 'Walker', 'Wilson', 'Wright', 'Young']
+ETHNICITIES = ['NZ European', 'Maori', 'Samoan', 'Tongan', 'Chinese',
+               'Indian', 'Other European', 'Fijian']
+STATUSES = ['Active', 'Active', 'Active', 'Suspended', 'Expired', 'Graduated',
+            'Withdrawn', 'Cancelled']
+STUDY_TYPES = ['FT', 'ON', 'PT', 'CPD']
+
+
+def compare_baseline(results, baseline):
+    """Display each benchmark against the baseline.
+    
+    Args:
+        results (dict): Seconds for each benchmark and size.
+        baseline (dict): Baseline seconds for each benchmark and size.
+    
+    Returns:
+        regressions (list): Benchmarks slower than the baseline by more than
+        REGRESSION_RATIO.
+    """
+    regressions = []
+    print('\n{:<40}{:>10}{:>12}{:>12}{:>8}'.format('Benchmark', 'Students',
+          'Baseline', 'Current', 'Ratio'))
+    for name, sizes in results.items():
+        for size, seconds in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if seconds is None or base is None:
+                ratio = ''
+            else:
+                ratio = '{:.2f}'.format(seconds / max(base, 1e-6))
+                if seconds / max(base, 1e-6) > REGRESSION_RATIO:
+                    regressions.append('{} at {} students'.format(name, size))
+            # Sizes not timed for the baseline are not available
+            if size in baseline.get(name, {}):
+                base = format_seconds(base)
+            else:
+                base = 'n/a'
+            print('{:<40}{:>10}{:>12}{:>12}{:>8}'.format(name[:39], size,
+                  base, format_seconds(seconds), ratio))
+    return regressions
+
+
+def create_course(num_students, num_assessments=24, per_module=4,
+                  course_code='ADV', seed=1):
+    """Create synthetic data for a course.
+    
+    Students work through the assessments in order, completing a few each
+    month from when they enrol. A few assessments are transferred, and
+    students have a mix of statuses, study types and ethnicities.
+    
+    Args:
+        num_students (int): Number of students (enrolments) in the course.
+        num_assessments (int): Number of assessments in the course.
+        per_module (int): Number of assessments in each module.
+        course_code (str): Base course code.
+        seed (int): Seed for the random data, so each run uses the same data.
+    
+    Returns:
+        course (dict): Synthetic data for the course. Lists of lists are the
+        same as loaded from the course files (see save_course).
+    """
+    rng = np.random.default_rng(seed)
+    months = create_months()
+    assessments = ['{} Assessment {:02d}'.format(course_code, i + 1)
+                   for i in range(num_assessments)]
+    modules = []
+    for start in range(0, num_assessments, per_module):
+        modules.append(['Module {}'.format(start // per_module + 1)] +
+                       assessments[start:start + per_module])
+    res_headings = ['EnrolmentID', 'StudentID', 'Name', 'Course']
+    for assessment in assessments:
+        res_headings += [assessment, '{} Date'.format(assessment)]
+    course = {'code': course_code, 'months': months,
+              'assessments': assessments, 'modules': modules,
+              'comp_headings': ['EnrolmentID', 'StudentID', 'Name',
+                                'Course'] + assessments,
+              'res_headings': res_headings, 'enrolment_ids': [],
+              'master_comp': [], 'master_res': [], 'enrolment_data': [],
+              'student_data': [], 'graduation_dates': [],
+              'expiry_dates': [], 'assessment_downloads': [], 'analysis': [],
+              'scores': [rng.choice([50, 60, 70, 80]) for _ in assessments]}
+    today = datetime.date.today()
+    for i in range(num_students):
+        enrolment_id = str(100000 + i)
+        student_id = str(500000 + i)
+        given = GIVEN_NAMES[rng.integers(len(GIVEN_NAMES))]
+        surname = SURNAMES[rng.integers(len(SURNAMES))]
+        name = '{} {}'.format(given, surname)
+        course_pk = '{}-{}-{:03d}'.format(course_code, STUDY_TYPES[
+                rng.integers(len(STUDY_TYPES))], rng.integers(1, 20))
+        status = STATUSES[rng.integers(len(STATUSES))]
+        start_month = int(rng.integers(0, len(months) - 12))
+        start = datetime.date(2018 + start_month // 12, start_month % 12 + 1,
+                              int(rng.integers(1, 29)))
+        expiry = start + datetime.timedelta(days=730)
+        completed = int(rng.integers(0, num_assessments + 1))
+        comp_row = [enrolment_id, student_id, name, course_pk]
+        res_row = [enrolment_id, student_id, name, course_pk]
+        for pos in range(num_assessments):
+            month = min(start_month + pos // 3, len(months) - 1)
+            if pos >= completed:
+                comp_row.append('')
+                res_row += ['', '']
+            elif rng.random() < 0.02:
+                comp_row.append('Transferred')
+                res_row += ['', '']
+            else:
+                comp_row.append(months[month])
+                res_row += ['Competent', '{:02d}/{:02d}/20{}'.format(
+                        int(rng.integers(1, 29)), month % 12 + 1,
+                        months[month][-2:])]
+        course['enrolment_ids'].append([enrolment_id, student_id, course_pk,
+                                        name])
+        course['master_comp'].append(comp_row)
+        course['master_res'].append(res_row)
+        course['enrolment_data'].append([enrolment_id, str(rng.integers(1,
+                                         40)), start.strftime('%d/%m/%Y'),
+                                         expiry.strftime('%d/%m/%Y'), status])
+        birth = datetime.date(int(rng.integers(1950, 2002)),
+                              int(rng.integers(1, 13)),
+                              int(rng.integers(1, 29)))
+        course['student_data'].append([student_id, rng.choice(['Female', 'Male']),
+                                       birth.strftime('%d/%m/%Y'),
+                                       ETHNICITIES[rng.integers(
+                                               len(ETHNICITIES))],
+                                       rng.choice(['Employed', 'Student',
+                                                   'Unemployed'])])
+        if status == 'Graduated':
+            course['graduation_dates'].append([enrolment_id, (
+                    start + datetime.timedelta(days=int(rng.integers(
+                            180, 700)))).strftime('%d/%m/%Y')])
+        if status == 'Expired':
+            expired = today - datetime.timedelta(days=int(rng.integers(1,
+                                                 400)))
+            course['expiry_dates'].append([enrolment_id,
+                                           expired.strftime('%d/%m/%Y')])
+        processed = '' if rng.random() < 0.7 else 'Yes'
+        course['assessment_downloads'].append([enrolment_id, student_id,
+              given, surname, course_pk, processed, ''])
+        percent = completed / num_assessments
+        # Analysis file holds the details and the % completed last
+        course['analysis'].append(comp_row + [status, str(completed),
+                                  '{:.4f}'.format(percent)])
+    return course
+
+
+def create_export(course, num_rows, month='Jun-23', seed=2):
+    """Create a synthetic Assessment Data File (LMS export) for a month.
+    
+    Each row is the next assessment for a random student in the course. Some
+    rows fail, some are transfers and some are course totals.
+    
+    Args:
+        course (dict): Synthetic course data (see create_course).
+        num_rows (int): Number of rows in the export.
+        month (str): Month of the export in the format Mmm-YY.
+        seed (int): Seed for the random data.
+    
+    Returns:
+        export (list): Rows of the export, with EXPORT_HEADINGS columns.
+    """
+    rng = np.random.default_rng(seed)
+    first = datetime.datetime.strptime(month, '%b-%y').date()
+    export = []
+    num_students = len(course['enrolment_ids'])
+    for _ in range(num_rows):
+        student = course['master_comp'][rng.integers(num_students)]
+        blanks = [pos for pos, value in enumerate(student[4:]) if not value]
+        if not blanks or rng.random() < 0.03:
+            grade_item = 'Course total'
+        else:
+            grade_item = course['assessments'][blanks[0]]
+        date = first + datetime.timedelta(days=int(rng.integers(0, 28)))
+        date_time = '{}, {} {}, {}:{:02d} {}'.format(
+                date.strftime('%A'), date.day, date.strftime('%B %Y'),
+                rng.integers(1, 13), rng.integers(0, 60),
+                rng.choice(['AM', 'PM']))
+        grade = rng.choice(['100.00', '85.00', '70.00', '40.00', '-'])
+        feedback = ''
+        if rng.random() < 0.02:
+            feedback = rng.choice(['Cross credit approved',
+                                   'Transferred from previous enrolment'])
+        export.append([date_time, student[2], grade_item, '', grade,
+                       'Tutor {}'.format(rng.integers(1, 40)), 'Assignment',
+                       'N', 'N', 'N', feedback])
+    return export
+
+
+def create_master_update(course, file_type):
+    """Return a master and the month's assessments for updating it.
+    
+    The assessments are a synthetic export (see create_export) of one row for
+    every two students, with the IDs added and the transferred and passed
+    assessments found as done by the update functions.
+    
+    Args:
+        course (dict): Synthetic course data (see create_course).
+        file_type (str): Master being updated. Options are from: Completion,
+        Results.
+    
+    Returns:
+        master (dict): Master being updated (see aa.load_master_update).
+        transfers_df (dataframe): Transferred assessments.
+        passing_df (dataframe): Passed assessments.
+    """
+    if file_type == 'Completion':
+        headings = course['comp_headings']
+        data = [list(row) for row in course['master_comp']]
+    else:
+        headings = course['res_headings']
+        data = [list(row) for row in course['master_res']]
+    master = {'headings': headings, 'data': data,
+              'index': aa.create_master_index(data),
+              'delta': aa.create_master_delta()}
+    assessments_df = pd.DataFrame(data=create_export(
+            course, len(course['enrolment_ids']) // 2),
+                                  columns=EXPORT_HEADINGS)
+    ids = {row[3]: row[:3] for row in course['enrolment_ids']}
+    assessments_df[['EnrolmentID', 'StudentID', 'Course']] = [
+            ids[name] for name in assessments_df['Name']]
+    passing_scores = aa.get_passing_scores(course['scores'],
+                                           course['assessments'])
+    # Progress output is not part of the benchmark display
+    with contextlib.redirect_stdout(io.StringIO()):
+        transfers_df = aa.get_transfers(assessments_df,
+                                        aa.get_transfer_pattern(
+                                                ['transfer', 'cross credit']))
+        passing_df = aa.get_passing_assessments(assessments_df,
+                                                passing_scores, False)
+    return master, transfers_df, passing_df
+
+
+def create_months(first_year=2018, last_year=2023):
+    """Return each month from the first to the last year as Mmm-YY.
+    
+    Args:
+        first_year (int): First year.
+        last_year (int): Last year.
+    
+    Returns:
+        months (list): Each month in order.
+    """
+    months = []
+    for year in range(first_year, last_year + 1):
+        for month in range(1, 13):
+            months.append(datetime.date(year, month, 1).strftime('%b-%y'))
+    return months
+
+
+def create_update_data(course, num_rows, file_type, seed=3):
+    """Return passed assessments for updating a master.
+    
+    Args:
+        course (dict): Synthetic course data (see create_course).
+        num_rows (int): Number of passed assessments.
+        file_type (str): Master being updated. Options are from: Completion,
+        Results.
+        seed (int): Seed for the random data.
+    
+    Returns:
+        assessments_df (dataframe): Passed assessments in the form used by
+        update_grades_comp or update_grades_res. One in ten are for students
+        not in the master.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    num_students = len(course['enrolment_ids'])
+    for n in range(num_rows):
+        pos = int(rng.integers(num_students))
+        enrolment_id, student_id, course_pk, name = course['enrolment_ids'][
+                pos]
+        if n % 10 == 0:
+            enrolment_id = str(900000 + n)
+        assessment = course['assessments'][rng.integers(
+                len(course['assessments']))]
+        if file_type == 'Completion':
+            rows.append([enrolment_id, student_id, 'Jun-23', name, course_pk,
+                         assessment])
+        else:
+            rows.append([enrolment_id, student_id, '{:02d}/06/2023'.format(
+                    rng.integers(1, 29)), name, course_pk, assessment,
+                         'Competent'])
+    headings = ['EnrolmentID', 'StudentID', 'Date and time', 'Name', 'Course',
+                'Grade item']
+    if file_type == 'Results':
+        headings.append('Revised grade')
+    return pd.DataFrame(data=rows, columns=headings)
+
+
+def format_seconds(seconds):
+    """Return seconds for display.
+    
+    Args:
+        seconds (float): Seconds (None if not timed).
+    
+    Returns:
+        seconds (str): Seconds to 3 decimal places, or 'Skipped'.
+    """
+    if seconds is None:
+        return 'Skipped'
+    return '{:.3f}'.format(seconds)
+
+
+def get_analysis_df(course):
+    """Return the Master Completion with the details added by analysis.
+    
+    Args:
+        course (dict): Synthetic course data (see create_course).
+    
+    Returns:
+        comp_data_df (dataframe): Master Completion with enrolment, student
+        and graduation details, Pacific, Age and EnrolLength.
+    """
+    comp_data_df = pd.DataFrame(data=course['master_comp'],
+                                columns=course['comp_headings'])
+    enrol_data_df = pd.DataFrame(data=course['enrolment_data'], columns=[
+            'EnrolmentID', 'TutorFK', 'StartDate', 'ExpiryDate', 'Status'])
+    student_data_df = pd.DataFrame(data=course['student_data'], columns=[
+            'StudentID', 'Gender', 'DateOfBirth', 'Ethnicity', 'Employment'])
+    grad_data_df = pd.DataFrame(data=course['graduation_dates'], columns=[
+            'EnrolmentID', 'GraduationDate'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        enrolment_dim = aa.create_enrolment_dimension(
+                (comp_data_df,), enrol_data_df, student_data_df, grad_data_df,
+                ['Samoan', 'Tongan', 'Fijian'])
+        return aa.add_enrolment_details(comp_data_df, enrolment_dim)
+
+
+def get_benchmarks():
+    """Return each benchmark.
+    
+    Each benchmark has a setup function, run once per size outside of the
+    timing, and a function that is timed. The timed function is passed the
+    result of the setup function.
+    
+    Returns:
+        benchmarks (list): Name, setup function and timed function for each
+        benchmark.
+    """
+    def comp_update(course):
+        return (course['master_comp'], create_update_data(
+                course, len(course['master_comp']) // 2, 'Completion'),
+                course['assessments'])
+
+    def res_update(course):
+        return (course['master_res'], create_update_data(
+                course, len(course['master_res']) // 2, 'Results'),
+                course['res_headings'])
+
+    def comp_master(course):
+        return create_master_update(course, 'Completion') + (
+                course['assessments'],)
+
+    def res_master(course):
+        master, transfers_df, passing_df = create_master_update(course,
+                                                                'Results')
+        return master, passing_df, course['assessments']
+
+    def modules(course):
+        return (get_analysis_df(course), aa.create_modules_dict(
+                course['modules']), aa.create_month_index(course['months']))
+
+    def analysis_df(course):
+        comp_data_df = aa.add_module_cols(get_analysis_df(course),
+                                          aa.create_modules_dict(
+                                          course['modules']),
+                                          aa.create_month_index(
+                                          course['months']))
+        return (comp_data_df, course['assessments'],
+                [module[0] for module in course['modules']],
+                len(course['assessments']))
+
+    def filter_data(course):
+        comp_data_df = get_analysis_df(course)
+        return comp_data_df, comp_data_df.copy()
+
+    def valid_students(course):
+        return (course['assessment_downloads'], course['graduation_dates'],
+                course['expiry_dates'])
+
+    def comp_students(course):
+        valid = [row[0] for row in course['assessment_downloads']
+                 if not row[5]]
+        return course['analysis'], valid, 0.25, 0.75
+
+    def zero_students(course):
+        analysis_ids = [row[0] for row in course['analysis']
+                        if float(row[-1]) > 0]
+        expiry_ids = [row[0] for row in course['expiry_dates'][::10]]
+        return course['assessment_downloads'], analysis_ids, expiry_ids
+
+    benchmarks = [
+            ('update_grades_comp', comp_update,
+             lambda data: aa.update_grades_comp(*data)),
+            ('update_grades_res', res_update,
+             lambda data: aa.update_grades_res(*data)),
+            ('update_comp_master_data', comp_master,
+             lambda data: aa.update_comp_master_data(*data)),
+            ('update_res_master_data', res_master,
+             lambda data: aa.update_res_master_data(*data)),
+            ('add_module_cols', modules,
+             lambda data: aa.add_module_cols(data[0].copy(), *data[1:])),
+            ('add_completion_cols', analysis_df,
+             lambda data: aa.add_completion_cols(data[0].copy(), *data[1:]))]
+    filters = [('process_age_filter (25-40)', aa.process_age_filter,
+                (25, 40)),
+               ('process_course_filter (Online)', aa.process_course_filter,
+                ('Online students',)),
+               ('process_ethnicity_filter (Pacific)',
+                aa.process_ethnicity_filter, ('Pacific Island students',)),
+               ('process_gender_filter (Female)', aa.process_gender_filter,
+                ('Female students',)),
+               ('process_status_filter (Non-active)',
+                aa.process_status_filter, ('Non-active',))]
+    for name, filter_func, options in filters:
+        benchmarks.append((name, filter_data, lambda data, filter_func=(
+                filter_func), options=options: filter_func(*options, *data)))
+    benchmarks += [
+            ('get_valid_students', valid_students,
+             lambda data: aa.get_valid_students(*data)),
+            ('extract_comp_students', comp_students,
+             lambda data: aa.extract_comp_students(*data)),
+            ('get_zero_students', zero_students,
+             lambda data: aa.get_zero_students(*data))]
+    return benchmarks
+
+
+def get_expected_seconds(timings, size):
+    """Return the expected time for a benchmark at a number of students.
+    
+    Args:
+        timings (dict): Seconds for each size timed so far.
+        size (int): Number of students.
+    
+    Returns:
+        seconds (float): Expected seconds, scaling at the rate seen between
+        the last two sizes (linear if only one size has been timed).
+    """
+    timed = sorted((int(key), value) for key, value in timings.items()
+                   if value)
+    last_size, last_seconds = timed[-1]
+    exponent = 1
+    if len(timed) > 1:
+        first_size, first_seconds = timed[-2]
+        exponent = max(1, np.log(last_seconds / first_seconds) /
+                       np.log(last_size / first_size))
+    return last_seconds * (size / last_size) ** exponent
+
+
+def load_baseline():
+    """Return the saved baseline results.
+    
+    Returns:
+        baseline (dict): Seconds for each benchmark and size (empty if there
+        is no baseline).
+    """
+    if not os.path.isfile(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)['Results']
+
+
+def main():
+    """Run the benchmarks, or save a synthetic course.
+    
+    Usage:
+        python Assessments_Benchmark.py [sizes] [--baseline]
+        python Assessments_Benchmark.py --generate <students> [directory]
+    
+    Sizes are numbers of students (default 1000 10000 100000). --baseline
+    saves the results as the new baseline. If there is no baseline the
+    results are saved as the baseline.
+    """
+    args = sys.argv[1:]
+    if args and args[0] == '--generate':
+        num_students = int(args[1]) if len(args) > 1 else 1000
+        directory = args[2] if len(args) > 2 else 'Synthetic_Data'
+        save_course(create_course(num_students), directory, num_students)
+        return
+    save_baseline = '--baseline' in args
+    sizes = [int(arg) for arg in args if arg.isdigit()] or DEFAULT_SIZES
+    results = run_benchmarks(sizes)
+    baseline = load_baseline()
+    file_name = 'Benchmark_Results_{}.json'.format(ft.generate_time_string())
+    with open(file_name, 'w') as f:
+        json.dump({'Sizes': sizes, 'Results': results}, f, indent=2)
+    print('\nResults saved to {}'.format(file_name))
+    if baseline:
+        regressions = compare_baseline(results, baseline)
+        if regressions:
+            print('\nRegressions (more than {:.0%} slower than the '
+                  'baseline):'.format(REGRESSION_RATIO - 1))
+            for regression in regressions:
+                print(regression)
+        else:
+            print('\nNo regressions against the baseline.')
+    if save_baseline or not baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({'Sizes': sizes, 'Results': results}, f, indent=2)
+        print('\nBaseline saved to {}'.format(BASELINE_FILE))
+
+
+def run_benchmarks(sizes):
+    """Time each benchmark for each number of students.
+    
+    Each time is the fastest of several runs (see time_benchmark). A
+    benchmark is skipped for larger sizes once it is expected to take
+    longer than MAX_SECONDS. The expected time is from how the benchmark has
+    scaled so far (linear until it has been timed at two sizes).
+    
+    Args:
+        sizes (list): Numbers of students.
+    
+    Returns:
+        results (dict): Seconds for each benchmark and size (None if skipped).
+    """
+    benchmarks = get_benchmarks()
+    results = {name: {} for name, setup, run in benchmarks}
+    skip = set()
+    sizes = sorted(sizes)
+    for pos, size in enumerate(sizes):
+        print('\nCreating course with {} students...'.format(size))
+        course = create_course(size)
+        print('Created course with {} students.'.format(size))
+        for name, setup, run in benchmarks:
+            if name in skip:
+                results[name][str(size)] = None
+                print('{:<40}{:>12}'.format(name[:39], 'Skipped'))
+                continue
+            seconds = time_benchmark(setup, run, course)
+            results[name][str(size)] = round(seconds, 4)
+            print('{:<40}{:>12}'.format(name[:39], format_seconds(seconds)))
+            if pos + 1 < len(sizes) and get_expected_seconds(
+                    results[name], sizes[pos + 1]) > MAX_SECONDS:
+                skip.add(name)
+    return results
+
+
+def save_course(course, directory, num_students):
+    """Save a synthetic course as the files used by the Assessment Analyser.
+    
+    An export of one row per student is saved for updating the masters.
+    
+    Args:
+        course (dict): Synthetic course data (see create_course).
+        directory (str): Directory to save the files to.
+        num_students (int): Number of students in the course.
+    """
+    code = course['code']
+    course_code = '{}-FT-001'.format(code)
+    os.makedirs(directory, exist_ok=True)
+    print('\nSaving synthetic course to {}...'.format(directory))
+
+    def save_text(name, items):
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(','.join(str(item) for item in items))
+
+    def save_rows(name, headings, rows):
+        with open(os.path.join(directory, name), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headings)
+            writer.writerows(rows)
+
+    save_text('Course_codes.txt', [course_code])
+    save_text('months_short.txt', course['months'])
+    save_text('Assessment_Names_{}.txt'.format(course_code),
+              course['assessments'])
+    save_text('Scores_{}.txt'.format(code), course['scores'])
+    save_text('Module_Names_{}.txt'.format(course_code),
+              [module[0] for module in course['modules']])
+    save_text('Master_Completion_Headings_{}.txt'.format(course_code),
+              course['comp_headings'])
+    save_text('Master_Results_Headings_{}.txt'.format(course_code),
+              course['res_headings'])
+    save_text('Assessment_Data_Headings.txt', ['EnrolmentID', 'StudentID',
+              'Course'] + EXPORT_HEADINGS)
+    save_text('Enrolment_Data_Headings.txt', ['EnrolmentID', 'TutorFK',
+              'StartDate', 'ExpiryDate', 'Status'])
+    save_text('Student_Data_Headings.txt', ['StudentID', 'Gender',
+              'DateOfBirth', 'Ethnicity', 'Employment'])
+    save_text('Graduation_Dates_Headings.txt', ['EnrolmentID',
+              'GraduationDate'])
+    save_text('pacific_island_nations.txt', ['Samoan', 'Tongan', 'Fijian'])
+    modules_width = max(len(module) for module in course['modules'])
+    save_rows('Modules_{}.csv'.format(course_code), ['Module'] + [
+            'Assignment {}'.format(i) for i in range(1, modules_width)],
+              course['modules'])
+    save_rows('Master_Completion_{}.csv'.format(course_code),
+              course['comp_headings'], course['master_comp'])
+    save_rows('Master_Results_{}.csv'.format(course_code),
+              course['res_headings'], course['master_res'])
+    save_rows('Enrolment_IDs_{}.csv'.format(course_code), ['EnrolmentPK',
+              'StudentPK', 'CoursePK', 'Name'], course['enrolment_ids'])
+    save_rows('enrolment_data.csv', ['EnrolmentPK', 'TutorFK', 'StartDate',
+              'ExpiryDate', 'Status'], course['enrolment_data'])
+    save_rows('student_data.csv', ['StudentPK', 'Gender', 'DateOfBirth',
+              'Ethnicity', 'Employment'], course['student_data'])
+    save_rows('graduation_dates.csv', ['EnrolmentFK', 'GraduationDate'],
+              course['graduation_dates'])
+    save_rows('expiry_dates_{}.csv'.format(course_code), [
+            'EnrolmentPK', 'ExpiryDate'], course['expiry_dates'])
+    save_rows('student_info.csv', ['StudentPK', 'Name', 'Email'], [
+            [row[1], row[3], '{}.{}@example.com'.format(row[1], row[0])]
+            for row in course['enrolment_ids']])
+    save_rows('Assessment_Downloads_{}.csv'.format(course_code), [
+            'EnrolmentPK', 'StudentPK', 'NameGiven', 'NameSurname', 'CoursePK',
+              'Assessments Downloaded', 'Assessments File Updated'],
+              course['assessment_downloads'])
+    save_rows('Analysis_{}.csv'.format(course_code),
+              course['comp_headings'] + ['Status', 'Completed_Assessments',
+                                         'Completion_Percent'],
+              course['analysis'])
+    save_rows('{}_Jun-23.csv'.format(course_code), EXPORT_HEADINGS,
+              create_export(course, num_students))
+    print('Saved synthetic course to {}.'.format(directory))
+
+
+def time_benchmark(setup, run, course):
+    """Return the fastest time of a benchmark over several runs.
+    
+    The benchmark is run REPEATS times, or fewer once it has run for
+    REPEAT_SECONDS in total, with fresh data from setup for each run so that
+    one slow run does not count as a regression.
+    
+    Args:
+        setup (function): Creates the data for the benchmark from course.
+        run (function): Runs the benchmark on the data.
+        course (dict): Synthetic course data (see create_course).
+    
+    Returns:
+        seconds (float): Fastest time of the runs.
+    """
+    times = []
+    while len(times) < REPEATS and sum(times) < REPEAT_SECONDS:
+        data = setup(course)
+        start = time.perf_counter()
+        # Progress output is not part of the benchmark display
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    main()